@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Event source plugin emitting MultiFlexi job state changes and queue depth.
+
+New jobs are found by polling ``job:list`` newest first with a high-water
+mark on the job id, so every poll reads one short page unless more jobs were
+created since. Jobs seen unfinished are tracked until they leave the
+``running``/``pending`` lists and are then read with ``job:get``, at most
+``page_size`` of them per poll. Full job lists are never re-read.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+author:
+  - Vitex (@Vitexus)
+short_description: Emit MultiFlexi job state changes and queue depth.
+description:
+  - Polls C(multiflexi-cli) and emits an event for every new job, every finished job and every change of
+    the depth of the job queue, so rulebooks can react to failed jobs or a growing backlog.
+  - New jobs are read with C(job:list) newest first until the highest job id seen before (the high-water mark),
+    usually a single short page per poll. Unfinished jobs are tracked until they disappear from the
+    C(running) and C(pending) lists, then read with C(job:get), at most O(page_size) jobs per poll.
+    When more than O(track_limit) jobs are running or pending the lists are cut off, tracked jobs missing
+    from them may still be unfinished and are read in turns, O(page_size) per poll.
+  - Events have a C(multiflexi) key with C(type) V(job_scheduled), V(job_finished) (with C(failed) true for
+    a non-zero exit code) or V(queue_depth) (with C(depth), C(previous) and C(delta)).
+  - CLI errors are logged and the next poll retries, the high-water mark is kept.
+options:
+  command:
+    description:
+      - The C(multiflexi-cli) command, split like a shell command line so it can be wrapped,
+        e.g. C(ssh multiflexi.example.com multiflexi-cli) or C(sudo -u multiflexi multiflexi-cli).
+    type: str
+    default: multiflexi-cli
+  interval:
+    description: Seconds between two polls.
+    type: float
+    default: 5
+  timeout:
+    description: Seconds a single CLI call may take.
+    type: float
+    default: 30
+  page_size:
+    description: Number of jobs read per C(job:list) call, and at most with C(job:get) per poll.
+    type: int
+    default: 100
+  since_id:
+    description:
+      - Emit the jobs with a higher id than this. Without it jobs existing at start are not emitted,
+        only the unfinished ones are tracked.
+    type: int
+  track_limit:
+    description: Maximum number of unfinished jobs tracked at once, the oldest are dropped first.
+    type: int
+    default: 10000
+  queue:
+    description: Emit V(queue_depth) events read with C(queue:overview).
+    type: bool
+    default: true
+  queue_depth_field:
+    description: Field of the C(queue:overview) output holding the number of queued jobs.
+    type: str
+    default: total_jobs
+"""
+
+EXAMPLES = r"""
+- name: React to MultiFlexi jobs
+  hosts: all
+  sources:
+    - vitexus.multiflexi.multiflexi_events:
+        command: sudo -u multiflexi multiflexi-cli
+        interval: 2
+  rules:
+    - name: Failed job
+      condition: event.multiflexi.type == "job_finished" and event.multiflexi.failed
+      action:
+        print_event:
+"""
+
+import asyncio
+import json
+import logging
+import shlex
+
+logger = logging.getLogger(__name__)
+
+# Job fields carried by the events; stdout and stderr are left out on purpose.
+JOB_FIELDS = 'id,runtemplate_id,company_id,app_id,begin,end,exitcode,executor,schedule,launched_by'
+
+
+class MultiflexiEventError(Exception):
+    """A multiflexi-cli call failed or returned something else than JSON."""
+
+
+def cli_runner(command, timeout):
+    """Return a coroutine function running ``command`` with arguments and returning its parsed JSON output.
+
+    With ``allow_not_found`` a failing call whose output has ``status: not found``
+    returns that output instead of raising, like ``MultiflexiCli.run``.
+    """
+    base = shlex.split(command)
+
+    async def run(args, allow_not_found=False):
+        process = await asyncio.create_subprocess_exec(*(base + args), stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise MultiflexiEventError(f"{args[0]} timed out after {timeout}s")
+        try:
+            data = json.loads(stdout.decode('utf-8') or 'null')
+        except ValueError as e:
+            data = e
+        if process.returncode:
+            if allow_not_found and isinstance(data, dict) and data.get('status') == 'not found':
+                return data
+            message = (stderr or stdout).decode('utf-8', 'replace').strip()
+            raise MultiflexiEventError(f"{args[0]} failed with exit code {process.returncode}: {message}")
+        if isinstance(data, ValueError):
+            raise MultiflexiEventError(f"{args[0]} returned invalid JSON: {data}")
+        return data
+
+    return run
+
+
+def job_finished(job):
+    return bool(job.get('end'))
+
+
+def job_event(job):
+    if not job_finished(job):
+        return dict(multiflexi=dict(type='job_scheduled', job=job))
+    exitcode = job.get('exitcode')
+    failed = exitcode not in (None, '', 0, '0')
+    return dict(multiflexi=dict(type='job_finished', job=job, failed=failed))
+
+
+class JobWatcher(object):
+    """State kept between polls: the high-water mark, the tracked jobs and the last queue depth."""
+
+    def __init__(self, run, args):
+        self.run = run
+        self.page_size = int(args.get('page_size') or 100)
+        self.track_limit = int(args.get('track_limit') or 10000)
+        self.queue = args.get('queue', True)
+        self.queue_depth_field = args.get('queue_depth_field') or 'total_jobs'
+        self.high_water_mark = args.get('since_id')
+        self.tracked = {}
+        # Highest tracked id read with job:get by the previous poll, the next batch starts above it
+        self.checked = 0
+        self.depth = None
+
+    async def new_jobs(self):
+        """Return the jobs created since the last poll, oldest first."""
+        jobs = []
+        offset = 0
+        while True:
+            page = await self.run(['job:list', '--fields', JOB_FIELDS, '--order', 'D', '--limit',
+                                   str(self.page_size), '--offset', str(offset), '--format', 'json'])
+            if not isinstance(page, list) or not page:
+                break
+            fresh = [job for job in page if self.high_water_mark is None or int(job['id']) > self.high_water_mark]
+            jobs.extend(fresh)
+            # The first poll without since_id only needs the newest page
+            if self.high_water_mark is None or len(fresh) < len(page) or len(page) < self.page_size:
+                break
+            offset += len(page)
+        unique = dict((int(job['id']), job) for job in jobs)
+        return [unique[job_id] for job_id in sorted(unique)]
+
+    async def finished_jobs(self):
+        """Return the tracked jobs which are no longer running nor pending, read again with job:get.
+
+        At most page_size jobs are read per poll, in turns by id, so a cut off running or pending list
+        does not make every tracked job missing from it read on every poll.
+        """
+        active = set()
+        for status in ('running', 'pending'):
+            rows = await self.run(['job:list', '--status', status, '--fields', 'id', '--limit',
+                                   str(self.track_limit), '--format', 'json'])
+            active.update(int(row['id']) for row in rows or [] if isinstance(row, dict))
+        gone = sorted(set(self.tracked) - active)
+        batch = ([job_id for job_id in gone if job_id > self.checked]
+                 + [job_id for job_id in gone if job_id <= self.checked])[:self.page_size]
+        self.checked = batch[-1] if batch else 0
+        finished = []
+        for job_id in sorted(batch):
+            job = await self.run(['job:get', '--id', str(job_id), '--fields', JOB_FIELDS, '--format', 'json'],
+                                 allow_not_found=True)
+            if isinstance(job, dict) and job.get('status') == 'not found':
+                # Deleted meanwhile, e.g. by a prune
+                del self.tracked[job_id]
+                continue
+            if isinstance(job, dict) and job_finished(job):
+                del self.tracked[job_id]
+                finished.append(job)
+        return finished
+
+    def track(self, job):
+        self.tracked[int(job['id'])] = job
+        while len(self.tracked) > self.track_limit:
+            del self.tracked[min(self.tracked)]
+
+    async def queue_depth(self):
+        overview = await self.run(['queue:overview', '--format', 'json'])
+        if isinstance(overview, list):
+            return len(overview)
+        if isinstance(overview, dict) and overview.get(self.queue_depth_field) is not None:
+            return int(overview[self.queue_depth_field])
+        raise MultiflexiEventError(f"queue:overview has no {self.queue_depth_field} field")
+
+    async def poll(self):
+        """Return the events since the previous poll."""
+        events = []
+        first = self.high_water_mark is None
+        if self.tracked:
+            events.extend(job_event(job) for job in await self.finished_jobs())
+        for job in await self.new_jobs():
+            self.high_water_mark = max(self.high_water_mark or 0, int(job['id']))
+            if not job_finished(job):
+                self.track(job)
+            if not first:
+                events.append(job_event(job))
+        if first and self.high_water_mark is None:
+            # No jobs yet: everything created from now on is new
+            self.high_water_mark = 0
+        if self.queue:
+            depth = await self.queue_depth()
+            if depth != self.depth:
+                events.append(dict(multiflexi=dict(type='queue_depth', depth=depth, previous=self.depth,
+                                                   delta=depth - (self.depth or 0))))
+                self.depth = depth
+        return events
+
+
+async def main(queue, args):
+    """Poll MultiFlexi every ``interval`` seconds and put the events on the queue."""
+    run = cli_runner(args.get('command') or 'multiflexi-cli', float(args.get('timeout') or 30))
+    watcher = JobWatcher(run, args)
+    interval = float(args.get('interval') or 5)
+    while True:
+        try:
+            events = await watcher.poll()
+        except MultiflexiEventError as e:
+            logger.warning("Polling MultiFlexi failed: %s", e)
+            events = []
+        for event in events:
+            await queue.put(event)
+        await asyncio.sleep(interval)
+
+
+if __name__ == '__main__':
+
+    class MockQueue(asyncio.Queue):
+        async def put(self, event):
+            print(json.dumps(event))
+
+    asyncio.run(main(MockQueue(), dict(interval=2)))
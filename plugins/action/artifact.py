@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Streams artifacts saved by vitexus.multiflexi.artifact to the controller."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import hashlib
+import os
+import tempfile
+
+from ansible.errors import AnsibleActionFail, AnsibleError
+from ansible.plugins.action import ActionBase
+from ansible.utils.hashing import secure_hash
+
+
+class ActionModule(ActionBase):
+    """Run the artifact module and fetch the saved files to ``fetch_dest`` when they differ."""
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        module_args = self._task.args.copy()
+        fetch_dest = module_args.pop('fetch_dest', None)
+
+        result.update(self._execute_module(module_name='vitexus.multiflexi.artifact', module_args=module_args,
+                                           task_vars=task_vars))
+        if not fetch_dest or result.get('failed') or module_args.get('state') != 'save':
+            return result
+
+        fetch_dest = os.path.expanduser(str(fetch_dest))
+        files = []
+        if result.get('saved_to'):
+            local = fetch_dest
+            if fetch_dest.endswith(os.sep) or os.path.isdir(fetch_dest):
+                local = os.path.join(fetch_dest, os.path.basename(result['saved_to']))
+            files.append((result['saved_to'], local, result['checksum']))
+        for artifact in result.get('artifacts') or []:
+            if artifact['status'] != 'failed':
+                local = os.path.join(fetch_dest, str(artifact.get('job_id') or 0), os.path.basename(artifact['path']))
+                files.append((artifact['path'], local, artifact['checksum']))
+
+        result['fetched'] = []
+        for remote, local, checksum in files:
+            if secure_hash(local, hashlib.sha256) == checksum:
+                continue
+            if not self._play_context.check_mode:
+                self._fetch(remote, local)
+            result['fetched'].append(local)
+        result['changed'] = bool(result.get('changed') or result['fetched'])
+        return result
+
+    def _fetch(self, remote, local):
+        directory = os.path.dirname(os.path.abspath(local))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        handle, temp = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(local)}.')
+        os.close(handle)
+        try:
+            self._connection.fetch_file(remote, temp)
+            os.rename(temp, local)
+        except (AnsibleError, IOError, OSError) as e:
+            os.unlink(temp)
+            raise AnsibleActionFail(f"Unable to fetch artifact {remote} to {local}: {e}")
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Reuses MultiFlexi facts of the host younger than ``facts_ttl`` instead of gathering them again."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import time
+
+from ansible.plugins.action import ActionBase
+
+
+class ActionModule(ActionBase):
+    """Run multiflexi_info only for the sections whose facts are missing or older than ``facts_ttl``."""
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        task_vars = task_vars or {}
+        module_args = self._task.args.copy()
+        sections = module_args.get('sections') or ['status']
+        if not isinstance(sections, list):
+            sections = [section.strip() for section in str(sections).split(',')]
+        ttl = int(module_args.get('facts_ttl') or 0)
+
+        # Facts of earlier plays, or of earlier runs with fact caching enabled
+        gathered = dict((task_vars.get('ansible_facts') or {}).get('multiflexi_gathered') or {})
+        now = time.time()
+        cached = [section for section in sections
+                  if ttl and section != 'ping' and now - float(gathered.get(section) or 0) < ttl]
+        stale = [section for section in sections if section not in cached]
+        if not stale:
+            result.update(changed=False, ansible_facts={}, cached_sections=cached)
+            return result
+
+        module_args['sections'] = stale
+        result.update(self._execute_module(module_name='vitexus.multiflexi.multiflexi_info', module_args=module_args,
+                                           task_vars=task_vars))
+        if not result.get('failed'):
+            facts = result.setdefault('ansible_facts', {})
+            gathered.update(facts.get('multiflexi_gathered') or {})
+            facts['multiflexi_gathered'] = gathered
+            result['cached_sections'] = cached
+        return result
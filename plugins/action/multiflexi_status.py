@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Reuses MultiFlexi status sections of the host younger than ``facts_ttl`` instead of gathering them again."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import time
+
+from ansible.plugins.action import ActionBase
+
+
+class ActionModule(ActionBase):
+    """Run multiflexi_status only for the sections missing from the facts or older than ``facts_ttl``."""
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        task_vars = task_vars or {}
+        module_args = self._task.args.copy()
+        sections = module_args.get('sections') or []
+        if not isinstance(sections, list):
+            sections = [section.strip() for section in str(sections).split(',') if section.strip()]
+        ttl = int(module_args.get('facts_ttl') or 0)
+
+        # The whole status is kept as the section "all"
+        facts = task_vars.get('ansible_facts') or {}
+        stored = dict(facts.get('multiflexi_status_sections') or {})
+        gathered = dict(facts.get('multiflexi_status_gathered') or {})
+        now = time.time()
+        cached = [section for section in sections or ['all']
+                  if ttl and section != 'ping' and section in stored and now - float(gathered.get(section) or 0) < ttl]
+        stale = [section for section in sections or ['all'] if section not in cached]
+        status = dict((section, stored[section]) for section in cached)
+
+        if stale:
+            module_args['sections'] = [section for section in stale if section != 'all']
+            result.update(self._execute_module(module_name='vitexus.multiflexi.multiflexi_status',
+                                               module_args=module_args, task_vars=task_vars))
+            if result.get('failed'):
+                return result
+            status.update(dict(all=result['status']) if not sections else result['status'])
+            new_facts = result.get('ansible_facts') or {}
+            stored.update(new_facts.get('multiflexi_status_sections') or {})
+            gathered.update(new_facts.get('multiflexi_status_gathered') or {})
+        else:
+            result.update(changed=False, msg=f"Reused MultiFlexi {', '.join(sections or ['system'])} status")
+
+        result['status'] = status['all'] if not sections else status
+        result['cached_sections'] = cached
+        if ttl:
+            result['ansible_facts'] = dict(multiflexi_status_sections=stored, multiflexi_status_gathered=gathered)
+        return result
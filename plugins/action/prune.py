@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Keeps the cursor of batched vitexus.multiflexi.prune runs on the controller."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import tempfile
+
+from ansible.errors import AnsibleActionFail
+from ansible.plugins.action import ActionBase
+
+
+class ActionModule(ActionBase):
+    """Run the prune module with the cursor read from ``cursor_file`` and store the returned one."""
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        module_args = self._task.args.copy()
+        cursor_file = module_args.pop('cursor_file', None)
+        if cursor_file:
+            cursor_file = os.path.expanduser(str(cursor_file))
+            if module_args.get('cursor') is None and os.path.exists(cursor_file):
+                try:
+                    with open(cursor_file) as handle:
+                        module_args['cursor'] = json.load(handle)
+                except (IOError, OSError, ValueError) as e:
+                    raise AnsibleActionFail(f"Unable to read prune cursor {cursor_file}: {e}")
+
+        result.update(self._execute_module(module_name='vitexus.multiflexi.prune', module_args=module_args,
+                                           task_vars=task_vars))
+
+        if cursor_file and isinstance(result.get('cursor'), dict) and not self._play_context.check_mode:
+            self._save_cursor(cursor_file, result['cursor'])
+            result['cursor_file'] = cursor_file
+        return result
+
+    @staticmethod
+    def _save_cursor(path, cursor):
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        handle, temp = tempfile.mkstemp(dir=directory, prefix='.prune-cursor-')
+        try:
+            with os.fdopen(handle, 'w') as output:
+                json.dump(cursor, output, indent=2, sort_keys=True)
+            os.rename(temp, path)
+        except (IOError, OSError) as e:
+            os.unlink(temp)
+            raise AnsibleActionFail(f"Unable to write prune cursor {path}: {e}")
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""SQLite cache plugin shared with the vitexus.multiflexi modules."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = """
+    name: multiflexi
+    author: Vitex (@Vitexus)
+    version_added: "1.7.0"
+    short_description: SQLite file cache shared with MultiFlexi modules.
+    description:
+      - Stores facts or inventory data in a single SQLite file with a TTL.
+      - Point the modules' C(multiflexi_cache_path) option (or E(MULTIFLEXI_CACHE_PATH)) at the same file
+        to let them reuse cached application, company, credential type and credential prototype lookups.
+      - Flushing the cache (C(--flush-cache)) drops the module lookups as well.
+    options:
+      _uri:
+        required: true
+        description:
+          - Path of the SQLite cache file, created when missing.
+        env:
+          - name: ANSIBLE_CACHE_PLUGIN_CONNECTION
+        ini:
+          - key: fact_caching_connection
+            section: defaults
+        type: path
+      _prefix:
+        description: Prefix prepended to the keys stored by this plugin.
+        env:
+          - name: ANSIBLE_CACHE_PLUGIN_PREFIX
+        ini:
+          - key: fact_caching_prefix
+            section: defaults
+        type: str
+        default: ''
+      _timeout:
+        default: 86400
+        description: Expiration timeout in seconds of the cached data, V(0) never expires.
+        env:
+          - name: ANSIBLE_CACHE_PLUGIN_TIMEOUT
+        ini:
+          - key: fact_caching_timeout
+            section: defaults
+        type: integer
+"""
+
+import copy
+
+from ansible.errors import AnsibleError
+from ansible.plugins.cache import BaseCacheModule
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cache import EntityCache
+
+
+# Entity column value of entries written by this plugin.
+PLUGIN_ENTITY = 'ansible'
+
+
+class CacheModule(BaseCacheModule):
+    """A caching module backed by the MultiFlexi SQLite cache file."""
+
+    def __init__(self, *args, **kwargs):
+        super(CacheModule, self).__init__(*args, **kwargs)
+        self._prefix = self.get_option('_prefix') or ''
+        try:
+            self._store = EntityCache(self.get_option('_uri'), int(self.get_option('_timeout')))
+        except Exception as e:
+            raise AnsibleError(f"Error opening MultiFlexi cache {self.get_option('_uri')}: {e}")
+
+    def _key(self, key):
+        return f"{self._prefix}{key}"
+
+    def get(self, key):
+        value = self._store.get(self._key(key))
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def set(self, key, value):
+        self._store.set(self._key(key), value, PLUGIN_ENTITY)
+
+    def keys(self):
+        return [key[len(self._prefix):] for key in self._store.keys(PLUGIN_ENTITY) if key.startswith(self._prefix)]
+
+    def contains(self, key):
+        return self._store.get(self._key(key)) is not None
+
+    def delete(self, key):
+        self._store.delete(self._key(key))
+
+    def flush(self):
+        # Also drops the module lookup entries, so a flush forces fresh lookups.
+        self._store.invalidate()
+
+    def copy(self):
+        return dict((key, copy.deepcopy(self.get(key))) for key in self.keys())
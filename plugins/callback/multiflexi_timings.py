@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Report of the slowest multiflexi-cli subcommands of a playbook run."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = """
+    name: multiflexi_timings
+    type: aggregate
+    author: Vitex (@Vitexus)
+    version_added: "1.7.0"
+    short_description: Aggregates multiflexi-cli call timings of MultiFlexi modules.
+    description:
+      - Collects the C(timings) section returned by vitexus.multiflexi modules run with C(multiflexi_timings)
+        (or E(MULTIFLEXI_TIMINGS)) enabled, including the results of loops.
+      - At the end of the playbook prints the subcommands which took the most time in total, with their number
+        of calls, mean and maximum duration, failures and output size, followed by the tasks which spent the
+        most time in the CLI.
+    requirements:
+      - enable in configuration - see examples section below for details.
+    options:
+      top:
+        description: Number of subcommands and tasks listed in the report.
+        type: int
+        default: 10
+        env:
+          - name: MULTIFLEXI_TIMINGS_TOP
+        ini:
+          - section: callback_multiflexi_timings
+            key: top
+      output_path:
+        description:
+          - Also write the full aggregation as JSON to this file, e.g. to compare nightly runs.
+        type: path
+        env:
+          - name: MULTIFLEXI_TIMINGS_OUTPUT
+        ini:
+          - section: callback_multiflexi_timings
+            key: output_path
+"""
+
+EXAMPLES = """
+# ansible.cfg
+# [defaults]
+# callbacks_enabled = vitexus.multiflexi.multiflexi_timings
+#
+# [callback_multiflexi_timings]
+# top = 20
+# output_path = /var/log/multiflexi/timings.json
+#
+# and run the playbook with MULTIFLEXI_TIMINGS=1 or set multiflexi_timings: true on the tasks.
+"""
+
+import json
+
+from ansible.plugins.callback import CallbackBase
+
+
+class CallbackModule(CallbackBase):
+    """Sums up the CLI calls reported by the modules per subcommand and per task."""
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'vitexus.multiflexi.multiflexi_timings'
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, *args, **kwargs):
+        super(CallbackModule, self).__init__(*args, **kwargs)
+        self.commands = {}
+        self.tasks = {}
+
+    def _add(self, task_name, timings):
+        if not isinstance(timings, dict):
+            return
+        task = self.tasks.setdefault(task_name, dict(calls=0, total=0.0))
+        for call in timings.get('calls') or []:
+            command = self.commands.setdefault(call.get('command') or '?',
+                                               dict(calls=0, total=0.0, max=0.0, failed=0, bytes=0))
+            duration = float(call.get('duration') or 0)
+            command['calls'] += 1
+            command['total'] += duration
+            command['max'] = max(command['max'], duration)
+            command['failed'] += 1 if call.get('rc') else 0
+            command['bytes'] += int(call.get('bytes') or 0)
+            task['calls'] += 1
+            task['total'] += duration
+
+    def _collect(self, result):
+        task_name = result._task.get_name()
+        self._add(task_name, result._result.get('timings'))
+        for item in result._result.get('results') or []:
+            if isinstance(item, dict):
+                self._add(task_name, item.get('timings'))
+
+    def v2_runner_on_ok(self, result):
+        self._collect(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._collect(result)
+
+    def report(self):
+        """Return the aggregation, slowest first."""
+        commands = sorted(self.commands.items(), key=lambda item: item[1]['total'], reverse=True)
+        tasks = sorted(((name, task) for name, task in self.tasks.items() if task['calls']),
+                       key=lambda item: item[1]['total'], reverse=True)
+        return dict(
+            calls=sum(command['calls'] for _name, command in commands),
+            total=round(sum(command['total'] for _name, command in commands), 4),
+            commands=[dict(command=name, calls=command['calls'], total=round(command['total'], 4),
+                           mean=round(command['total'] / command['calls'], 4), max=round(command['max'], 4),
+                           failed=command['failed'], bytes=command['bytes']) for name, command in commands],
+            tasks=[dict(task=name, calls=task['calls'], total=round(task['total'], 4)) for name, task in tasks],
+        )
+
+    def v2_playbook_on_stats(self, stats):
+        report = self.report()
+        if not report['calls']:
+            return
+        top = self.get_option('top')
+        self._display.banner('MULTIFLEXI CLI TIMINGS')
+        self._display.display(f"{report['calls']} multiflexi-cli calls took {report['total']:.2f}s")
+        self._display.display(f"{'subcommand':<32} {'calls':>7} {'total':>10} {'mean':>9} {'max':>9} "
+                              f"{'failed':>7} {'bytes':>12}")
+        for command in report['commands'][:top]:
+            self._display.display(f"{command['command']:<32} {command['calls']:>7} {command['total']:>9.2f}s "
+                                  f"{command['mean']:>8.3f}s {command['max']:>8.3f}s {command['failed']:>7} "
+                                  f"{command['bytes']:>12}")
+        self._display.display('')
+        self._display.display('Tasks spending the most time in multiflexi-cli:')
+        for task in report['tasks'][:top]:
+            self._display.display(f"{task['total']:>9.2f}s {task['calls']:>7} calls  {task['task']}")
+
+        if self.get_option('output_path'):
+            try:
+                with open(self.get_option('output_path'), 'w') as output:
+                    json.dump(report, output, indent=2)
+            except (IOError, OSError) as e:
+                self._display.warning(f"Unable to write MultiFlexi timings to {self.get_option('output_path')}: {e}")
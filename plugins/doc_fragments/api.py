@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+
+    DOCUMENTATION = r"""
+options:
+    transport:
+        description:
+            - How the module talks to MultiFlexi.
+            - V(cli) runs C(multiflexi-cli) on the managed host.
+            - V(api) sends the same requests to the MultiFlexi REST API at O(api_url), reusing
+              one keep-alive HTTP connection for all calls of the task. Commands the API does
+              not provide (for example deletes) fail with a message asking for V(cli).
+            - Can also be set with the E(MULTIFLEXI_TRANSPORT) environment variable.
+        required: false
+        type: str
+        choices: [cli, api]
+        default: cli
+    api_url:
+        description:
+            - Base URL of the MultiFlexi REST API, for example V(https://multiflexi.example.com/api/VitexSoftware/MultiFlexi/1.0.0).
+            - Required when O(transport=api). Can also be set with E(MULTIFLEXI_API_URL).
+        required: false
+        type: str
+    api_username:
+        description:
+            - Username for HTTP basic authentication against the API.
+            - Can also be set with E(MULTIFLEXI_API_USERNAME).
+        required: false
+        type: str
+    api_password:
+        description:
+            - Password for HTTP basic authentication against the API.
+            - Can also be set with E(MULTIFLEXI_API_PASSWORD).
+        required: false
+        type: str
+    api_timeout:
+        description:
+            - Timeout in seconds for a single API request.
+        required: false
+        type: int
+        default: 30
+    validate_certs:
+        description:
+            - Verify the TLS certificate of the API server.
+        required: false
+        type: bool
+        default: true
+"""
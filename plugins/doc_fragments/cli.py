@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+
+    DOCUMENTATION = r"""
+options:
+    multiflexi_cli_worker:
+        description:
+            - Send all CLI calls made by the task to one long-lived C(multiflexi-cli worker) process
+              instead of starting C(multiflexi-cli) (and bootstrapping PHP) for every call.
+            - Requires a C(multiflexi-cli) providing the C(worker) command. When it is not available
+              the module warns and falls back to one process per call.
+            - Can also be enabled with the E(MULTIFLEXI_CLI_WORKER) environment variable.
+        required: false
+        type: bool
+        default: false
+    multiflexi_cache_path:
+        description:
+            - Path of a SQLite file caching lookups of applications, companies, credential names, credential types
+              and credential prototypes across tasks and playbook runs. A cache hit skips the CLI call.
+            - Entries of an entity are dropped whenever the module changes that entity.
+            - The file can be shared with the P(vitexus.multiflexi.multiflexi#cache) cache plugin.
+            - Can also be set with the E(MULTIFLEXI_CACHE_PATH) environment variable. Caching is off when unset.
+        required: false
+        type: path
+    multiflexi_cache_ttl:
+        description:
+            - Seconds a cached lookup stays valid, V(0) keeps entries until they are invalidated.
+            - Can also be set with the E(MULTIFLEXI_CACHE_TTL) environment variable.
+        required: false
+        type: int
+        default: 3600
+    multiflexi_timings:
+        description:
+            - Add a C(timings) section to the result listing every C(multiflexi-cli) subcommand run by the task
+              with its C(duration) in seconds, exit code C(rc) and output size C(bytes), plus their C(count) and
+              C(total) duration and the number of lookups answered from memory (C(memo_hits)) or the lookup cache
+              (C(cache_hits)).
+            - Only subcommand names are recorded, never their arguments.
+            - The P(vitexus.multiflexi.multiflexi_timings#callback) callback plugin aggregates them over a playbook run.
+            - Can also be enabled with the E(MULTIFLEXI_TIMINGS) environment variable.
+        required: false
+        type: bool
+        default: false
+    multiflexi_otlp_endpoint:
+        description:
+            - OTLP/HTTP endpoint receiving OpenTelemetry spans of the task, for example the collector deployed by the
+              P(vitexus.multiflexi.otel_collector#role) role at V(http://127.0.0.1:4318).
+            - The module run becomes a span with a child span per C(multiflexi-cli) or REST API call carrying the
+              entity, action, record ids, exit code, transport and output size. Spans join the trace given in the
+              E(TRACEPARENT) environment variable, if any.
+            - Spans are exported in batches on a background thread; export errors are ignored and never fail the task.
+            - Can also be set with the E(MULTIFLEXI_OTLP_ENDPOINT) environment variable. Tracing is off when unset.
+        required: false
+        type: str
+    multiflexi_otlp_timeout:
+        description:
+            - Upper bound in seconds of the time spent flushing spans at the end of the task.
+            - Can also be set with the E(MULTIFLEXI_OTLP_TIMEOUT) environment variable.
+        required: false
+        type: float
+        default: 1.0
+"""
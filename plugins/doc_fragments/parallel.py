@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+
+    DOCUMENTATION = r"""
+options:
+    max_workers:
+        description:
+            - Number of independent CLI operations run at the same time by bulk operations of the module.
+            - Results and errors are reported in input order regardless of the order the operations finish.
+            - In check mode no changing operation is run.
+            - Can also be set with the E(MULTIFLEXI_MAX_WORKERS) environment variable.
+        required: false
+        type: int
+        default: 1
+"""
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Inventory of MultiFlexi run templates grouped by company and application."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = """
+    name: multiflexi
+    author: Vitex (@Vitexus)
+    version_added: "1.7.0"
+    short_description: MultiFlexi run templates as inventory hosts.
+    description:
+      - Adds one host per MultiFlexi run template, named C(runtemplate_<id>).
+      - Each company becomes a group C(company_<slug>) and each application assigned to a company (C(company-app:list))
+        a group C(app_<name>); run templates join the groups of their company and application.
+      - Hosts get their ids and the run template record as hostvars, groups get the company or application record.
+      - Everything is read with four list calls (companies, applications, assignments, run templates), independent
+        of the number of entities.
+      - The REST API has no company-application assignments. With O(transport=api) the application groups are
+        built from the applications of the run templates instead, so applications assigned to a company but
+        without any run template get no group.
+      - Uses a YAML configuration file ending with C(multiflexi.yml) or C(multiflexi.yaml).
+    extends_documentation_fragment:
+      - constructed
+      - inventory_cache
+    options:
+      plugin:
+        description: Token that ensures this is a source file for the plugin.
+        required: true
+        choices: ['vitexus.multiflexi.multiflexi']
+      multiflexi_cli:
+        description: Path of the multiflexi-cli binary on the controller.
+        type: str
+        default: multiflexi-cli
+      transport:
+        description:
+          - V(cli) runs O(multiflexi_cli) on the controller, V(api) reads the MultiFlexi REST API at O(api_url).
+        type: str
+        choices: [cli, api]
+        default: cli
+        env:
+          - name: MULTIFLEXI_TRANSPORT
+      api_url:
+        description: Base URL of the MultiFlexi REST API, required with O(transport=api).
+        type: str
+        env:
+          - name: MULTIFLEXI_API_URL
+      api_username:
+        description: Username for HTTP basic authentication against the API.
+        type: str
+        env:
+          - name: MULTIFLEXI_API_USERNAME
+      api_password:
+        description: Password for HTTP basic authentication against the API.
+        type: str
+        env:
+          - name: MULTIFLEXI_API_PASSWORD
+      validate_certs:
+        description: Verify the TLS certificate of the API server.
+        type: bool
+        default: true
+      only_active:
+        description: Skip run templates which are not active.
+        type: bool
+        default: false
+      local_connection:
+        description:
+          - Set C(ansible_connection=local) on every host, run templates are not machines to log in to.
+        type: bool
+        default: true
+"""
+
+EXAMPLES = """
+# multiflexi.yml
+plugin: vitexus.multiflexi.multiflexi
+only_active: true
+cache: true
+cache_plugin: vitexus.multiflexi.multiflexi
+cache_connection: ~/.cache/multiflexi.sqlite
+cache_timeout: 3600
+keyed_groups:
+  - key: multiflexi_runtemplate.executor
+    prefix: executor
+"""
+
+from ansible.errors import AnsibleParserError
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.api import MultiflexiApi
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCli, MultiflexiCliError
+
+
+# Data sources of the inventory, all read in bulk.
+LIST_COMMANDS = dict(
+    companies='company:list',
+    applications='application:list',
+    assignments='company-app:list',
+    runtemplates='run-template:list',
+)
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'vitexus.multiflexi.multiflexi'
+
+    def verify_file(self, path):
+        if super(InventoryModule, self).verify_file(path):
+            return path.endswith(('multiflexi.yml', 'multiflexi.yaml'))
+        return False
+
+    def _executor(self):
+        api = None
+        if self.get_option('transport') == 'api':
+            if not self.get_option('api_url'):
+                raise AnsibleParserError("api_url is required when transport is 'api'")
+            api = MultiflexiApi(self.get_option('api_url'), self.get_option('api_username'),
+                                self.get_option('api_password'), self.get_option('validate_certs'))
+        return MultiflexiCli(api=api)
+
+    def _fetch(self):
+        cli = self._executor()
+        data = {}
+        try:
+            for name, command in LIST_COMMANDS.items():
+                if name == 'assignments' and cli.api is not None:
+                    continue
+                records = cli.run_json([self.get_option('multiflexi_cli'), command, '--format', 'json'])
+                data[name] = records if isinstance(records, list) else []
+        except (MultiflexiCliError, ValueError) as e:
+            raise AnsibleParserError(f"Unable to read MultiFlexi inventory: {e}")
+        finally:
+            cli.close()
+        if 'assignments' not in data:
+            self.display.warning("company-app:list is not available with transport=api, "
+                                 "application groups are built from the run templates")
+            data['assignments'] = [dict(company_id=template.get('company_id'), app_id=template.get('app_id'))
+                                   for template in data['runtemplates']]
+        return data
+
+    def _populate(self, data):
+        companies = dict((str(company.get('id')), company) for company in data['companies'])
+        applications = dict((str(app.get('id')), app) for app in data['applications'])
+        company_groups = {}
+        app_groups = {}
+
+        for company_id, company in companies.items():
+            group = self.inventory.add_group(self._sanitize_group_name(
+                f"company_{company.get('slug') or company_id}"))
+            self.inventory.set_variable(group, 'multiflexi_company', company)
+            company_groups[company_id] = group
+
+        for assignment in data['assignments']:
+            app = applications.get(str(assignment.get('app_id')))
+            if app is None:
+                continue
+            app_id = str(app.get('id'))
+            if app_id not in app_groups:
+                group = self.inventory.add_group(self._sanitize_group_name(f"app_{app.get('name') or app_id}"))
+                self.inventory.set_variable(group, 'multiflexi_app', app)
+                app_groups[app_id] = group
+
+        strict = self.get_option('strict')
+        for template in data['runtemplates']:
+            if self.get_option('only_active') and not template.get('active'):
+                continue
+            host = self.inventory.add_host(f"runtemplate_{template.get('id')}")
+            company_id = str(template.get('company_id'))
+            app_id = str(template.get('app_id'))
+            hostvars = dict(
+                multiflexi_runtemplate=template,
+                multiflexi_runtemplate_id=template.get('id'),
+                multiflexi_company_id=template.get('company_id'),
+                multiflexi_app_id=template.get('app_id'),
+                multiflexi_app_uuid=applications.get(app_id, {}).get('uuid'),
+            )
+            if self.get_option('local_connection'):
+                hostvars['ansible_connection'] = 'local'
+            for key, value in hostvars.items():
+                self.inventory.set_variable(host, key, value)
+            if company_id in company_groups:
+                self.inventory.add_child(company_groups[company_id], host)
+            if app_id in app_groups:
+                self.inventory.add_child(app_groups[app_id], host)
+
+            self._set_composite_vars(self.get_option('compose'), hostvars, host, strict=strict)
+            self._add_host_to_composed_groups(self.get_option('groups'), hostvars, host, strict=strict)
+            self._add_host_to_keyed_groups(self.get_option('keyed_groups'), hostvars, host, strict=strict)
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path, cache)
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        user_cache_setting = self.get_option('cache')
+        attempt_to_read_cache = user_cache_setting and cache
+        cache_needs_update = user_cache_setting and not cache
+
+        data = None
+        if attempt_to_read_cache:
+            try:
+                data = self._cache[cache_key]
+            except KeyError:
+                cache_needs_update = True
+        if data is None:
+            data = self._fetch()
+        if cache_needs_update:
+            self._cache[cache_key] = data
+
+        self._populate(data)
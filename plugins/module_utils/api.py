@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""REST API transport for the multiflexi-cli executor.
+
+Translates the multiflexi-cli command lines built by the modules into calls
+to the MultiFlexi REST API (see docs/openapi-schema.yaml) and answers them
+the way multiflexi-cli would, so modules work unchanged with either transport.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import base64
+import json
+import ssl
+import threading
+from collections import namedtuple
+
+from ansible.module_utils.six.moves import http_client
+from ansible.module_utils.six.moves.urllib.parse import urlencode, urlsplit
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+
+
+# record: path of a single record, collection: path of the listing,
+# save: path accepting POST for create/update (None = update only through
+# "<record>/<id>.json"), id_param: query parameter selecting the updated record.
+ApiEntity = namedtuple('ApiEntity', ['record', 'collection', 'save', 'id_param'])
+
+API_ENTITIES = {
+    'application': ApiEntity('app', 'apps', 'app/', 'appId'),
+    'job': ApiEntity('job', 'jobs', 'job/', 'jobId'),
+    'run-template': ApiEntity('runtemplate', 'runtemplates', 'runtemplate', 'runTemplateId'),
+    'company': ApiEntity('company', 'companies', 'company/', 'companyId'),
+    'user': ApiEntity('user', 'users', 'user/', 'userId'),
+    'credential': ApiEntity('credential', 'credentials', None, None),
+    'credential-type': ApiEntity('credential_type', 'credential_types', None, None),
+    'topic': ApiEntity('topic', 'topics', None, None),
+}
+
+# CLI options steering output or paging rather than selecting records.
+CONTROL_OPTIONS = ('format', 'verbose', 'no-interaction', 'fields', 'limit', 'offset', 'order', 'direction')
+
+
+class MultiflexiApiError(MultiflexiCliError):
+    """The MultiFlexi API answered with an HTTP error status."""
+
+    def __init__(self, message, status):
+        super(MultiflexiApiError, self).__init__(message, rc=1)
+        self.status = status
+
+
+def parse_command(args):
+    """Split a multiflexi-cli command line into ``(subcommand, options)``."""
+    name = None
+    options = {}
+    rest = list(args[1:])
+    i = 0
+    while i < len(rest):
+        arg = rest[i]
+        if arg.startswith('--'):
+            key, eq, value = arg[2:].partition('=')
+            if not eq:
+                if i + 1 < len(rest) and not rest[i + 1].startswith('--'):
+                    value = rest[i + 1]
+                    i += 1
+                else:
+                    value = True
+            if key in options:
+                previous = options[key]
+                options[key] = (previous if isinstance(previous, list) else [previous]) + [value]
+            else:
+                options[key] = value
+        elif name is None:
+            name = arg
+        i += 1
+    return name, options
+
+
+def _matches(record, filters):
+    return all(str(record.get(key)) == str(value) for key, value in filters.items())
+
+
+class MultiflexiApi(object):
+    """Minimal MultiFlexi REST client reusing keep-alive connections.
+
+    Idle connections are kept in a small pool, so all calls made during a
+    task share one TCP/TLS handshake instead of paying it per request.
+    """
+
+    def __init__(self, url, username=None, password=None, validate_certs=True, timeout=30, pool_size=4):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise MultiflexiCliError(f"Invalid MultiFlexi API URL: {url}")
+        self.url = url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.connections_opened = 0
+        self.requests_sent = 0
+        self._pool = []
+        self._lock = threading.Lock()
+        self._headers = {'Accept': 'application/json'}
+        if username:
+            token = base64.b64encode(f"{username}:{password or ''}".encode('utf-8')).decode('ascii')
+            self._headers['Authorization'] = f"Basic {token}"
+        self._ssl_context = None
+        if self.scheme == 'https':
+            self._ssl_context = ssl.create_default_context()
+            if not validate_certs:
+                self._ssl_context.check_hostname = False
+                self._ssl_context.verify_mode = ssl.CERT_NONE
+
+    def _acquire(self):
+        with self._lock:
+            if self._pool:
+                return self._pool.pop(), True
+            self.connections_opened += 1
+        if self.scheme == 'https':
+            conn = http_client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self._ssl_context)
+        else:
+            conn = http_client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn, False
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Close all pooled connections."""
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+
+    def request(self, method, path, query=None, body=None):
+        """Send a request relative to the API URL and return ``(status, bytes)``."""
+        target = f"{self.base_path}/{path}"
+        if query:
+            target += '?' + urlencode(query)
+        headers = dict(self._headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        while True:
+            conn, reused = self._acquire()
+            try:
+                self.requests_sent += 1
+                conn.request(method, target, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http_client.HTTPException, OSError) as e:
+                conn.close()
+                # A pooled connection may have been closed by the server while
+                # idle; retry safe requests once on a fresh connection.
+                if reused and method == 'GET' and isinstance(e, (http_client.BadStatusLine, ConnectionError)):
+                    continue
+                raise MultiflexiCliError(f"Failed to reach MultiFlexi API at {self.url}: {e}")
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return response.status, data
+
+    def call(self, method, path, query=None, body=None):
+        """Send a request and return the decoded JSON answer."""
+        status, data = self.request(method, path, query=query, body=body)
+        text = data.decode('utf-8', 'replace')
+        if status >= 400:
+            try:
+                message = json.loads(text).get('message')
+            except (ValueError, AttributeError):
+                message = None
+            raise MultiflexiApiError(f"MultiFlexi API error {status} on {path}: {message or text.strip()}", status)
+        return json.loads(text) if text.strip() else None
+
+    def execute(self, args):
+        """Answer a multiflexi-cli command line like the CLI: ``(rc, stdout, stderr)``."""
+        name, options = parse_command(args)
+        try:
+            data = self._dispatch(name, options)
+        except MultiflexiApiError as e:
+            if e.status == 404:
+                return 1, json.dumps({'status': 'not found', 'message': str(e)}), ''
+            return 1, '', str(e)
+        return 0, json.dumps(data), ''
+
+    def _dispatch(self, name, options):
+        if name == 'ping':
+            # Liveness only, the body of /ping is not part of the contract
+            status, _data = self.request('GET', 'ping.json')
+            if status >= 400:
+                raise MultiflexiApiError(f"MultiFlexi API error {status} on ping.json", status)
+            return dict(status='ok')
+        if name == 'status':
+            return self.call('GET', 'status.json')
+        if name == 'job:status':
+            return self.call('GET', 'jobs/status.json')
+
+        entity, _sep, action = (name or '').partition(':')
+        spec = API_ENTITIES.get(entity)
+        if spec is None or action not in ('get', 'list', 'create', 'update'):
+            raise MultiflexiCliError(f"'{name}' is not available with transport=api, use transport=cli")
+        filters = dict((key.replace('-', '_'), value) for key, value in options.items()
+                       if key not in CONTROL_OPTIONS)
+        if action == 'list' and 'company' in filters:
+            # The API returns company ids only, so slugs cannot be filtered on.
+            if not str(filters['company']).isdigit():
+                raise MultiflexiCliError(f"'{name} --company' needs a company id with transport=api")
+            filters['company_id'] = filters.pop('company')
+
+        if action == 'get' and 'id' in filters:
+            record = self.call('GET', f"{spec.record}/{filters['id']}.json")
+            return self._project(record, options)
+
+        if action in ('get', 'list'):
+            query = None
+            if options.get('limit') and not options.get('offset') and not options.get('order') and not filters:
+                query = {'limit': options['limit']}
+            records = self.call('GET', f"{spec.collection}.json", query=query) or []
+            records = [record for record in records if _matches(record, filters)]
+            if options.get('order'):
+                records.sort(key=lambda record: int(record.get('id') or 0), reverse=options['order'] == 'D')
+            if action == 'get':
+                if not records:
+                    raise MultiflexiApiError(f"{entity} not found", 404)
+                return self._project(records[0] if len(records) == 1 else records, options)
+            offset = int(options.get('offset') or 0)
+            limit = int(options['limit']) if options.get('limit') else None
+            records = records[offset:offset + limit if limit else None]
+            return self._project(records, options)
+
+        record_id = filters.pop('id', None)
+        if spec.save is None:
+            if action == 'create' or record_id is None:
+                raise MultiflexiCliError(f"'{name}' is not available with transport=api, use transport=cli")
+            return self.call('POST', f"{spec.record}/{record_id}.json", body=filters)
+        query = {spec.id_param: record_id} if record_id is not None else None
+        return self.call('POST', spec.save, query=query, body=filters)
+
+    @staticmethod
+    def _project(data, options):
+        fields = options.get('fields')
+        if not fields or fields is True:
+            return data
+        names = [field.strip() for field in fields.split(',')]
+        if isinstance(data, list):
+            return [dict((key, item.get(key)) for key in names) for item in data]
+        if isinstance(data, dict):
+            return dict((key, data.get(key)) for key in names)
+        return data
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Persistent SQLite cache of read-mostly MultiFlexi lookups.
+
+The same database file is used by the ``vitexus.multiflexi.multiflexi``
+cache plugin on the controller and by modules (``multiflexi_cache_path``),
+so entities resolved once are reused across tasks, hosts and playbook runs.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Entities whose lookups are cached, they change rarely compared to how often
+# they are resolved. Any write command on the entity invalidates its entries.
+CACHED_ENTITIES = ('application', 'company', 'credential', 'credential-type', 'credential-prototype')
+
+# Reads never written to the cache file, a credential carries its field values
+UNCACHED_COMMANDS = ('credential:get',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS multiflexi_cache (
+    key TEXT PRIMARY KEY,
+    entity TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored REAL NOT NULL
+)
+"""
+
+
+class EntityCache(object):
+    """Key/value store with a TTL, grouped by entity for invalidation."""
+
+    def __init__(self, path, ttl=3600):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Many forks may share the file; wait for locks instead of failing.
+        # The connection is shared by the worker threads of one module.
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(SCHEMA)
+
+    def _fresh_since(self):
+        return time.time() - self.ttl if self.ttl else 0
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def get(self, key):
+        """Return the cached value or None when missing or expired."""
+        rows = self._execute('SELECT value FROM multiflexi_cache WHERE key = ? AND stored >= ?',
+                             (key, self._fresh_since()))
+        return json.loads(rows[0][0]) if rows else None
+
+    def set(self, key, value, entity=''):
+        self._execute('INSERT OR REPLACE INTO multiflexi_cache (key, entity, value, stored) VALUES (?, ?, ?, ?)',
+                      (key, entity, json.dumps(value), time.time()))
+
+    def delete(self, key):
+        self._execute('DELETE FROM multiflexi_cache WHERE key = ?', (key,))
+
+    def keys(self, entity=None):
+        if entity is None:
+            rows = self._execute('SELECT key FROM multiflexi_cache WHERE stored >= ?', (self._fresh_since(),))
+        else:
+            rows = self._execute('SELECT key FROM multiflexi_cache WHERE entity = ? AND stored >= ?',
+                                 (entity, self._fresh_since()))
+        return [row[0] for row in rows]
+
+    def invalidate(self, entity=None):
+        """Drop all entries of one entity, or everything."""
+        if entity is None:
+            self._execute('DELETE FROM multiflexi_cache')
+        else:
+            self._execute('DELETE FROM multiflexi_cache WHERE entity = ?', (entity,))
+
+    def close(self):
+        self._db.close()
+
+
+def cache_entity(args):
+    """Return the cached entity a command line reads or writes, or None."""
+    for arg in args[1:]:
+        if not arg.startswith('-'):
+            entity = arg.split(':', 1)[0]
+            return entity if entity in CACHED_ENTITIES and arg not in UNCACHED_COMMANDS else None
+    return None
+
+
+def cache_key(args, instance=''):
+    """Cache key of a command line run against one MultiFlexi ``instance``.
+
+    The instance (API URL, or host and binary) keeps the answers of several
+    instances sharing one cache file apart.
+    """
+    return 'cli:' + json.dumps([instance] + [str(arg) for arg in args[1:]])
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Shared multiflexi-cli executor used by all vitexus.multiflexi modules."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import socket
+import subprocess
+import threading
+import time
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cache import cache_entity, cache_key
+
+
+# Actions (the part after ':' in "entity:action") that never modify data.
+READ_ACTIONS = ('get', 'list', 'overview', 'status', 'list-credentials', 'show-config')
+
+# Options whose values are secrets, never shown in debug output. Any option
+# ending in "password" is treated the same way. The output of commands
+# passing secrets, or printing them, is not shown either.
+SECRET_OPTIONS = ('token', 'secret', 'plaintext')
+SECRET_COMMANDS = ('token:generate', 'token:list', 'token:get')
+
+# Subcommand starting a long-lived worker which reads one JSON request per
+# line on stdin ({"args": [...]}) and answers with one JSON line on stdout
+# ({"exitcode": 0, "stdout": "...", "stderr": "..."}). The worker announces
+# itself with a {"ready": true} line right after start.
+WORKER_COMMAND = 'worker'
+
+
+class MultiflexiCliError(Exception):
+    """multiflexi-cli could not be run or exited with a non-zero status."""
+
+    def __init__(self, message, rc=None, stdout='', stderr=''):
+        super(MultiflexiCliError, self).__init__(message)
+        self.rc = rc
+        self.stdout = stdout or ''
+        self.stderr = stderr or ''
+
+
+class MultiflexiCliTimeout(MultiflexiCliError):
+    """multiflexi-cli was killed after running longer than the timeout of the call."""
+
+
+def subcommand(args):
+    """Return the multiflexi-cli subcommand (e.g. ``job:list``) of a command line."""
+    for arg in args[1:]:
+        if not arg.startswith('-'):
+            return arg
+    return None
+
+
+def redact(args):
+    """Return a command line as text with the values of secret options masked."""
+    shown = []
+    masked = False
+    for arg in args:
+        if masked:
+            shown.append('********')
+            masked = False
+            continue
+        key, eq, _value = arg[2:].partition('=') if arg.startswith('--') else ('', '', '')
+        secret = key in SECRET_OPTIONS or key.endswith('password')
+        if secret and eq:
+            shown.append(f'--{key}=********')
+        else:
+            shown.append(arg)
+            masked = secret
+    return ' '.join(shown)
+
+
+def shows_secrets(args):
+    """Return True when a command line passes or prints a secret."""
+    return subcommand(args) in SECRET_COMMANDS or redact(args) != ' '.join(args)
+
+
+def is_read_command(args):
+    """Return True when the command line only reads data."""
+    name = subcommand(args)
+    return name is not None and name.rsplit(':', 1)[-1] in READ_ACTIONS
+
+
+class CallTimings(object):
+    """Commands executed for one task with their duration, exit code and output size.
+
+    Only subcommand names are kept, never arguments, so nothing passed to
+    the CLI (passwords, tokens) ends up in the module result.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.memo_hits = 0
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+
+    def add(self, args, duration, rc, stdout):
+        with self._lock:
+            self.calls.append(dict(command=subcommand(args), duration=round(duration, 4), rc=rc,
+                                   bytes=len(stdout or '')))
+
+    def hit(self, cache=False):
+        with self._lock:
+            if cache:
+                self.cache_hits += 1
+            else:
+                self.memo_hits += 1
+
+    def as_dict(self):
+        with self._lock:
+            return dict(
+                count=len(self.calls),
+                total=round(sum(call['duration'] for call in self.calls), 4),
+                memo_hits=self.memo_hits,
+                cache_hits=self.cache_hits,
+                calls=list(self.calls),
+            )
+
+
+class MultiflexiCli(object):
+    """Run multiflexi-cli commands on behalf of one module invocation.
+
+    Output of read-only commands is memoized until the next write command,
+    so repeated lookups of the same record within a task cost one process.
+    With ``worker`` enabled all commands go to a single long-lived
+    ``multiflexi-cli worker`` process instead of bootstrapping PHP per call.
+    With ``api`` (a ``MultiflexiApi``) the commands are answered by the
+    MultiFlexi REST API instead of a local multiflexi-cli.
+    With ``cache`` (an ``EntityCache``) lookups of read-mostly entities are
+    answered from the persistent cache without running any command.
+    With ``timings`` (a ``CallTimings``) every executed command is recorded,
+    with ``tracer`` (an ``otel.Tracer``) it becomes an OpenTelemetry span.
+    """
+
+    def __init__(self, module=None, worker=False, api=None, cache=None, timings=None, tracer=None):
+        self.module = module
+        self.worker = worker
+        self.api = api
+        self.cache = cache
+        self.timings = timings
+        self.tracer = tracer
+        self._worker_proc = None
+        self._memo = {}
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _debug(self, msg):
+        if self.module is not None and getattr(self.module, '_verbosity', 0) >= 2:
+            self.module.warn(msg)
+
+    def run(self, args, allow_not_found=False, cached=True, timeout=None):
+        """Run a command line (binary first) and return its stdout.
+
+        When ``allow_not_found`` is set, a failing command whose JSON output
+        has ``status: not found`` returns that output instead of raising.
+        With ``cached`` False a read is always run and its output not kept,
+        e.g. when polling or paging.
+        With ``timeout`` (seconds) the command is killed when it runs longer
+        and ``MultiflexiCliTimeout`` is raised.
+        """
+        args = [str(arg) for arg in args]
+        key = tuple(args)
+        read = is_read_command(args)
+        if read and cached and key in self._memo:
+            self._debug(f"Reusing CLI output of: {redact(args)}")
+            if self.timings is not None:
+                self.timings.hit()
+            return self._memo[key]
+        entity = cache_entity(args) if self.cache is not None else None
+        if read and cached and entity:
+            stored = self.cache.get(cache_key(args, self._instance(args)))
+            if stored is not None:
+                self._debug(f"Using cached output of: {redact(args)}")
+                if self.timings is not None:
+                    self.timings.hit(cache=True)
+                self._memo[key] = stored
+                return stored
+
+        self._debug(f"Running CLI command: {redact(args)}")
+        debug_output = not shows_secrets(args)
+        started = time.time()
+        try:
+            rc, stdout, stderr = self.execute(args, timeout)
+        except MultiflexiCliError as e:
+            if self.tracer is not None:
+                self.tracer.record_call(args, started, time.time(), transport=self._transport(), error=e)
+            raise
+        if self.timings is not None:
+            self.timings.add(args, time.time() - started, rc, stdout)
+        if self.tracer is not None:
+            self.tracer.record_call(args, started, time.time(), rc, stdout, self._transport())
+        if not read:
+            self._memo.clear()
+            self._indexes.clear()
+            if entity:
+                self.cache.invalidate(entity)
+
+        if rc == 0:
+            if debug_output:
+                self._debug(f"CLI stdout: {stdout.strip()}")
+            if stderr.strip():
+                self._debug(f"CLI stderr: {stderr.strip()}")
+            if read:
+                if cached:
+                    self._memo[key] = stdout
+                if entity:
+                    self.cache.set(cache_key(args, self._instance(args)), stdout, entity)
+            return stdout
+
+        self._debug(f"CLI error: {stderr.strip()}")
+        if stdout.strip() and debug_output:
+            self._debug(f"CLI stdout (on error): {stdout.strip()}")
+        try:
+            data = json.loads(stdout)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            if allow_not_found and data.get('status') == 'not found':
+                return stdout
+            message = data.get('message')
+        else:
+            message = None
+        detail = message or stderr.strip() or stdout.strip() or f"exit code {rc}"
+        raise MultiflexiCliError(f"multiflexi-cli error: {detail}", rc=rc, stdout=stdout, stderr=stderr)
+
+    def run_json(self, args, allow_not_found=False, cached=True, timeout=None):
+        """Run a command line and return its stdout parsed as JSON."""
+        return json.loads(self.run(args, allow_not_found=allow_not_found, cached=cached, timeout=timeout))
+
+    def index(self, args, key):
+        """Run a list command once and return its records as a ``{key: record}`` dict.
+
+        The index is kept until the next write command, so any number of
+        lookups within a task cost one list call and a dict access each.
+        Pass ``--fields`` in ``args`` to transfer only the columns needed.
+        """
+        args = [str(arg) for arg in args]
+        cache_key = (tuple(args), key)
+        if cache_key not in self._indexes:
+            records = self.run_json(args)
+            self._indexes[cache_key] = dict(
+                (str(record.get(key)), record) for record in (records if isinstance(records, list) else [])
+                if isinstance(record, dict) and record.get(key) is not None)
+        return self._indexes[cache_key]
+
+    def iter_pages(self, args, page_size, limit=None):
+        """Yield every page of a list command fetched with ``--limit``/``--offset``.
+
+        One page is yielded per command run, including the empty page
+        ending the list, so callers can count the calls while paging.
+        Pages are not memoized. Stops after ``limit`` records when given.
+        """
+        args = [str(arg) for arg in args]
+        offset = 0
+        first_id = None
+        while limit is None or offset < limit:
+            size = page_size if limit is None else min(page_size, limit - offset)
+            page = self.run_json(args + ['--limit', str(size), '--offset', str(offset)], cached=False)
+            if not isinstance(page, list) or not page:
+                yield []
+                return
+            page_first = page[0].get('id') if isinstance(page[0], dict) else None
+            if not offset:
+                first_id = page_first
+            elif page_first is not None and page_first == first_id:
+                # An old CLI ignoring --offset would repeat the first page forever
+                raise MultiflexiCliError(f"{subcommand(args)} does not support --offset, unable to page through it")
+            yield page
+            offset += len(page)
+            if len(page) < size:
+                return
+
+    def iter_records(self, args, page_size, limit=None):
+        """Yield the records of a list command page by page, see ``iter_pages``.
+
+        Only one page is held in memory at a time, so arbitrarily long lists
+        are processed in constant memory.
+        """
+        for page in self.iter_pages(args, page_size, limit):
+            for record in page:
+                yield record
+
+    def _instance(self, args):
+        """Identity of the MultiFlexi instance a command line is run against."""
+        if self.api is not None:
+            return self.api.url.rstrip('/')
+        return f"{socket.gethostname()}:{args[0]}"
+
+    def _transport(self):
+        if self.api is not None:
+            return 'api'
+        return 'worker' if self.worker else 'cli'
+
+    def execute(self, args, timeout=None):
+        """Run a command line and return ``(rc, stdout, stderr)``."""
+        if self.api is not None:
+            return self.api.execute(args)
+        # A command handed to the shared worker cannot be interrupted alone
+        if self.worker and not timeout:
+            response = self._worker_call(args)
+            if response is not None:
+                return response
+        try:
+            proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise MultiflexiCliTimeout(f"multiflexi-cli error: {subcommand(args)} timed out after {timeout:g}s")
+        except OSError as e:
+            raise MultiflexiCliError(f"Failed to run {args[0]}: {e}")
+        return proc.returncode, proc.stdout, proc.stderr
+
+    def _start_worker(self, binary):
+        if self._worker_proc is not None:
+            return self._worker_proc
+        try:
+            proc = subprocess.Popen([binary, WORKER_COMMAND], stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    text=True, bufsize=1)
+        except OSError as e:
+            self._disable_worker(str(e))
+            return None
+        self._worker_proc = proc
+        try:
+            hello = json.loads(proc.stdout.readline())
+        except ValueError:
+            hello = None
+        if not isinstance(hello, dict) or not hello.get('ready'):
+            self._disable_worker(f"'{binary} {WORKER_COMMAND}' is not available")
+            return None
+        return proc
+
+    def _worker_call(self, args):
+        # Returns None when the command should be run as a separate process.
+        with self._lock:
+            proc = self._start_worker(args[0])
+            if proc is None:
+                return None
+            try:
+                proc.stdin.write(json.dumps({'args': list(args[1:])}) + '\n')
+                proc.stdin.flush()
+            except OSError as e:
+                self._disable_worker(str(e))
+                return None
+            # The command was handed over; never re-run it on a broken reply.
+            try:
+                reply = json.loads(proc.stdout.readline())
+                return int(reply['exitcode']), reply.get('stdout') or '', reply.get('stderr') or ''
+            except (OSError, ValueError, KeyError, TypeError):
+                self._disable_worker('worker stopped responding')
+                raise MultiflexiCliError(
+                    f"multiflexi-cli worker stopped responding while running: {redact(args[1:])}")
+
+    def _disable_worker(self, reason):
+        self.worker = False
+        self._stop_worker()
+        if self.module is not None:
+            self.module.warn(f"multiflexi-cli worker disabled ({reason}), running one process per command")
+
+    def _stop_worker(self):
+        proc, self._worker_proc = self._worker_proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+
+    def close(self):
+        """Stop the worker process, close API connections and the cache, if any."""
+        with self._lock:
+            self._stop_worker()
+        if self.api is not None:
+            self.api.close()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
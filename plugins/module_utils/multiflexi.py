@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Common base for vitexus.multiflexi modules."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import socket
+import sqlite3
+import time
+from datetime import datetime
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.api import MultiflexiApi
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cache import EntityCache
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import (
+    CallTimings,
+    MultiflexiCli,
+    MultiflexiCliError,
+    is_read_command,
+)
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.otel import SERVICE_NAME, OtlpExporter, Tracer
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.parallel import run_parallel
+
+
+# Timestamp formats of dates in MultiFlexi records (begin, end, schedule, ...).
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S%z')
+
+
+def parse_time(value):
+    """Parse a MultiFlexi timestamp into a naive local datetime, None when empty or unknown."""
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(str(value), fmt)
+        except ValueError:
+            continue
+        return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+    return None
+
+
+def ping(cli, cli_path='multiflexi-cli'):
+    """Check that MultiFlexi answers with the cheapest call of the transport, return the round trip in seconds.
+
+    Over the REST API it is ``GET /ping``. multiflexi-cli has no ping, so
+    the id of one company is listed, which boots the CLI and queries the
+    database without scanning any large table.
+    """
+    started = time.time()
+    if cli.api is not None:
+        cli.run([cli_path, 'ping'], cached=False)
+    else:
+        cli.run([cli_path, 'company:list', '--fields', 'id', '--limit', '1', '--format', 'json'], cached=False)
+    return round(time.time() - started, 4)
+
+
+def multiflexi_argument_spec():
+    """Options shared by all modules, documented in the ``vitexus.multiflexi.cli`` doc fragment."""
+    return dict(
+        multiflexi_cli_worker=dict(type='bool', required=False, default=False,
+                                   fallback=(env_fallback, ['MULTIFLEXI_CLI_WORKER'])),
+        multiflexi_cache_path=dict(type='path', required=False, fallback=(env_fallback, ['MULTIFLEXI_CACHE_PATH'])),
+        multiflexi_cache_ttl=dict(type='int', required=False, default=3600,
+                                  fallback=(env_fallback, ['MULTIFLEXI_CACHE_TTL'])),
+        multiflexi_timings=dict(type='bool', required=False, default=False,
+                                fallback=(env_fallback, ['MULTIFLEXI_TIMINGS'])),
+        multiflexi_otlp_endpoint=dict(type='str', required=False,
+                                      fallback=(env_fallback, ['MULTIFLEXI_OTLP_ENDPOINT'])),
+        multiflexi_otlp_timeout=dict(type='float', required=False, default=1.0,
+                                     fallback=(env_fallback, ['MULTIFLEXI_OTLP_TIMEOUT'])),
+    )
+
+
+def multiflexi_api_argument_spec():
+    """Transport options, documented in the ``vitexus.multiflexi.api`` doc fragment."""
+    return dict(
+        transport=dict(type='str', required=False, default='cli', choices=['cli', 'api'],
+                       fallback=(env_fallback, ['MULTIFLEXI_TRANSPORT'])),
+        api_url=dict(type='str', required=False, fallback=(env_fallback, ['MULTIFLEXI_API_URL'])),
+        api_username=dict(type='str', required=False, fallback=(env_fallback, ['MULTIFLEXI_API_USERNAME'])),
+        api_password=dict(type='str', required=False, no_log=True,
+                          fallback=(env_fallback, ['MULTIFLEXI_API_PASSWORD'])),
+        api_timeout=dict(type='int', required=False, default=30),
+        validate_certs=dict(type='bool', required=False, default=True),
+    )
+
+
+def multiflexi_parallel_argument_spec():
+    """Concurrency options, documented in the ``vitexus.multiflexi.parallel`` doc fragment."""
+    return dict(
+        max_workers=dict(type='int', required=False, default=1, fallback=(env_fallback, ['MULTIFLEXI_MAX_WORKERS'])),
+    )
+
+
+class MultiflexiModule(AnsibleModule):
+    """AnsibleModule with the shared multiflexi-cli executor available as ``self.cli``.
+
+    Modules passing ``api_transport=True`` also accept the options of the
+    ``vitexus.multiflexi.api`` doc fragment and can talk to the REST API.
+    Modules passing ``parallel=True`` accept ``max_workers`` and run bulk
+    operations through ``run_parallel``/``run_commands``.
+    """
+
+    def __init__(self, argument_spec, api_transport=False, parallel=False, **kwargs):
+        spec = multiflexi_argument_spec()
+        if api_transport:
+            spec.update(multiflexi_api_argument_spec())
+        if parallel:
+            spec.update(multiflexi_parallel_argument_spec())
+        spec.update(argument_spec)
+        super(MultiflexiModule, self).__init__(argument_spec=spec, **kwargs)
+        api = None
+        if api_transport and self.params['transport'] == 'api':
+            if not self.params['api_url']:
+                self.fail_json(msg="api_url is required when transport is 'api'")
+            try:
+                api = MultiflexiApi(self.params['api_url'], self.params['api_username'],
+                                    self.params['api_password'], self.params['validate_certs'],
+                                    self.params['api_timeout'])
+            except MultiflexiCliError as e:
+                self.fail_json(msg=str(e))
+        cache = None
+        if self.params['multiflexi_cache_path']:
+            try:
+                cache = EntityCache(self.params['multiflexi_cache_path'], self.params['multiflexi_cache_ttl'])
+            except (OSError, sqlite3.Error) as e:
+                self.warn(f"MultiFlexi cache {self.params['multiflexi_cache_path']} disabled: {e}")
+        timings = CallTimings() if self.params['multiflexi_timings'] else None
+        tracer = None
+        if self.params['multiflexi_otlp_endpoint']:
+            exporter = OtlpExporter(self.params['multiflexi_otlp_endpoint'],
+                                    {'service.name': SERVICE_NAME, 'host.name': socket.gethostname()},
+                                    timeout=self.params['multiflexi_otlp_timeout'])
+            tracer = Tracer(exporter, self._name, {'ansible.module': self._name, 'ansible.check_mode': self.check_mode})
+        self.cli = MultiflexiCli(self, worker=self.params['multiflexi_cli_worker'], api=api, cache=cache,
+                                 timings=timings, tracer=tracer)
+
+    def run_parallel(self, func, items):
+        """Run ``func`` over ``items`` with up to ``max_workers`` threads, see ``parallel.run_parallel``."""
+        if self.params.get('max_workers', 1) < 1:
+            self.fail_json(msg="max_workers must be at least 1")
+        return run_parallel(func, items, self.params.get('max_workers', 1))
+
+    def run_commands(self, commands):
+        """Run independent CLI command lines concurrently, return a ``TaskResult`` (stdout) per command.
+
+        In check mode only read commands are run; writes are skipped with
+        ``result`` None, so callers report them as would-be changes.
+        """
+        def run(args):
+            if self.check_mode and not is_read_command([str(arg) for arg in args]):
+                return None
+            return self.cli.run(args)
+        return self.run_parallel(run, commands)
+
+    def _close_cli(self, result, error=None):
+        # fail_json may be called by AnsibleModule.__init__ before self.cli exists
+        cli = getattr(self, 'cli', None)
+        if cli is not None:
+            cli.close()
+            if cli.timings is not None:
+                result['timings'] = cli.timings.as_dict()
+            if cli.tracer is not None:
+                cli.tracer.finish({'ansible.changed': bool(result.get('changed'))}, error)
+
+    def exit_json(self, **kwargs):
+        self._close_cli(kwargs)
+        super(MultiflexiModule, self).exit_json(**kwargs)
+
+    def fail_json(self, msg, **kwargs):
+        self._close_cli(kwargs, error=msg)
+        super(MultiflexiModule, self).fail_json(msg, **kwargs)
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""OpenTelemetry spans of module runs, exported over OTLP/HTTP with JSON encoding.
+
+Each module run becomes a span with one child span per multiflexi-cli (or
+REST API) call. Spans are sent in batches from a background thread to an
+OTLP receiver such as the collector deployed by the ``otel_collector`` role
+(``http://127.0.0.1:4318``). Only the standard library is used, so nothing
+has to be installed on the managed hosts.
+
+Export is best effort: errors are swallowed and the final flush is bounded
+by ``timeout``, so tracing never fails a task nor noticeably slows it down.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import socket
+import threading
+import time
+
+from ansible.module_utils.six.moves import http_client, queue
+from ansible.module_utils.six.moves.urllib.parse import urlsplit
+
+
+SCOPE_NAME = 'vitexus.multiflexi'
+SERVICE_NAME = 'ansible-multiflexi'
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Options whose values identify the records a command works on. Logins and
+# emails are personal data and never leave the host.
+ID_OPTIONS = ('id', 'uuid', 'slug', 'company_id', 'app_id', 'runtemplate_id', 'user_id', 'job_id')
+
+
+def _random_hex(size):
+    return os.urandom(size).hex()
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return dict(key=key, value=dict(boolValue=value))
+    if isinstance(value, int):
+        return dict(key=key, value=dict(intValue=str(value)))
+    if isinstance(value, float):
+        return dict(key=key, value=dict(doubleValue=value))
+    return dict(key=key, value=dict(stringValue=str(value)))
+
+
+def parse_traceparent(value):
+    """Return ``(trace_id, span_id)`` of a W3C ``traceparent`` header, or None."""
+    parts = (value or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+def command_attributes(args):
+    """Span attributes describing a multiflexi-cli command line, never including secrets."""
+    attributes = {}
+    name = None
+    rest = [str(arg) for arg in args[1:]]
+    for i, arg in enumerate(rest):
+        if arg.startswith('--'):
+            key, eq, value = arg[2:].partition('=')
+            if not eq:
+                value = rest[i + 1] if i + 1 < len(rest) and not rest[i + 1].startswith('--') else ''
+            if key in ID_OPTIONS and value:
+                attributes[f'multiflexi.{key}'] = value
+        elif name is None and (i == 0 or not rest[i - 1].startswith('--')):
+            name = arg
+    entity, _sep, action = (name or '').partition(':')
+    attributes['multiflexi.command'] = name or ''
+    attributes['multiflexi.entity'] = entity
+    attributes['multiflexi.action'] = action
+    return name or 'multiflexi-cli', attributes
+
+
+class Span(object):
+    """A finished or running span, serialized to the OTLP JSON form by ``as_otlp``."""
+
+    def __init__(self, name, trace_id, parent_id=None, kind=SPAN_KIND_INTERNAL, attributes=None, start=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _random_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start = time.time() if start is None else start
+        self.end = None
+        self.error = None
+
+    def finish(self, end=None, error=None):
+        self.end = time.time() if end is None else end
+        self.error = error
+
+    def as_otlp(self):
+        span = dict(
+            traceId=self.trace_id,
+            spanId=self.span_id,
+            name=self.name,
+            kind=self.kind,
+            startTimeUnixNano=str(int(self.start * 1e9)),
+            endTimeUnixNano=str(int((self.end or time.time()) * 1e9)),
+            attributes=[_attribute(key, value) for key, value in sorted(self.attributes.items())],
+            status=dict(code=STATUS_ERROR, message=str(self.error)) if self.error else dict(code=STATUS_OK),
+        )
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class OtlpExporter(object):
+    """Queue spans and POST them in batches to ``<endpoint>/v1/traces``."""
+
+    def __init__(self, endpoint, resource=None, batch_size=64, timeout=1.0):
+        parts = urlsplit(endpoint)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path.rstrip('/')
+        if not self.path.endswith('/v1/traces'):
+            self.path += '/v1/traces'
+        self.resource = dict(resource or {})
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.exported = 0
+        self.failed = 0
+        self._pending = []
+        self._queue = queue.Queue()
+        self._broken = parts.scheme not in ('http', 'https') or not parts.hostname
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            if self._broken:
+                return
+            self._pending.append(span)
+            if len(self._pending) < self.batch_size:
+                return
+            batch, self._pending = self._pending, []
+        self._submit(batch)
+
+    def _submit(self, batch):
+        self._queue.put(batch)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work, name='multiflexi-otlp')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _work(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if not self._broken:
+                self._post(batch)
+
+    def _payload(self, batch):
+        return dict(resourceSpans=[dict(
+            resource=dict(attributes=[_attribute(key, value) for key, value in sorted(self.resource.items())]),
+            scopeSpans=[dict(scope=dict(name=SCOPE_NAME), spans=[span.as_otlp() for span in batch])],
+        )])
+
+    def _post(self, batch):
+        connection_class = http_client.HTTPSConnection if self.scheme == 'https' else http_client.HTTPConnection
+        connection = connection_class(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request('POST', self.path, body=json.dumps(self._payload(batch)),
+                               headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 300:
+                raise http_client.HTTPException(f"HTTP {response.status}")
+            self.exported += len(batch)
+        except (OSError, socket.timeout, http_client.HTTPException, ValueError):
+            # One failure means the collector is down or misconfigured, stop trying.
+            self.failed += len(batch)
+            self._broken = True
+        finally:
+            connection.close()
+
+    def shutdown(self):
+        """Send the remaining spans, waiting at most ``timeout`` seconds in total."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._submit(batch)
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(self.timeout)
+
+
+class Tracer(object):
+    """Spans of one module run: a root span and a client span per CLI/API call.
+
+    The trace continues the one given in the ``TRACEPARENT`` environment
+    variable, if any, so module spans nest under a traced playbook.
+    """
+
+    def __init__(self, exporter, name, attributes=None, traceparent=None):
+        self.exporter = exporter
+        parent = parse_traceparent(traceparent if traceparent is not None else os.environ.get('TRACEPARENT'))
+        trace_id, parent_id = parent if parent else (_random_hex(16), None)
+        self.root = Span(name, trace_id, parent_id, attributes=attributes)
+
+    def record_call(self, args, start, end, rc=None, stdout='', transport='cli', error=None):
+        name, attributes = command_attributes(args)
+        attributes['multiflexi.transport'] = transport
+        attributes['multiflexi.bytes'] = len(stdout or '')
+        if rc is not None:
+            attributes['multiflexi.rc'] = rc
+        span = Span(name, self.root.trace_id, self.root.span_id, SPAN_KIND_CLIENT, attributes, start)
+        span.finish(end, error or (f"exit code {rc}" if rc else None))
+        self.exporter.add(span)
+
+    def finish(self, attributes=None, error=None):
+        """End the root span and flush all spans to the collector."""
+        self.root.attributes.update(attributes or {})
+        self.root.finish(error=error)
+        self.exporter.add(self.root)
+        self.exporter.shutdown()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Bounded concurrency for independent multiflexi-cli operations of one module call."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+
+
+# Outcome of one operation: its input item, the returned value and the
+# MultiflexiCliError raised by it (None on success).
+TaskResult = namedtuple('TaskResult', ['item', 'result', 'error'])
+
+
+def run_parallel(func, items, max_workers=1):
+    """Call ``func(item)`` for every item, at most ``max_workers`` at once.
+
+    Results come back as ``TaskResult`` in the order of ``items`` whatever
+    the order of completion, so module output is deterministic. Errors of
+    single operations are collected instead of aborting the others; any
+    other exception is a bug and propagates.
+    """
+    items = list(items)
+
+    def call(item):
+        try:
+            return TaskResult(item, func(item), None)
+        except MultiflexiCliError as e:
+            return TaskResult(item, None, e)
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(call, items))
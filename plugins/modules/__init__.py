@@ -9,9 +9,11 @@
 # - company: Manage companies and settings
 # - company_info: Get company information
 # - companyapp: Manage company-application relationships
+# - companyapp_sync: Synchronize the company-application assignment matrix
 # - credential: Manage credential instances
 # - credential_type: Manage credential types with JSON operations
 # - encryption: Manage encryption keys and status
+# - eventrule_sync: Synchronize the set of event rules
 # - job: Manage job execution and scheduling
 # - multiflexi_info: Get MultiFlexi system information
 # - multiflexi_status: Get comprehensive system status
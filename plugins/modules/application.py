@@ -12,12 +12,20 @@ short_description: Manage applications in Multiflexi
 
 description:
     - This module allows you to create, update, get, and delete applications in Multiflexi using the multiflexi-cli.
+    - With O(directory) it imports a whole tree of application definition JSON files. The SHA-256 of every
+      imported file is remembered per application UUID in O(hash_store), so unchanged files are skipped
+      and changed ones are imported again.
 
 author:
     - Vitex (@Vitexus)
 
 version_added: "2.1.0"
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.api
+    - vitexus.multiflexi.parallel
+
 options:
     state:
         description:
@@ -81,6 +89,33 @@ options:
             - Requirements.
         required: false
         type: str
+    directory:
+        description:
+            - Directory with application definition JSON files to import.
+            - Files are selected with O(pattern); each has to contain the application C(uuid).
+        required: false
+        type: path
+    pattern:
+        description:
+            - Glob selecting the files in O(directory), C(**) matches subdirectories.
+        required: false
+        type: str
+        default: '**/*.json'
+    hash_store:
+        description:
+            - JSON file keeping the content hash of the last imported definition of every application UUID.
+            - Used by O(directory) and O(file) imports to detect changed definitions.
+        required: false
+        type: path
+        default: ~/.cache/multiflexi/application-hashes.json
+    verify:
+        description:
+            - Check with one C(application:list) call that applications with a known hash still exist,
+              and import them again when they were removed.
+            - When disabled, a run where no file changed makes no CLI call at all.
+        required: false
+        type: bool
+        default: true
 """
 
 EXAMPLES = """
@@ -105,6 +140,13 @@ EXAMPLES = """
       vitexus.multiflexi.application:
         state: present
         file: /path/to/app.json
+
+    - name: Import all application definitions, skipping unchanged ones
+      vitexus.multiflexi.application:
+        state: present
+        directory: /usr/share/multiflexi/multiflexi
+        pattern: "*.multiflexi.app.json"
+        max_workers: 4
 """
 
 RETURN = """
@@ -120,42 +162,128 @@ RETURN = """
         description: The application data.
         type: dict
         returned: when state is present or get
+    apps:
+        description:
+            - Outcome for every file of O(directory), sorted by path.
+            - C(action) is one of V(created), V(updated), V(unchanged) or V(failed).
+        type: list
+        elements: dict
+        returned: when O(directory) is used
+        sample: [{"file": "/srv/apps/probe.json", "uuid": "b6e2c4f5", "action": "unchanged", "sha256": "9f86d0..."}]
+    summary:
+        description: Number of O(directory) files per action.
+        type: dict
+        returned: when O(directory) is used
+        sample: {"created": 1, "unchanged": 119}
 """
 
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
+import glob
+import hashlib
 import json
 import os
+import tempfile
+
 
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-def run_cli_command(args, module=None, allow_not_found=False):
-    if module and module._verbosity >= 2:
-        module.warn(f"Running CLI command: {' '.join(args)}")
+
+def load_hashes(path):
     try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        if module and module._verbosity >= 2:
-            module.warn(f"CLI stdout: {result.stdout.strip()}")
-            if result.stderr.strip():
-                module.warn(f"CLI stderr: {result.stderr.strip()}")
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        stdout = e.stdout.strip() if hasattr(e, 'stdout') and e.stdout else ''
-        stderr = e.stderr.strip() if hasattr(e, 'stderr') and e.stderr else ''
-        if module and module._verbosity >= 2:
-            module.warn(f"CLI error: {stderr}")
-            if stdout:
-                module.warn(f"CLI stdout (on error): {stdout}")
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_hashes(module, path, hashes):
+    # Write to a temporary file and rename, so an interrupted run never leaves a broken store
+    directory = os.path.dirname(path)
+    tmp = None
+    try:
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, tmp = tempfile.mkstemp(dir=directory or '.', prefix='.application-hashes')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(hashes, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as e:
+        if tmp and os.path.exists(tmp):
+            os.unlink(tmp)
+        module.fail_json(msg=f"Unable to write hash_store {path}: {e}")
+
+
+def import_directory(module, cli_base, result):
+    directory = module.params['directory']
+    if not os.path.isdir(directory):
+        module.fail_json(msg=f"Directory {directory} does not exist")
+    hash_store = module.params['hash_store']
+    hashes = load_hashes(hash_store)
+
+    existing = None
+    if module.params['verify']:
+        try:
+            existing = module.cli.index(cli_base + ['application:list', '--fields', 'id,uuid', '--format', 'json'], 'uuid')
+        except MultiflexiCliError as e:
+            module.fail_json(msg=str(e))
+
+    outcomes = []
+    imports = []
+    seen = {}
+    for path in sorted(glob.glob(os.path.join(directory, module.params['pattern']), recursive=True)):
+        outcome = dict(file=path, uuid=None, action='unchanged')
+        outcomes.append(outcome)
         try:
-            if stdout:
-                data = json.loads(stdout)
-                if allow_not_found and isinstance(data, dict) and data.get('status') == 'not found':
-                    return stdout
-                if isinstance(data, dict) and data.get('message'):
-                    raise Exception(f"multiflexi-cli error: {data.get('message')}")
-        except Exception:
-            pass
-        raise Exception(f"multiflexi-cli error: {stderr or stdout or str(e)}")
+            digest = file_sha256(path)
+            with open(path, 'r') as f:
+                uuid = json.load(f).get('uuid')
+        except (OSError, ValueError, AttributeError) as e:
+            outcome.update(action='failed', msg=f"Cannot read application definition: {e}")
+            continue
+        outcome.update(uuid=uuid, sha256=digest)
+        if not uuid:
+            outcome.update(action='failed', msg="Application definition has no uuid")
+            continue
+        if uuid in seen:
+            outcome.update(action='failed', msg=f"uuid {uuid} is also defined in {seen[uuid]}")
+            continue
+        seen[uuid] = path
+
+        known = hashes.get(uuid, {}).get('sha256') == digest
+        if existing is None:
+            exists = uuid in hashes
+        else:
+            exists = uuid in existing
+        if known and exists:
+            continue
+        outcome['action'] = 'updated' if exists else 'created'
+        imports.append((outcome, cli_base + ['application:import-json', '--file', path, '--format', 'json']))
+
+    for (outcome, args), task in zip(imports, module.run_commands([args for outcome, args in imports])):
+        if task.error:
+            outcome.update(action='failed', msg=str(task.error))
+        elif not module.check_mode:
+            hashes[outcome['uuid']] = dict(sha256=outcome['sha256'], file=outcome['file'])
+
+    if imports and not module.check_mode:
+        save_hashes(module, hash_store, hashes)
+
+    summary = {}
+    for outcome in outcomes:
+        summary[outcome['action']] = summary.get(outcome['action'], 0) + 1
+    result['apps'] = outcomes
+    result['summary'] = summary
+    result['changed'] = bool(summary.get('created') or summary.get('updated'))
+    if summary.get('failed'):
+        module.fail_json(msg=f"{summary['failed']} of {len(outcomes)} application definitions failed", **result)
+    module.exit_json(**result)
 
 
 def run_module():
@@ -173,6 +301,10 @@ def run_module():
         requirements=dict(type='str', required=False),
         file=dict(type='str', required=False),
         deffile=dict(type='str', required=False),
+        directory=dict(type='path', required=False),
+        pattern=dict(type='str', required=False, default='**/*.json'),
+        hash_store=dict(type='path', required=False, default='~/.cache/multiflexi/application-hashes.json'),
+        verify=dict(type='bool', required=False, default=True),
     )
 
     result = dict(
@@ -180,14 +312,22 @@ def run_module():
         app=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        api_transport=True,
+        parallel=True,
+        mutually_exclusive=[('directory', 'file'), ('directory', 'deffile')],
         supports_check_mode=True
     )
 
     state = module.params.get('state')
     cli_base = ['multiflexi-cli']
 
+    if module.params.get('directory'):
+        if state not in (None, 'present'):
+            module.fail_json(msg="directory can only be used with state=present")
+        import_directory(module, cli_base, result)
+
     # Handle deffile as alias for file
     input_file = module.params.get('file') or module.params.get('deffile')
 
@@ -202,7 +342,7 @@ def run_module():
                 args = cli_base + ['application:get', '--name', module.params['name'], '--format', 'json', '--verbose']
             else:
                 module.fail_json(msg='Either app_id, uuid, or name is required to get application info.')
-            output = run_cli_command(args, module=module, allow_not_found=True)
+            output = module.cli.run(args, allow_not_found=True)
             app = json.loads(output)
             if isinstance(app, dict) and app.get('status') == 'not found':
                 result['app'] = None
@@ -228,21 +368,21 @@ def run_module():
 
             if module.params.get('app_id'):
                 check_args = cli_base + ['application:get', '--id', str(module.params['app_id']), '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 app = json.loads(output)
                 if app and isinstance(app, dict) and app.get('id') and app.get('status') != 'not found':
                     found_app_id = app['id']
                     app_data = app
             elif target_uuid:
                 check_args = cli_base + ['application:get', '--uuid', target_uuid, '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 app = json.loads(output)
                 if app and isinstance(app, dict) and app.get('id') and app.get('status') != 'not found':
                     found_app_id = app['id']
                     app_data = app
             elif module.params.get('name'):
                 check_args = cli_base + ['application:get', '--name', module.params['name'], '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 app = json.loads(output)
                 if app and isinstance(app, dict) and app.get('id') and app.get('status') != 'not found':
                     found_app_id = app['id']
@@ -255,18 +395,28 @@ def run_module():
                         result['changed'] = True
                         module.exit_json(**result)
                     args = cli_base + ['application:import-json', '--file', input_file, '--format', 'json', '--verbose']
-                    output = run_cli_command(args, module=module)
+                    output = module.cli.run(args)
+                    if target_uuid:
+                        hashes = load_hashes(module.params['hash_store'])
+                        hashes[target_uuid] = dict(sha256=file_sha256(input_file), file=input_file)
+                        save_hashes(module, module.params['hash_store'], hashes)
                     result['app'] = json.loads(output)
                     result['changed'] = True
                     module.exit_json(**result)
                 else:
-                    # App exists, for now we assume file might contain updates.
-                    # A true deep comparison of file vs database would be complex.
-                    # As a compromise, we only import if app_data differs significantly or we just always report changed for file imports if we don't want to parse everything.
-                    # The reviewer requested idempotency, so let's try a simple approach: if app exists, use update command with file if supported, or just skip if we want to be safe.
-                    # CLI application:update doesn't seem to support --file in the help we saw.
-                    # So we'll stick to: if it exists, we report changed: false unless other params are provided.
-                    pass
+                    # App exists: import again only when the file differs from the last imported one
+                    hashes = load_hashes(module.params['hash_store'])
+                    digest = file_sha256(input_file)
+                    if hashes.get(app_data.get('uuid') or target_uuid, {}).get('sha256') != digest:
+                        if module.check_mode:
+                            result['changed'] = True
+                            result['app'] = app_data
+                            module.exit_json(**result)
+                        args = cli_base + ['application:import-json', '--file', input_file, '--format', 'json', '--verbose']
+                        module.cli.run(args)
+                        hashes[app_data.get('uuid') or target_uuid] = dict(sha256=digest, file=input_file)
+                        save_hashes(module, module.params['hash_store'], hashes)
+                        result['changed'] = True
 
             # Idempotency: Only update if any property differs
             needs_update = False
@@ -301,7 +451,7 @@ def run_module():
                         result['app'] = app_data
                         module.exit_json(**result)
                     args = build_args(cli_base + ['application:update', '--id', str(found_app_id)])
-                    run_cli_command(args, module=module)
+                    module.cli.run(args)
                     result['changed'] = True
                 else:
                     result['changed'] = False
@@ -310,7 +460,7 @@ def run_module():
                     result['changed'] = True
                     module.exit_json(**result)
                 args = build_args(cli_base + ['application:create'])
-                run_cli_command(args, module=module)
+                module.cli.run(args)
                 result['changed'] = True
 
             # Always read the record and return as result
@@ -323,7 +473,7 @@ def run_module():
             else:
                 module.exit_json(**result)
 
-            output = run_cli_command(read_args, module=module, allow_not_found=True)
+            output = module.cli.run(read_args, allow_not_found=True)
             app = json.loads(output)
             if isinstance(app, dict) and app.get('status') == 'not found':
                 result['app'] = None
@@ -335,19 +485,19 @@ def run_module():
             found_app_id = None
             if module.params.get('app_id'):
                 check_args = cli_base + ['application:get', '--id', str(module.params['app_id']), '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 app = json.loads(output)
                 if app and isinstance(app, dict) and app.get('id') and app.get('status') != 'not found':
                     found_app_id = app['id']
             elif module.params.get('uuid'):
                 check_args = cli_base + ['application:get', '--uuid', module.params['uuid'], '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 app = json.loads(output)
                 if app and isinstance(app, dict) and app.get('id') and app.get('status') != 'not found':
                     found_app_id = app['id']
             elif module.params.get('name'):
                 check_args = cli_base + ['application:get', '--name', module.params['name'], '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 app = json.loads(output)
                 if app and isinstance(app, dict) and app.get('id') and app.get('status') != 'not found':
                     found_app_id = app['id']
@@ -357,7 +507,7 @@ def run_module():
                     result['changed'] = True
                     module.exit_json(**result)
                 args = cli_base + ['application:delete', '--id', str(found_app_id), '--format', 'json', '--verbose']
-                run_cli_command(args, module=module)
+                module.cli.run(args)
                 result['changed'] = True
             else:
                 result['changed'] = False
@@ -4,10 +4,12 @@
 # Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
 
 from __future__ import absolute_import, division, print_function
-import subprocess
+import hashlib
 import json
 import os
-from ansible.module_utils.basic import AnsibleModule
+import re
+import tempfile
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule, parse_time
 
 __metaclass__ = type
 
@@ -19,6 +21,14 @@ short_description: Manage job artifacts in Multiflexi
 
 description:
     - This module allows you to list, get, and save job artifacts in Multiflexi
+    - Artifacts are saved to a temporary file next to the destination, which replaces the destination
+      only when its size or SHA-256 checksum differs, so saving an unchanged artifact reports no change.
+    - With O(dest) all artifacts of a job, a run template and/or a time range are saved into a directory
+      in one task, downloading up to O(max_workers) artifacts at once.
+    - Artifact content is written to the file by C(multiflexi-cli) and never held in module memory, files are
+      read in binary chunks of O(chunk_size) to compute their size and checksum in a single pass.
+    - With O(fetch_dest) the saved files are also copied to the controller by the action plugin of this module,
+      streamed over the connection like M(ansible.builtin.fetch) instead of passing through the module result.
 
 author:
     - Vitex (@Vitexus)
@@ -28,6 +38,10 @@ requirements:
 
 version_added: 2.1.0
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.parallel
+
 options:
     state:
         description:
@@ -48,9 +62,46 @@ options:
         type: int
     file_path:
         description:
-            - File path to save artifact content to (required for save action)
+            - File path to save artifact content to (required for save action of a single artifact)
         required: false
         type: str
+    dest:
+        description:
+            - Directory to save all selected artifacts to, as C(<dest>/<job_id>/<id>-<filename>).
+            - Artifacts are selected with one C(artifact:list) call, narrowed by O(job_id), O(runtemplate_id),
+              O(since) and O(until).
+        required: false
+        type: path
+    runtemplate_id:
+        description:
+            - Save only artifacts of jobs of this run template. Its jobs are read with one paged C(job:list).
+        required: false
+        type: int
+    since:
+        description:
+            - Save only artifacts created at or after this time (C(YYYY-MM-DD HH:MM:SS)).
+        required: false
+        type: str
+    until:
+        description:
+            - Save only artifacts created before this time (C(YYYY-MM-DD HH:MM:SS)).
+        required: false
+        type: str
+    chunk_size:
+        description:
+            - Size in bytes of the blocks saved artifacts are read in to compute their checksum.
+        required: false
+        type: int
+        default: 1048576
+    fetch_dest:
+        description:
+            - Also copy the saved artifacts to this path on the controller, only when the controller copy differs.
+            - With O(file_path) it is the destination file, or a directory (ending with C(/)) to put it into.
+              With O(dest) it is a directory receiving the same C(<job_id>/<id>-<filename>) layout.
+            - Files are streamed over the connection to a temporary file which replaces the destination.
+            - Handled by the action plugin of this module on the controller.
+        required: false
+        type: path
     fields:
         description:
             - Comma-separated list of fields to display
@@ -82,6 +133,24 @@ EXAMPLES = """
     state: save
     id: 456
     file_path: /tmp/artifact_output.txt
+
+# Collect the artifacts of last night's jobs of a run template for audit
+- name: Save nightly artifacts
+  artifact:
+    state: save
+    runtemplate_id: 12
+    since: "{{ '%Y-%m-%d' | strftime(ansible_date_time.epoch | int - 86400) }} 00:00:00"
+    dest: /srv/audit/artifacts
+    max_workers: 8
+  register: nightly
+
+# Save a large report on the MultiFlexi host and stream it to the controller
+- name: Fetch monthly report
+  artifact:
+    state: save
+    id: 789
+    file_path: /var/tmp/report-789.pdf
+    fetch_dest: "{{ playbook_dir }}/reports/"
 """
 
 RETURN = """
@@ -103,33 +172,137 @@ changed:
 saved_to:
     description: Path where artifact was saved (only for save operations)
     type: str
-    returned: when state=save
+    returned: when state=save and O(file_path) is set
+checksum:
+    description: SHA-256 checksum of the saved artifact.
+    type: str
+    returned: when state=save and O(file_path) is set
+size:
+    description: Size of the saved artifact in bytes.
+    type: int
+    returned: when state=save and O(file_path) is set
+artifacts:
+    description: Outcome per artifact of a bulk save, C(status) is V(saved), V(unchanged) or V(failed).
+    type: list
+    elements: dict
+    returned: when state=save and O(dest) is set
+    sample: [{"id": 456, "job_id": 123, "path": "/srv/audit/artifacts/123/456-report.pdf", "status": "saved",
+              "size": 20480, "checksum": "9f86d08..."}]
+fetched:
+    description: Controller paths the artifacts were copied to (or would be in check mode) with O(fetch_dest).
+    type: list
+    elements: str
+    returned: when O(fetch_dest) is set
+    sample: ["/home/ops/reports/report-789.pdf"]
+summary:
+    description: Number of artifacts per outcome of a bulk save.
+    type: dict
+    returned: when state=save and O(dest) is set
+    sample: {"saved": 3, "unchanged": 40, "failed": 0}
 """
 
 
-def run_cli_command(args, module=None):
-    # Use module._verbosity if available, else check ANSIBLE_VERBOSITY env var
-    verbosity = 0
-    if module and hasattr(module, '_verbosity'):
-        try:
-            verbosity = int(module._verbosity)
-        except (TypeError, ValueError):
-            verbosity = 0
-    else:
-        import os
-        try:
-            verbosity = int(os.environ.get('ANSIBLE_VERBOSITY', '0'))
-        except Exception:
-            verbosity = 0
-    if verbosity >= 2 and module is not None:
-        module.warn("[DEBUG] Running command: {}".format(' '.join(args)))
+def artifact_filename(artifact):
+    """Return a safe file name of an artifact within the directory of its job."""
+    name = os.path.basename(str(artifact.get('filename') or '')).strip() or 'artifact'
+    return f"{artifact['id']}-{re.sub(r'[^A-Za-z0-9._-]', '_', name)}"
+
+
+def file_digest(path, chunk_size):
+    """Return ``(size, sha256)`` of a file read in binary chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def download(module, cli_base, artifact_id, path):
+    """Save an artifact to a temporary file next to ``path``, return ``(temp_path, size, checksum)``."""
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        if module.check_mode:
+            # Only compared, never moved into place
+            directory = None
+        else:
+            os.makedirs(directory)
+    handle, temp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', dir=directory)
+    os.close(handle)
     try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        if verbosity >= 2 and module is not None:
-            module.warn("[DEBUG] CLI output: {}".format(result.stdout.strip()))
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
+        module.cli.run(cli_base + ['artifact:save', '--id', str(artifact_id), '--file', temp_path])
+        return (temp_path,) + file_digest(temp_path, module.params['chunk_size'])
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+def install(module, temp_path, path, size, checksum):
+    """Move a downloaded artifact into place unless ``path`` has the same content, return whether it changed."""
+    if (os.path.exists(path) and os.path.getsize(path) == size
+            and file_digest(path, module.params['chunk_size'])[1] == checksum):
+        os.unlink(temp_path)
+        return False
+    if module.check_mode:
+        os.unlink(temp_path)
+    else:
+        module.atomic_move(temp_path, path)
+    return True
+
+
+def select_artifacts(module, cli_base):
+    """Return the artifacts chosen by job_id, runtemplate_id, since and until."""
+    args = cli_base + ['artifact:list', '--fields', 'id,job_id,filename,created_at', '--format', 'json']
+    if module.params.get('job_id'):
+        args.extend(['--job_id', str(module.params['job_id'])])
+    artifacts = json.loads(module.cli.run(args, allow_not_found=True) or '[]')
+    if not isinstance(artifacts, list):
+        return []
+    if module.params.get('runtemplate_id'):
+        jobs = set(int(job['id']) for job in module.cli.iter_records(
+            cli_base + ['job:list', '--fields', 'id,runtemplate_id', '--format', 'json'], 1000)
+            if str(job.get('runtemplate_id')) == str(module.params['runtemplate_id']))
+        artifacts = [artifact for artifact in artifacts if int(artifact.get('job_id') or 0) in jobs]
+    bounds = []
+    for name in ('since', 'until'):
+        bound = parse_time(module.params[name]) if module.params.get(name) else None
+        if module.params.get(name) and bound is None:
+            module.fail_json(msg=f"Unable to parse {name} {module.params[name]}")
+        bounds.append(bound)
+    since, until = bounds
+    if since or until:
+        selected = []
+        for artifact in artifacts:
+            created = parse_time(artifact.get('created_at'))
+            if created and (not since or created >= since) and (not until or created < until):
+                selected.append(artifact)
+        artifacts = selected
+    return artifacts
+
+
+def save_all(module, cli_base, result):
+    """Download the selected artifacts in parallel and install the changed ones into dest."""
+    artifacts = select_artifacts(module, cli_base)
+    dest = module.params['dest']
+    paths = [os.path.join(dest, str(artifact.get('job_id') or 0), artifact_filename(artifact))
+             for artifact in artifacts]
+    tasks = module.run_parallel(lambda item: download(module, cli_base, item[0]['id'], item[1]),
+                                list(zip(artifacts, paths)))
+    outcomes = []
+    for (artifact, path), task in zip(zip(artifacts, paths), tasks):
+        outcome = dict(id=artifact['id'], job_id=artifact.get('job_id'), path=path)
+        if task.error:
+            outcome.update(status='failed', msg=str(task.error))
+        else:
+            temp_path, size, checksum = task.result
+            changed = install(module, temp_path, path, size, checksum)
+            outcome.update(status='saved' if changed else 'unchanged', size=size, checksum=checksum)
+        outcomes.append(outcome)
+    result['artifacts'] = outcomes
+    result['summary'] = dict((status, sum(1 for outcome in outcomes if outcome['status'] == status))
+                             for status in ('saved', 'unchanged', 'failed'))
+    result['changed'] = bool(result['summary']['saved'])
 
 
 def run_module():
@@ -138,6 +311,12 @@ def run_module():
         id=dict(type='int', required=False),
         job_id=dict(type='int', required=False),
         file_path=dict(type='str', required=False),
+        dest=dict(type='path', required=False),
+        runtemplate_id=dict(type='int', required=False),
+        since=dict(type='str', required=False),
+        until=dict(type='str', required=False),
+        chunk_size=dict(type='int', required=False, default=1048576),
+        fetch_dest=dict(type='path', required=False),
         fields=dict(type='str', required=False)
     )
 
@@ -146,13 +325,17 @@ def run_module():
         artifact=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        parallel=True,
+        mutually_exclusive=[('file_path', 'dest')],
         supports_check_mode=True
     )
 
     state = module.params['state']
     cli_base = ['multiflexi-cli']
+    if module.params['chunk_size'] < 1:
+        module.fail_json(msg="chunk_size must be at least 1")
 
     try:
         if state == 'list':
@@ -165,7 +348,7 @@ def run_module():
             if module.params.get('fields'):
                 args.extend(['--fields', module.params['fields']])
             
-            output = run_cli_command(args, module=module)
+            output = module.cli.run(args)
             artifacts = json.loads(output)
             result['artifact'] = artifacts
             
@@ -179,7 +362,7 @@ def run_module():
             if module.params.get('fields'):
                 args.extend(['--fields', module.params['fields']])
             
-            output = run_cli_command(args, module=module)
+            output = module.cli.run(args)
             artifact = json.loads(output)
             
             if isinstance(artifact, dict) and artifact.get("status") == "not found":
@@ -187,45 +370,25 @@ def run_module():
             
             result['artifact'] = artifact
             
+        elif state == 'save' and module.params.get('dest'):
+            save_all(module, cli_base, result)
+            if result['summary']['failed']:
+                module.fail_json(msg=f"Saving {result['summary']['failed']} of {len(result['artifacts'])} "
+                                     f"artifacts failed", **result)
+
         elif state == 'save':
             # Save artifact to file
             if not module.params.get('id'):
                 module.fail_json(msg="id parameter is required for save operation")
             if not module.params.get('file_path'):
-                module.fail_json(msg="file_path parameter is required for save operation")
+                module.fail_json(msg="file_path or dest parameter is required for save operation")
             
             file_path = module.params['file_path']
-            
-            if module.check_mode:
-                result['changed'] = True
-                result['saved_to'] = file_path
-                module.exit_json(**result)
-
-            # Check if file already exists
-            if os.path.exists(file_path):
-                # File exists, we might overwrite it - this counts as a change
-                result['changed'] = True
-            else:
-                result['changed'] = True
-            
-            args = cli_base + ['artifact:save', '--id', str(module.params['id']), '--file', file_path]
-            
-            output = run_cli_command(args, module=module)
-            
-            # Verify the file was created
-            if os.path.exists(file_path):
-                result['saved_to'] = file_path
-                # Also get the artifact info for reference
-                get_args = cli_base + ['artifact:get', '--id', str(module.params['id']), '--format', 'json']
-                try:
-                    get_output = run_cli_command(get_args, module=module)
-                    artifact = json.loads(get_output)
-                    result['artifact'] = artifact
-                except Exception:
-                    # If we can't get artifact info, that's ok, save operation still succeeded
-                    pass
-            else:
-                module.fail_json(msg=f"Failed to save artifact to {file_path}")
+            temp_path, size, checksum = download(module, cli_base, module.params['id'], file_path)
+            result['changed'] = install(module, temp_path, file_path, size, checksum)
+            result['saved_to'] = file_path
+            result['size'] = size
+            result['checksum'] = checksum
 
     except Exception as e:
         module.fail_json(msg=str(e))
@@ -5,9 +5,8 @@
 
 
 from __future__ import absolute_import, division, print_function
-import subprocess
 import json
-from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 
 __metaclass__ = type
 
@@ -29,6 +28,10 @@ requirements:
 
 version_added: 2.1.0
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.api
+
 options:
     slug:
         description:
@@ -123,26 +126,6 @@ company:
 """
 
 
-def run_cli_command(args, module=None):
-    # Use module._verbosity if available, else check ANSIBLE_VERBOSITY env var
-    verbosity = 0
-    if module and hasattr(module, '_verbosity'):
-        verbosity = module._verbosity
-    else:
-        import os
-        try:
-            verbosity = int(os.environ.get('ANSIBLE_VERBOSITY', '0'))
-        except Exception:
-            verbosity = 0
-    if verbosity >= 2 and module is not None:
-        module.warn("[DEBUG] Running command: {}".format(' '.join(args)))
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
-
-
 def run_module():
     module_args = dict(
         id=dict(type='int', required=False),
@@ -166,8 +149,9 @@ def run_module():
         slug=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        api_transport=True,
         supports_check_mode=True
     )
 
@@ -185,7 +169,7 @@ def run_module():
         else:
             args = cli_base + ['company:get', '--slug', module.params['slug'], '--verbose', '--format', 'json']
         try:
-            output = run_cli_command(args, module=module)
+            output = module.cli.run(args)
             company = json.loads(output)
             if isinstance(company, dict) and company.get("status") == "not found":
                 return None, company.get("message")
@@ -223,7 +207,7 @@ def run_module():
                 if module.check_mode:
                     result['changed'] = True
                     module.exit_json(**result)
-                run_cli_command(args, module=module)
+                module.cli.run(args)
                 result['changed'] = True
             elif changed:
                 # Update only if something changed
@@ -234,7 +218,7 @@ def run_module():
                 if module.check_mode:
                     result['changed'] = True
                     module.exit_json(**result)
-                run_cli_command(args, module=module)
+                module.cli.run(args)
                 result['changed'] = True
             else:
                 # No change needed
@@ -252,7 +236,7 @@ def run_module():
                 if module.check_mode:
                     result['changed'] = True
                     module.exit_json(**result)
-                run_cli_command(args, module=module)
+                module.cli.run(args)
                 result['changed'] = True
                 result['company'] = existing
             else:
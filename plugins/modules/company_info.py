@@ -1,8 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -12,6 +11,9 @@ short_description: Get information about a company from MultiFlexi
 
 description:
   - Returns information about a company from MultiFlexi using multiflexi-cli.
+extends_documentation_fragment:
+  - vitexus.multiflexi.cli
+  - vitexus.multiflexi.api
 options:
   name:
     description:
@@ -57,23 +59,6 @@ company:
       email: "demo@example.com"
 """
 
-def run_cli_command(args, module=None):
-    if module and module._verbosity >= 2:
-        module.warn(f"Running CLI command: {' '.join(args)}")
-    result = subprocess.run(args, capture_output=True, text=True)
-    if module and module._verbosity >= 2:
-        module.warn(f"CLI stdout: {result.stdout.strip()}")
-        if result.stderr.strip():
-            module.warn(f"CLI stderr: {result.stderr.strip()}")
-    # Try to parse stdout as JSON, even if returncode != 0
-    try:
-        data = json.loads(result.stdout)
-        return data
-    except Exception:
-        if result.returncode != 0:
-            raise Exception(f"multiflexi-cli error: {result.stderr.strip()}")
-        return None
-
 def main():
     module_args = dict(
         name=dict(type='str', required=False),
@@ -81,8 +66,9 @@ def main():
         ic=dict(type='str', required=False),
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        api_transport=True,
         supports_check_mode=True
     )
 
@@ -97,7 +83,7 @@ def main():
         module.fail_json(msg="At least one of 'slug', 'ic', or 'name' must be provided.")
 
     try:
-        data = run_cli_command(cli_base, module=module)
+        data = json.loads(module.cli.run(cli_base, allow_not_found=True))
         if isinstance(data, dict) and data.get("status") == "not found":
             module.exit_json(changed=False, company=None, msg=data.get("message", "Company not found"))
         module.exit_json(changed=False, company=data)
@@ -17,6 +17,9 @@ author:
 
 version_added: "2.1.0"
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+
 options:
     state:
         description:
@@ -81,41 +84,21 @@ RETURN = """
 """
 
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 
 def run_cli_command(args, module=None, allow_not_found=False):
-    if module and module._verbosity >= 2:
-        module.warn(f"Running CLI command: {' '.join(args)}")
     try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        if module and module._verbosity >= 2:
-            module.warn(f"CLI stdout: {result.stdout.strip()}")
-            if result.stderr.strip():
-                module.warn(f"CLI stderr: {result.stderr.strip()}")
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        stdout = e.stdout.strip() if hasattr(e, 'stdout') and e.stdout else ''
-        stderr = e.stderr.strip() if hasattr(e, 'stderr') and e.stderr else ''
-        if module and module._verbosity >= 2:
-            module.warn(f"CLI error: {stderr}")
-            if stdout:
-                module.warn(f"CLI stdout (on error): {stdout}")
-        
+        return module.cli.run(args)
+    except MultiflexiCliError as e:
+        stdout = e.stdout.strip()
+        stderr = e.stderr.strip()
         # Handle "already exists" case for create operations
         if allow_not_found or 'already exists' in stderr.lower() or 'already exists' in stdout.lower():
             return stdout or stderr
-            
-        try:
-            if stdout:
-                data = json.loads(stdout)
-                if isinstance(data, dict) and data.get('message'):
-                    raise Exception(f"multiflexi-cli error: {data.get('message')}")
-        except Exception:
-            pass
-        raise Exception(f"multiflexi-cli error: {stderr or stdout or str(e)}")
+        raise
 
 
 def run_module():
@@ -132,7 +115,7 @@ def run_module():
         companyapp=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
         supports_check_mode=True
     )
@@ -0,0 +1,229 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+DOCUMENTATION = """
+---
+module: companyapp_sync
+
+short_description: Synchronize the whole company-application assignment matrix in Multiflexi
+
+description:
+    - Brings the assignments of applications to companies to the desired matrix in one task.
+    - Existing relations are read with a single C(company-app:list) call, only the missing
+      C(company-app:assign) and surplus C(company-app:unassign) operations are run.
+    - Company slugs and application UUIDs are resolved with at most one C(company:list) and one C(application:list) call.
+
+author:
+    - Vitex (@Vitexus)
+
+version_added: "1.7.0"
+
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.parallel
+
+options:
+    assignments:
+        description:
+            - The desired matrix, one item per company with the applications it should have.
+        required: true
+        type: list
+        elements: dict
+        suboptions:
+            company_id:
+                description:
+                    - The ID of the company. Either O(assignments[].company_id) or O(assignments[].company) is required.
+                type: int
+            company:
+                description:
+                    - The slug of the company.
+                type: str
+            apps:
+                description:
+                    - Applications to be assigned, given by ID or UUID.
+                type: list
+                elements: str
+                default: []
+    prune:
+        description:
+            - Unassign applications of the listed companies which are not in their O(assignments[].apps).
+        required: false
+        type: bool
+        default: true
+    exclusive:
+        description:
+            - Also unassign all applications of companies missing in O(assignments).
+        required: false
+        type: bool
+        default: false
+"""
+
+EXAMPLES = """
+    - name: Assign applications to companies
+      vitexus.multiflexi.companyapp_sync:
+        assignments:
+          - company: "DEMO"
+            apps:
+              - "262dabf1-d7b1-42c8-91a1-fe991631547c"
+              - "78fa718c-7ca2-4a38-840e-8e5f0db06432"
+          - company_id: 2
+            apps: ["5"]
+        max_workers: 8
+      register: sync
+
+    - name: Show what changed
+      ansible.builtin.debug:
+        var: sync.summary
+"""
+
+RETURN = """
+    changed:
+        description: Whether any relation was assigned or unassigned.
+        type: bool
+        returned: always
+    summary:
+        description: Number of relations per outcome.
+        type: dict
+        returned: always
+        sample: {"assigned": 3, "unassigned": 1, "unchanged": 11996, "failed": 0}
+    assigned:
+        description: The C([company_id, app_id]) pairs assigned (or to be assigned in check mode).
+        type: list
+        elements: list
+        returned: always
+        sample: [[1, 5], [2, 5]]
+    unassigned:
+        description: The C([company_id, app_id]) pairs unassigned (or to be unassigned in check mode).
+        type: list
+        elements: list
+        returned: always
+        sample: [[3, 7]]
+    failed:
+        description: Operations which failed, with the CLI error message.
+        type: list
+        elements: dict
+        returned: always
+        sample: [{"action": "assign", "company_id": 4, "app_id": 5, "msg": "multiflexi-cli error: ..."}]
+"""
+
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
+import json
+
+
+def resolve_ids(module, cli_base, assignments):
+    """Turn the assignments into a {company_id: set(app_id)} dict."""
+    slugs = uuids = None
+    desired = {}
+    for item in assignments:
+        company_id = item.get('company_id')
+        if company_id is None:
+            if not item.get('company'):
+                module.fail_json(msg="Each assignment needs company_id or company")
+            if slugs is None:
+                slugs = module.cli.index(cli_base + ['company:list', '--fields', 'id,slug', '--format', 'json'], 'slug')
+            if item['company'] not in slugs:
+                module.fail_json(msg=f"Company {item['company']} not found")
+            company_id = slugs[item['company']]['id']
+        apps = desired.setdefault(int(company_id), set())
+        for app in item.get('apps') or []:
+            if str(app).isdigit():
+                apps.add(int(app))
+                continue
+            if uuids is None:
+                uuids = module.cli.index(cli_base + ['application:list', '--fields', 'id,uuid', '--format', 'json'], 'uuid')
+            if app not in uuids:
+                module.fail_json(msg=f"Application {app} not found")
+            apps.add(int(uuids[app]['id']))
+    return desired
+
+
+def format_matrix(pairs):
+    lines = {}
+    for company_id, app_id in sorted(pairs):
+        lines.setdefault(company_id, []).append(str(app_id))
+    return ''.join(f"{company_id}: {', '.join(apps)}\n" for company_id, apps in lines.items())
+
+
+def run_module():
+    module_args = dict(
+        assignments=dict(type='list', elements='dict', required=True, options=dict(
+            company_id=dict(type='int'),
+            company=dict(type='str'),
+            apps=dict(type='list', elements='str', default=[]),
+        )),
+        prune=dict(type='bool', required=False, default=True),
+        exclusive=dict(type='bool', required=False, default=False),
+    )
+
+    result = dict(
+        changed=False,
+        summary={},
+        assigned=[],
+        unassigned=[],
+        failed=[],
+    )
+
+    module = MultiflexiModule(
+        argument_spec=module_args,
+        parallel=True,
+        supports_check_mode=True
+    )
+
+    cli_base = ['multiflexi-cli']
+
+    try:
+        desired = resolve_ids(module, cli_base, module.params['assignments'])
+        relations = json.loads(module.cli.run(cli_base + ['company-app:list', '--format', 'json'], allow_not_found=True))
+    except (MultiflexiCliError, ValueError) as e:
+        module.fail_json(msg=str(e))
+
+    existing = set()
+    for relation in relations if isinstance(relations, list) else []:
+        try:
+            existing.add((int(relation['company_id']), int(relation['app_id'])))
+        except (KeyError, TypeError, ValueError) as e:
+            module.fail_json(msg=f"Unexpected company-app:list output, relation {relation!r}: {e}")
+    wanted = set((company_id, app_id) for company_id, apps in desired.items() for app_id in apps)
+
+    to_assign = sorted(wanted - existing)
+    # Relations of listed companies are managed with prune, the others with exclusive
+    managed = set(pair for pair in existing
+                  if (module.params['prune'] if pair[0] in desired else module.params['exclusive']))
+    to_unassign = sorted(managed - wanted)
+
+    operations = [('assign', pair) for pair in to_assign] + [('unassign', pair) for pair in to_unassign]
+    commands = [cli_base + [f'company-app:{action}', '--company_id', str(company_id), '--app_id', str(app_id),
+                            '--format', 'json'] for action, (company_id, app_id) in operations]
+    failed = [dict(action=action, company_id=company_id, app_id=app_id, msg=str(task.error))
+              for (action, (company_id, app_id)), task in zip(operations, module.run_commands(commands))
+              if task.error]
+    failed_pairs = set((error['action'], (error['company_id'], error['app_id'])) for error in failed)
+    result['assigned'] = [list(pair) for pair in to_assign if ('assign', pair) not in failed_pairs]
+    result['unassigned'] = [list(pair) for pair in to_unassign if ('unassign', pair) not in failed_pairs]
+    result['failed'] = failed
+    result['changed'] = bool(result['assigned'] or result['unassigned'])
+    result['summary'] = dict(
+        assigned=len(result['assigned']),
+        unassigned=len(result['unassigned']),
+        unchanged=len(wanted & existing),
+        failed=len(failed),
+    )
+    if module._diff:
+        before = managed | (existing & wanted)
+        result['diff'] = dict(before=format_matrix(before), after=format_matrix((before - set(to_unassign)) | wanted))
+
+    if failed:
+        module.fail_json(msg=f"{len(failed)} of {len(operations)} company-app operations failed", **result)
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
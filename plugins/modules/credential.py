@@ -1,8 +1,8 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -17,6 +17,10 @@ description:
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.api
+
 options:
     state:
         description:
@@ -92,14 +96,13 @@ def run_cli(module, args):
     cli = module.params.get('multiflexi_cli', 'multiflexi-cli')
     cmd = [cli] + args + ['--verbose', '--format', 'json']
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
+        return json.loads(module.cli.run(cmd))
+    except MultiflexiCliError as e:
         try:
             err = json.loads(e.stdout or e.stderr)
         except Exception:
-            err = e.stdout or e.stderr
-        module.fail_json(msg=f"CLI error: {err}", rc=e.returncode)
+            err = e.stdout or e.stderr or str(e)
+        module.fail_json(msg=f"CLI error: {err}", rc=e.rc)
     except Exception as e:
         module.fail_json(msg=f"Failed to run CLI: {e}")
 
@@ -114,13 +117,17 @@ def find_existing_credential(module):
         except Exception:
             return None
     elif module.params.get('name'):
+        # credential:list has no name filter: look the name up in a name -> id
+        # index built from one narrow listing, kept in the lookup cache when
+        # multiflexi_cache_path is set, then fetch just that record
         try:
-            # List all credentials and find by name
-            res = run_cli(module, ['credential:list'])
-            if isinstance(res, list):
-                for cred in res:
-                    if cred.get('name') == module.params['name']:
-                        return cred
+            cli = module.params.get('multiflexi_cli', 'multiflexi-cli')
+            names = module.cli.index([cli, 'credential:list', '--fields', 'id,name', '--format', 'json'], 'name')
+            match = names.get(module.params['name'])
+            if match:
+                res = run_cli(module, ['credential:get', '--id', str(match['id'])])
+                if isinstance(res, dict) and res.get('id'):
+                    return res
         except Exception:
             return None
     return None
@@ -140,8 +147,9 @@ def run_module():
         credential=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        api_transport=True,
         supports_check_mode=True
     )
 
@@ -178,9 +186,12 @@ def run_module():
                 result['credential'] = {'name': module.params['name']}
                 module.exit_json(**result)
             
-            run_cli(module, create_args)
-            # Find the newly created credential
-            cred = find_existing_credential(module)
+            created = run_cli(module, create_args)
+            # Fetch the newly created credential, by id when the CLI reports it
+            if isinstance(created, dict) and created.get('id'):
+                cred = run_cli(module, ['credential:get', '--id', str(created['id'])])
+            else:
+                cred = find_existing_credential(module)
             result['changed'] = True
             result['credential'] = cred
             module.exit_json(**result)
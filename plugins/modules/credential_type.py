@@ -1,8 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -16,6 +15,10 @@ description:
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.api
+
 options:
     state:
         description:
@@ -128,27 +131,6 @@ credential_type:
     returned: always
 """
 
-def run_cli_command(args, module=None, allow_not_found=False):
-    if module and hasattr(module, '_verbosity') and module._verbosity >= 2:
-        module.warn(f"Running CLI command: {' '.join(args)}")
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        if module and hasattr(module, '_verbosity') and module._verbosity >= 2:
-            module.warn(f"CLI stdout: {result.stdout.strip()}")
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        stdout = e.stdout.strip() if e.stdout else ''
-        stderr = e.stderr.strip() if e.stderr else ''
-        if module and hasattr(module, '_verbosity') and module._verbosity >= 2:
-            module.warn(f"CLI error: {stderr}")
-        if allow_not_found and stdout:
-            try:
-                data = json.loads(stdout)
-                if isinstance(data, dict) and data.get('status') == 'not found':
-                    return stdout
-            except Exception:
-                pass
-        raise Exception(f"multiflexi-cli error: {stderr or stdout or str(e)}")
 
 def run_module():
     module_args = dict(
@@ -170,8 +152,9 @@ def run_module():
         msg=""
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        api_transport=True,
         supports_check_mode=True
     )
 
@@ -186,7 +169,7 @@ def run_module():
                 args.extend(['--limit', str(module.params['limit'])])
             if module.params.get('order'):
                 args.extend(['--order', module.params['order']])
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['credential_type'] = json.loads(output)
             result['msg'] = "Retrieved credential type list"
             
@@ -194,7 +177,7 @@ def run_module():
             # Get credential type by ID, UUID, or name
             if module.params.get('credential_type_id'):
                 args = cli_base + ['credential-type:get', '--id', str(module.params['credential_type_id']), '--format', 'json']
-                output = run_cli_command(args, module=module)
+                output = module.cli.run(args)
                 result['credential_type'] = json.loads(output)
                 result['msg'] = f"Retrieved credential type {module.params['credential_type_id']}"
                 
@@ -202,18 +185,18 @@ def run_module():
                 if module.params.get('name'):
                     args = cli_base + ['credential-type:update', '--id', str(module.params['credential_type_id']), 
                                      '--name', module.params['name'], '--format', 'json']
-                    output = run_cli_command(args, module=module)
+                    output = module.cli.run(args)
                     result['changed'] = True
                     result['msg'] = f"Updated credential type {module.params['credential_type_id']}"
                     
                     # Get updated credential type
                     args = cli_base + ['credential-type:get', '--id', str(module.params['credential_type_id']), '--format', 'json']
-                    output = run_cli_command(args, module=module)
+                    output = module.cli.run(args)
                     result['credential_type'] = json.loads(output)
                     
             elif module.params.get('uuid'):
                 args = cli_base + ['credential-type:get', '--uuid', module.params['uuid'], '--format', 'json']
-                output = run_cli_command(args, module=module)
+                output = module.cli.run(args)
                 result['credential_type'] = json.loads(output)
                 result['msg'] = f"Retrieved credential type {module.params['uuid']}"
                 
@@ -221,13 +204,13 @@ def run_module():
                 if module.params.get('name'):
                     args = cli_base + ['credential-type:update', '--uuid', module.params['uuid'], 
                                      '--name', module.params['name'], '--format', 'json']
-                    output = run_cli_command(args, module=module)
+                    output = module.cli.run(args)
                     result['changed'] = True
                     result['msg'] = f"Updated credential type {module.params['uuid']}"
                     
                     # Get updated credential type
                     args = cli_base + ['credential-type:get', '--uuid', module.params['uuid'], '--format', 'json']
-                    output = run_cli_command(args, module=module)
+                    output = module.cli.run(args)
                     result['credential_type'] = json.loads(output)
 
             elif module.params.get('class_name') and module.params.get('company_id'):
@@ -235,7 +218,7 @@ def run_module():
                 existing = None
                 try:
                     args = cli_base + ['credential-type:list', '--format', 'json']
-                    output = run_cli_command(args, module=module)
+                    output = module.cli.run(args)
                     credtypes = json.loads(output)
                     if isinstance(credtypes, list):
                         for ct in credtypes:
@@ -259,7 +242,7 @@ def run_module():
                                       '--company-id', str(module.params['company_id']),
                                       '--class', module.params['class_name'],
                                       '--format', 'json']
-                    output = run_cli_command(args, module=module)
+                    output = module.cli.run(args)
                     result['credential_type'] = json.loads(output)
                     result['changed'] = True
                     result['msg'] = f"Created credential type for class {module.params['class_name']}"
@@ -271,7 +254,7 @@ def run_module():
                     args.extend(['--limit', str(module.params['limit'])])
                 if module.params.get('order'):
                     args.extend(['--order', module.params['order']])
-                output = run_cli_command(args, module=module)
+                output = module.cli.run(args)
                 result['credential_type'] = json.loads(output)
                 result['msg'] = "Retrieved credential type list"
                 
@@ -284,7 +267,7 @@ def run_module():
                 result['changed'] = True
             else:
                 args = cli_base + ['credential-type:import-json', '--file', module.params['file'], '--format', 'json']
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 result['credential_type'] = json.loads(output)
                 result['changed'] = True
                 result['msg'] = f"Imported credential type from {module.params['file']}"
@@ -297,7 +280,7 @@ def run_module():
                 module.fail_json(msg="file parameter is required for validate operation")
                 
             args = cli_base + ['credential-type:validate-json', '--file', module.params['file'], '--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['credential_type'] = json.loads(output)
             result['msg'] = f"Validated credential type file {module.params['file']}"
             
@@ -311,7 +294,7 @@ def run_module():
                 result['changed'] = True
                 module.exit_json(**result)
             args = cli_base + ['credential-type:delete', '--id', str(module.params['credential_type_id']), '--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['changed'] = True
             result['msg'] = f"Deleted credential type {module.params['credential_type_id']}"
             
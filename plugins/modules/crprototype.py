@@ -3,8 +3,7 @@
 #
 # Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -21,6 +20,9 @@ author:
 
 version_added: "2.4.0"
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+
 options:
     state:
         description:
@@ -143,35 +145,6 @@ msg:
 """
 
 
-def run_cli_command(args, module=None):
-    verbosity = 0
-    if module and hasattr(module, '_verbosity'):
-        try:
-            verbosity = int(module._verbosity)
-        except (TypeError, ValueError):
-            verbosity = 0
-    if verbosity >= 2 and module is not None:
-        module.warn("[DEBUG] Running command: {}".format(' '.join(args)))
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        if verbosity >= 2 and module is not None:
-            module.warn("[DEBUG] CLI output: {}".format(result.stdout.strip()))
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        stdout = e.stdout.strip() if e.stdout else ''
-        stderr = e.stderr.strip() if e.stderr else ''
-        if verbosity >= 2 and module is not None:
-            module.warn("[DEBUG] CLI error: {}".format(stderr))
-        try:
-            if stdout:
-                data = json.loads(stdout)
-                if isinstance(data, dict) and data.get('status') == 'not found':
-                    return stdout
-        except Exception:
-            pass
-        raise Exception("multiflexi-cli error: {}".format(stderr or stdout or str(e)))
-
-
 def run_module():
     module_args = dict(
         state=dict(type='str', required=True, choices=['present', 'absent', 'list', 'import', 'export', 'validate', 'sync']),
@@ -193,7 +166,7 @@ def run_module():
         msg=""
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
         supports_check_mode=True
     )
@@ -205,7 +178,7 @@ def run_module():
     try:
         if state == 'list':
             args = cli_base + ['credential-prototype:list', '--format', 'json']
-            output = run_cli_command(args, module=module)
+            output = module.cli.run(args)
             result['crprototype'] = json.loads(output)
             result['msg'] = "Retrieved credential prototype list"
 
@@ -214,19 +187,19 @@ def run_module():
             existing = None
             if module.params.get('prototype_id'):
                 args = cli_base + ['credential-prototype:get', '--id', str(module.params['prototype_id']), '--format', 'json']
-                output = run_cli_command(args, module=module)
+                output = module.cli.run(args, allow_not_found=True)
                 data = json.loads(output)
                 if isinstance(data, dict) and data.get('id') and data.get('status') != 'not found':
                     existing = data
             elif module.params.get('uuid'):
                 args = cli_base + ['credential-prototype:get', '--uuid', module.params['uuid'], '--format', 'json']
-                output = run_cli_command(args, module=module)
+                output = module.cli.run(args, allow_not_found=True)
                 data = json.loads(output)
                 if isinstance(data, dict) and data.get('id') and data.get('status') != 'not found':
                     existing = data
             elif module.params.get('code'):
                 args = cli_base + ['credential-prototype:get', '--code', module.params['code'], '--format', 'json']
-                output = run_cli_command(args, module=module)
+                output = module.cli.run(args, allow_not_found=True)
                 data = json.loads(output)
                 if isinstance(data, dict) and data.get('id') and data.get('status') != 'not found':
                     existing = data
@@ -256,7 +229,7 @@ def run_module():
                     return
 
                 update_args += ['--format', 'json']
-                output = run_cli_command(update_args, module=module)
+                output = module.cli.run(update_args)
                 result['crprototype'] = json.loads(output)
                 result['changed'] = True
                 result['msg'] = "Updated credential prototype"
@@ -277,7 +250,7 @@ def run_module():
                     return
 
                 create_args += ['--format', 'json']
-                output = run_cli_command(create_args, module=module)
+                output = module.cli.run(create_args)
                 result['crprototype'] = json.loads(output)
                 result['changed'] = True
                 result['msg'] = "Created credential prototype"
@@ -289,7 +262,7 @@ def run_module():
             # Check if exists
             args = cli_base + ['credential-prototype:get', '--id', str(module.params['prototype_id']), '--format', 'json']
             try:
-                output = run_cli_command(args, module=module)
+                output = module.cli.run(args, allow_not_found=True)
                 data = json.loads(output)
                 if isinstance(data, dict) and data.get('status') == 'not found':
                     result['msg'] = "Credential prototype not found"
@@ -307,7 +280,7 @@ def run_module():
                 return
 
             args = cli_base + ['credential-prototype:delete', '--id', str(module.params['prototype_id']), '--format', 'json']
-            output = run_cli_command(args, module=module)
+            output = module.cli.run(args)
             result['changed'] = True
             result['msg'] = "Deleted credential prototype"
 
@@ -322,7 +295,7 @@ def run_module():
                 return
 
             args = cli_base + ['credential-prototype:import-json', '--file', module.params['file'], '--format', 'json']
-            output = run_cli_command(args, module=module)
+            output = module.cli.run(args)
             result['crprototype'] = json.loads(output)
             result['changed'] = True
             result['msg'] = "Imported credential prototype from {}".format(module.params['file'])
@@ -345,7 +318,7 @@ def run_module():
             elif module.params.get('uuid'):
                 args.extend(['--uuid', module.params['uuid']])
 
-            output = run_cli_command(args, module=module)
+            output = module.cli.run(args)
             result['crprototype'] = json.loads(output)
             result['changed'] = True
             result['msg'] = "Exported credential prototype to {}".format(module.params['file'])
@@ -355,7 +328,7 @@ def run_module():
                 module.fail_json(msg="file parameter is required for validate operation")
 
             args = cli_base + ['credential-prototype:validate-json', '--file', module.params['file'], '--format', 'json']
-            output = run_cli_command(args, module=module)
+            output = module.cli.run(args)
             result['crprototype'] = json.loads(output)
             result['msg'] = "Validated credential prototype file {}".format(module.params['file'])
 
@@ -367,7 +340,7 @@ def run_module():
                 return
 
             args = cli_base + ['credential-prototype:sync', '--format', 'json']
-            output = run_cli_command(args, module=module)
+            output = module.cli.run(args)
             # sync may output log lines before JSON; extract last JSON object/array
             parsed = None
             for line in reversed(output.strip().splitlines()):
@@ -1,8 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -17,6 +16,9 @@ description:
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+
 options:
     state:
         description:
@@ -54,13 +56,6 @@ msg:
     returned: always
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
-
 def run_module():
     module_args = dict(
         state=dict(type='str', required=True, choices=['status', 'init']),
@@ -73,7 +68,7 @@ def run_module():
         msg=""
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
         supports_check_mode=True
     )
@@ -85,7 +80,7 @@ def run_module():
     try:
         if state == 'status':
             args = cli_base + ['encryption:status', '--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['encryption'] = json.loads(output)
             result['msg'] = "Retrieved encryption status"
             
@@ -95,7 +90,7 @@ def run_module():
                 result['changed'] = True
             else:
                 args = cli_base + ['encryption:init', '--format', 'json']
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 result['encryption'] = json.loads(output)
                 result['changed'] = True
                 result['msg'] = "Initialized encryption keys"
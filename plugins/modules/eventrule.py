@@ -1,8 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -17,6 +16,9 @@ description:
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+
 options:
     state:
         description:
@@ -129,13 +131,6 @@ eventrule:
     returned: always
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
-
 def run_module():
     module_args = dict(
         state=dict(type='str', required=True, choices=['present', 'absent', 'list']),
@@ -159,7 +154,7 @@ def run_module():
         msg=""
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
         supports_check_mode=True
     )
@@ -175,7 +170,7 @@ def run_module():
                 args.extend(['--limit', str(module.params['limit'])])
             if module.params.get('order'):
                 args.extend(['--order', module.params['order']])
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['eventrule'] = json.loads(output)
             result['msg'] = "Retrieved event rule list"
 
@@ -183,7 +178,7 @@ def run_module():
             if module.params.get('eventrule_id'):
                 # Get existing event rule
                 args = cli_base + ['event-rule:get', '--id', str(module.params['eventrule_id']), '--format', 'json']
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 result['eventrule'] = json.loads(output)
                 result['msg'] = f"Retrieved event rule {module.params['eventrule_id']}"
 
@@ -205,13 +200,13 @@ def run_module():
                         result['changed'] = True
                     else:
                         update_args.extend(['--format', 'json'])
-                        run_cli_command(update_args)
+                        module.cli.run(update_args)
                         result['changed'] = True
                         result['msg'] = f"Updated event rule {module.params['eventrule_id']}"
 
                         # Get updated record
                         args = cli_base + ['event-rule:get', '--id', str(module.params['eventrule_id']), '--format', 'json']
-                        output = run_cli_command(args)
+                        output = module.cli.run(args)
                         result['eventrule'] = json.loads(output)
             else:
                 # Create new event rule
@@ -240,7 +235,7 @@ def run_module():
                         if module.params.get(field) is not None:
                             create_args.extend([f'--{field}', str(module.params[field])])
 
-                    output = run_cli_command(create_args)
+                    output = module.cli.run(create_args)
                     result['eventrule'] = json.loads(output)
                     result['changed'] = True
                     result['msg'] = "Event rule created"
@@ -254,7 +249,7 @@ def run_module():
                 result['changed'] = True
             else:
                 args = cli_base + ['event-rule:remove', '--id', str(module.params['eventrule_id']), '--format', 'json']
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 result['eventrule'] = json.loads(output)
                 result['changed'] = True
                 result['msg'] = f"Removed event rule {module.params['eventrule_id']}"
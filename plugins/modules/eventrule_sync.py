@@ -0,0 +1,349 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+DOCUMENTATION = """
+---
+module: eventrule_sync
+
+short_description: Synchronize the whole set of event rules in Multiflexi
+
+description:
+    - Brings the event rules mapping webhook events to RunTemplates to the desired set in one task.
+    - Existing rules are read with a single C(event-rule:list) call. A rule is identified by its event source,
+      evidence, operation and RunTemplate; its remaining settings are compared by a hash of their canonical form,
+      so only the missing C(event-rule:create), changed C(event-rule:update) and surplus C(event-rule:remove)
+      operations are run.
+    - Updates pass only the changed settings and nothing is read back after a write.
+
+author:
+    - Vitex (@Vitexus)
+
+version_added: "1.7.0"
+
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.parallel
+
+options:
+    rules:
+        description:
+            - The desired rules.
+        required: true
+        type: list
+        elements: dict
+        suboptions:
+            event_source_id:
+                description:
+                    - The ID of the event source the rule belongs to.
+                required: true
+                type: int
+            evidence:
+                description:
+                    - The evidence type to match (e.g. faktura-vydana, banka).
+                required: true
+                type: str
+            operation:
+                description:
+                    - The operation to match.
+                type: str
+                choices: ['any', 'create', 'update', 'delete']
+                default: 'any'
+            runtemplate_id:
+                description:
+                    - The ID of the RunTemplate to trigger when the rule matches.
+                required: true
+                type: int
+            priority:
+                description:
+                    - Priority (higher = matched first).
+                type: int
+                default: 0
+            enabled:
+                description:
+                    - Whether the rule is enabled.
+                type: bool
+                default: true
+            env_mapping:
+                description:
+                    - Mapping of event data fields to environment variables, as a dict or a JSON string.
+                    - Compared as data, so key order and whitespace of the JSON do not matter.
+                type: raw
+    prune:
+        description:
+            - Remove rules of the event sources used in O(rules) which are not in O(rules).
+        required: false
+        type: bool
+        default: false
+    exclusive:
+        description:
+            - Also remove all rules of event sources not used in O(rules).
+        required: false
+        type: bool
+        default: false
+    multiflexi_cli_path:
+        description:
+            - Path to the multiflexi-cli executable.
+        required: false
+        type: str
+        default: 'multiflexi-cli'
+"""
+
+EXAMPLES = """
+    - name: Map the webhook events to RunTemplates
+      vitexus.multiflexi.eventrule_sync:
+        rules:
+          - event_source_id: 1
+            evidence: faktura-vydana
+            operation: create
+            runtemplate_id: 5
+            env_mapping:
+              INVOICE_ID: recordid
+          - event_source_id: 1
+            evidence: banka
+            runtemplate_id: 7
+            priority: 10
+        prune: true
+        max_workers: 8
+      register: sync
+
+    - name: Show what changed
+      ansible.builtin.debug:
+        var: sync.summary
+"""
+
+RETURN = """
+    changed:
+        description: Whether any rule was created, updated or removed.
+        type: bool
+        returned: always
+    summary:
+        description: Number of rules per outcome.
+        type: dict
+        returned: always
+        sample: {"created": 2, "updated": 1, "removed": 3, "unchanged": 494, "failed": 0}
+    created:
+        description: The rules created (or to be created in check mode), with the new C(id) when the CLI returns it.
+        type: list
+        elements: dict
+        returned: always
+        sample: [{"id": 501, "event_source_id": 1, "evidence": "banka", "operation": "any", "runtemplate_id": 7}]
+    updated:
+        description: The rules updated (or to be updated in check mode), with the names of the changed settings.
+        type: list
+        elements: dict
+        returned: always
+        sample: [{"id": 12, "event_source_id": 1, "evidence": "faktura-vydana", "operation": "create",
+                  "runtemplate_id": 5, "changed_fields": ["env_mapping"]}]
+    removed:
+        description: The IDs of the rules removed (or to be removed in check mode).
+        type: list
+        elements: int
+        returned: always
+        sample: [40, 41]
+    failed:
+        description: Operations which failed, with the CLI error message.
+        type: list
+        elements: dict
+        returned: always
+        sample: [{"action": "update", "id": 12, "msg": "multiflexi-cli error: ..."}]
+"""
+
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
+import hashlib
+import json
+
+# A rule is identified by these fields, the others are its settings
+KEY_FIELDS = ('event_source_id', 'evidence', 'operation', 'runtemplate_id')
+SETTING_FIELDS = ('priority', 'enabled', 'env_mapping')
+
+
+def canonical_env_mapping(value):
+    if isinstance(value, str):
+        if not value.strip():
+            return None
+        value = json.loads(value)
+    return value or None
+
+
+def canonical_rule(rule):
+    """Return the rule in the form compared and hashed: typed, defaults applied, env_mapping as data."""
+    enabled = rule.get('enabled')
+    return dict(
+        event_source_id=int(rule['event_source_id']),
+        evidence=str(rule['evidence']),
+        operation=str(rule.get('operation') or 'any'),
+        runtemplate_id=int(rule['runtemplate_id']),
+        priority=int(rule.get('priority') or 0),
+        enabled=True if enabled is None else str(enabled).lower() not in ('0', 'false', ''),
+        env_mapping=canonical_env_mapping(rule.get('env_mapping')),
+    )
+
+
+def rule_key(rule):
+    return tuple(rule[field] for field in KEY_FIELDS)
+
+
+def settings_hash(rule):
+    settings = dict((field, rule[field]) for field in SETTING_FIELDS)
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def setting_args(rule, fields):
+    args = []
+    for field in fields:
+        value = rule[field]
+        if field == 'enabled':
+            value = '1' if value else '0'
+        elif field == 'env_mapping':
+            value = json.dumps(value or {}, sort_keys=True)
+        args += [f'--{field}', str(value)]
+    return args
+
+
+def format_rules(rules):
+    return ''.join(f"{rule['event_source_id']} {rule['evidence']}:{rule['operation']} -> {rule['runtemplate_id']}"
+                   f" priority={rule['priority']} enabled={rule['enabled']}"
+                   f" env_mapping={json.dumps(rule['env_mapping'], sort_keys=True)}\n"
+                   for rule in sorted(rules, key=lambda rule: (rule_key(rule), rule['priority'])))
+
+
+def run_module():
+    module_args = dict(
+        rules=dict(type='list', elements='dict', required=True, options=dict(
+            event_source_id=dict(type='int', required=True),
+            evidence=dict(type='str', required=True),
+            operation=dict(type='str', default='any', choices=['any', 'create', 'update', 'delete']),
+            runtemplate_id=dict(type='int', required=True),
+            priority=dict(type='int', default=0),
+            enabled=dict(type='bool', default=True),
+            env_mapping=dict(type='raw'),
+        )),
+        prune=dict(type='bool', required=False, default=False),
+        exclusive=dict(type='bool', required=False, default=False),
+        multiflexi_cli_path=dict(type='str', required=False, default='multiflexi-cli'),
+    )
+
+    result = dict(
+        changed=False,
+        summary={},
+        created=[],
+        updated=[],
+        removed=[],
+        failed=[],
+    )
+
+    module = MultiflexiModule(
+        argument_spec=module_args,
+        parallel=True,
+        supports_check_mode=True
+    )
+
+    cli_base = [module.params['multiflexi_cli_path']]
+
+    desired = {}
+    for rule in module.params['rules']:
+        try:
+            rule = canonical_rule(rule)
+        except ValueError as e:
+            module.fail_json(msg=f"Invalid env_mapping of rule {rule['evidence']}: {e}")
+        if rule_key(rule) in desired:
+            module.fail_json(msg="Duplicate rule for event source {0}, evidence {1}, operation {2} and RunTemplate {3}"
+                             .format(*rule_key(rule)))
+        desired[rule_key(rule)] = rule
+
+    try:
+        listed = json.loads(module.cli.run(cli_base + ['event-rule:list', '--fields',
+                                                       ','.join(('id',) + KEY_FIELDS + SETTING_FIELDS),
+                                                       '--format', 'json'], allow_not_found=True) or '[]')
+    except (MultiflexiCliError, ValueError) as e:
+        module.fail_json(msg=str(e))
+
+    existing = {}
+    surplus = []
+    for row in sorted(listed if isinstance(listed, list) else [], key=lambda row: int(row['id'])):
+        try:
+            rule = canonical_rule(row)
+        except ValueError:
+            # Unparsable env_mapping never equals the desired one
+            rule = canonical_rule(dict(row, env_mapping=None))
+            rule['env_mapping'] = row.get('env_mapping')
+        except (KeyError, TypeError) as e:
+            module.fail_json(msg=f"Unexpected event-rule:list output, rule {row.get('id')}: {e}")
+        rule['id'] = int(row['id'])
+        if rule_key(rule) in existing:
+            # Duplicates of a rule would trigger its RunTemplate twice
+            surplus.append(rule)
+        else:
+            existing[rule_key(rule)] = rule
+
+    sources = set(rule['event_source_id'] for rule in desired.values())
+    operations = []
+    unchanged = 0
+    for key, rule in desired.items():
+        current = existing.get(key)
+        if current is None:
+            operations.append(('create', rule, cli_base + ['event-rule:create'] + setting_args(rule, KEY_FIELDS)
+                               + setting_args(rule, SETTING_FIELDS) + ['--format', 'json']))
+        elif settings_hash(current) != settings_hash(rule):
+            changed_fields = [field for field in SETTING_FIELDS if current[field] != rule[field]]
+            operations.append(('update', dict(rule, id=current['id'], changed_fields=changed_fields),
+                               cli_base + ['event-rule:update', '--id', str(current['id'])]
+                               + setting_args(rule, changed_fields) + ['--format', 'json']))
+        else:
+            unchanged += 1
+    # Rules of listed event sources are managed with prune, the others with exclusive
+    unmanaged = [rule for key, rule in existing.items() if key not in desired] + surplus
+    for rule in sorted(unmanaged, key=lambda rule: rule['id']):
+        if module.params['prune'] if rule['event_source_id'] in sources else module.params['exclusive']:
+            operations.append(('remove', rule, cli_base + ['event-rule:remove', '--id', str(rule['id']),
+                                                           '--format', 'json']))
+
+    for (action, rule, args), task in zip(operations, module.run_commands([args for _a, _r, args in operations])):
+        if task.error:
+            failed = dict(action=action, msg=str(task.error))
+            failed.update((field, rule[field]) for field in ('id',) + KEY_FIELDS if rule.get(field) is not None)
+            result['failed'].append(failed)
+        elif action == 'create':
+            created = dict((field, rule[field]) for field in KEY_FIELDS)
+            try:
+                output = json.loads(task.result) if task.result else None
+            except ValueError:
+                output = None
+            if isinstance(output, dict) and output.get('id') is not None:
+                created['id'] = output['id']
+            result['created'].append(created)
+        elif action == 'update':
+            result['updated'].append(dict((field, rule[field]) for field in ('id',) + KEY_FIELDS + ('changed_fields',)))
+        else:
+            result['removed'].append(rule['id'])
+
+    result['changed'] = bool(result['created'] or result['updated'] or result['removed'])
+    result['summary'] = dict(
+        created=len(result['created']),
+        updated=len(result['updated']),
+        removed=len(result['removed']),
+        unchanged=unchanged,
+        failed=len(result['failed']),
+    )
+    if module._diff:
+        removed = set(rule['id'] for action, rule, args in operations if action == 'remove')
+        managed = [rule for rule in list(existing.values()) + surplus
+                   if rule_key(rule) in desired or rule['id'] in removed]
+        kept = [rule for rule in managed if rule['id'] not in removed and existing.get(rule_key(rule)) is not rule]
+        result['diff'] = dict(before=format_rules(managed), after=format_rules(kept + list(desired.values())))
+
+    if result['failed']:
+        module.fail_json(msg=f"{len(result['failed'])} of {len(operations)} event-rule operations failed", **result)
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
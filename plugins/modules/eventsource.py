@@ -1,9 +1,10 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliTimeout
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
+import time
 
 DOCUMENTATION = """
 ---
@@ -13,10 +14,18 @@ short_description: Manage event sources in MultiFlexi
 description:
     - This module allows you to create, update, remove, list and test event sources in MultiFlexi.
     - Event sources represent external webhook adapter database connections that the event processor polls for changes.
+    - O(state=test) without O(eventsource_id) tests all event sources (or those in O(eventsource_ids)) at once,
+      up to O(max_workers) C(event-source:test) calls in parallel, each limited to O(test_timeout) seconds.
+      The sources are listed with a single C(event-source:list) call and a health matrix with the latency of
+      every test is returned in RV(health).
 
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.parallel
+
 options:
     state:
         description:
@@ -95,6 +104,32 @@ options:
             - Sort order for list action.
         required: false
         type: str
+    eventsource_ids:
+        description:
+            - With O(state=test) and no O(eventsource_id), test only these event sources.
+        required: false
+        type: list
+        elements: int
+    include_disabled:
+        description:
+            - With O(state=test) and no O(eventsource_id), also test the disabled event sources.
+        required: false
+        type: bool
+        default: false
+    test_timeout:
+        description:
+            - Seconds a single C(event-source:test) call may take when testing many event sources.
+              A source whose test runs longer is reported with status V(timeout). V(0) means no limit.
+            - Not applied to the test of a single O(eventsource_id), which runs without a time limit.
+        required: false
+        type: float
+        default: 30
+    fail_unhealthy:
+        description:
+            - Fail the task when any tested event source is not healthy, e.g. as a pre-flight check.
+        required: false
+        type: bool
+        default: false
     multiflexi_cli_path:
         description:
             - Path to the multiflexi-cli executable.
@@ -137,6 +172,14 @@ EXAMPLES = """
     state: test
     eventsource_id: 1
 
+- name: Pre-flight check of all enabled event sources
+  vitexus.multiflexi.eventsource:
+    state: test
+    test_timeout: 5
+    max_workers: 10
+    fail_unhealthy: true
+  register: eventsource_health
+
 - name: Remove an event source
   vitexus.multiflexi.eventsource:
     state: absent
@@ -148,14 +191,85 @@ eventsource:
     description: The event source object or list of event sources.
     type: dict or list
     returned: always
+health:
+    description:
+        - One row per tested event source, in ID order. C(status) is V(ok), V(failed) or V(timeout).
+        - C(latency_ms) is the duration of the C(event-source:test) call, including the start of C(multiflexi-cli).
+    type: list
+    elements: dict
+    returned: when O(state=test) and no O(eventsource_id) is given
+    sample: [{"id": 1, "name": "AbraFlexi Webhooks", "db_connection": "mysql", "db_host": "db1",
+              "status": "ok", "latency_ms": 412.5},
+             {"id": 2, "name": "Bank", "db_connection": "pgsql", "db_host": "db2",
+              "status": "timeout", "latency_ms": 5001.2, "msg": "multiflexi-cli error: event-source:test timed out after 5s"}]
+summary:
+    description: Number of tested event sources per status, with the highest latency.
+    type: dict
+    returned: when O(state=test) and no O(eventsource_id) is given
+    sample: {"tested": 2, "ok": 1, "failed": 0, "timeout": 1, "max_latency_ms": 5001.2}
 """
 
-def run_cli_command(args):
+
+def connection_ok(output):
+    """Tell whether the output of a successful event-source:test reports a working connection."""
     try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
+        data = json.loads(output)
+    except ValueError:
+        return True, None
+    if not isinstance(data, dict):
+        return True, None
+    message = data.get('message') or data.get('error')
+    if data.get('success') is False or data.get('connected') is False or \
+            str(data.get('status', '')).lower() in ('error', 'failed', 'failure'):
+        return False, message or 'connection test failed'
+    return True, message
+
+
+def test_sources(module, cli_base, result):
+    """Test the selected event sources in parallel and return the health matrix."""
+    listed = json.loads(module.cli.run(cli_base + ['event-source:list', '--format', 'json']) or '[]')
+    selected = set(module.params['eventsource_ids'] or [])
+    sources = [source for source in (listed if isinstance(listed, list) else [])
+               if isinstance(source, dict) and source.get('id') is not None
+               and (int(source['id']) in selected if selected else
+                    module.params['include_disabled'] or str(source.get('enabled', 1)).lower() not in ('0', 'false'))]
+    sources.sort(key=lambda source: int(source['id']))
+    # 0 means no limit, subprocess would time out at once
+    timeout = module.params['test_timeout'] or None
+
+    def test(source):
+        started = time.monotonic()
+        try:
+            return module.cli.run(cli_base + ['event-source:test', '--id', str(source['id']), '--format', 'json'],
+                                  cached=False, timeout=timeout)
+        finally:
+            source['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+
+    health = []
+    for source, task in zip(sources, module.run_parallel(test, sources)):
+        row = dict((field, source.get(field)) for field in ('id', 'name', 'db_connection', 'db_host'))
+        row['latency_ms'] = source['latency_ms']
+        if isinstance(task.error, MultiflexiCliTimeout):
+            row.update(status='timeout', msg=str(task.error))
+        elif task.error:
+            row.update(status='failed', msg=str(task.error))
+        else:
+            passed, message = connection_ok(task.result)
+            row['status'] = 'ok' if passed else 'failed'
+            if message:
+                row['msg'] = message
+        health.append(row)
+
+    summary = dict(tested=len(health), ok=0, failed=0, timeout=0,
+                   max_latency_ms=max([row['latency_ms'] for row in health] or [0]))
+    for row in health:
+        summary[row['status']] += 1
+    result['health'] = health
+    result['summary'] = summary
+    result['msg'] = f"{summary['ok']} of {summary['tested']} event sources healthy"
+    if module.params['fail_unhealthy'] and summary['ok'] < summary['tested']:
+        module.fail_json(**result)
+    module.exit_json(**result)
 
 def run_module():
     module_args = dict(
@@ -173,6 +287,10 @@ def run_module():
         enabled=dict(type='bool', required=False, default=True),
         limit=dict(type='int', required=False),
         order=dict(type='str', required=False),
+        eventsource_ids=dict(type='list', elements='int', required=False),
+        include_disabled=dict(type='bool', required=False, default=False),
+        test_timeout=dict(type='float', required=False, default=30),
+        fail_unhealthy=dict(type='bool', required=False, default=False),
         multiflexi_cli_path=dict(type='str', required=False, default='multiflexi-cli'),
     )
 
@@ -182,8 +300,9 @@ def run_module():
         msg=""
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        parallel=True,
         supports_check_mode=True
     )
 
@@ -198,7 +317,7 @@ def run_module():
                 args.extend(['--limit', str(module.params['limit'])])
             if module.params.get('order'):
                 args.extend(['--order', module.params['order']])
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['eventsource'] = json.loads(output)
             result['msg'] = "Retrieved event source list"
 
@@ -206,7 +325,7 @@ def run_module():
             if module.params.get('eventsource_id'):
                 # Get existing event source
                 args = cli_base + ['event-source:get', '--id', str(module.params['eventsource_id']), '--format', 'json']
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 existing = json.loads(output)
                 result['eventsource'] = existing
                 result['msg'] = f"Retrieved event source {module.params['eventsource_id']}"
@@ -240,13 +359,13 @@ def run_module():
                         module.exit_json(**result)
 
                     update_args.extend(['--format', 'json'])
-                    run_cli_command(update_args)
+                    module.cli.run(update_args)
                     result['changed'] = True
                     result['msg'] = f"Updated event source {module.params['eventsource_id']}"
 
                     # Get updated record
                     args = cli_base + ['event-source:get', '--id', str(module.params['eventsource_id']), '--format', 'json']
-                    output = run_cli_command(args)
+                    output = module.cli.run(args)
                     result['eventsource'] = json.loads(output)
             else:
                 # Create new event source
@@ -271,7 +390,7 @@ def run_module():
                     if module.params.get(field):
                         create_args.extend([f'--{field}', str(module.params[field])])
 
-                output = run_cli_command(create_args)
+                output = module.cli.run(create_args)
                 result['eventsource'] = json.loads(output)
                 result['changed'] = True
                 result['msg'] = "Event source created"
@@ -283,7 +402,7 @@ def run_module():
             # Check if exists
             args = cli_base + ['event-source:get', '--id', str(module.params['eventsource_id']), '--format', 'json']
             try:
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 existing = json.loads(output)
                 if existing.get('status') == 'not found':
                      result['changed'] = False
@@ -298,16 +417,16 @@ def run_module():
                 module.exit_json(**result)
 
             args = cli_base + ['event-source:remove', '--id', str(module.params['eventsource_id']), '--format', 'json']
-            run_cli_command(args)
+            module.cli.run(args)
             result['changed'] = True
             result['msg'] = f"Removed event source {module.params['eventsource_id']}"
 
         elif state == 'test':
             if not module.params.get('eventsource_id'):
-                module.fail_json(msg="eventsource_id is required for test state")
+                test_sources(module, cli_base, result)
 
             args = cli_base + ['event-source:test', '--id', str(module.params['eventsource_id']), '--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['eventsource'] = json.loads(output)
             result['msg'] = "Connection test completed"
 
@@ -1,9 +1,11 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule, parse_time
 import json
+import random
+import time
 
 DOCUMENTATION = """
 ---
@@ -12,17 +14,64 @@ short_description: Manage jobs in Multiflexi via multiflexi-cli
 
 description:
     - This module allows you to create, update, get, list and delete jobs in Multiflexi using the multiflexi-cli tool with idempotency logic.
+    - With O(jobs) many jobs are handled in one task. The job list is fetched once and indexed
+      by runtemplate, schedule and application, so only the needed creates, updates and deletes are run,
+      up to O(max_workers) at a time.
 
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.api
+    - vitexus.multiflexi.parallel
+
 options:
     state:
         description:
             - The desired state of the job.
+            - With O(jobs) it is the default state of the listed jobs.
         required: true
         type: str
         choices: ['present', 'get', 'absent']
+    jobs:
+        description:
+            - List of jobs to manage in one task instead of the single job given by the top level options.
+            - Jobs are matched by O(jobs[].job_id) or by O(jobs[].runtemplate_id) + O(jobs[].scheduled)
+              (+ O(jobs[].app_id) when given) against a single C(job:list).
+        required: false
+        type: list
+        elements: dict
+        suboptions:
+            state:
+                description:
+                    - The desired state of this job, defaults to O(state).
+                type: str
+                choices: ['present', 'get', 'absent']
+            job_id:
+                description:
+                    - The ID of the job.
+                type: int
+            app_id:
+                description:
+                    - The ID of the application.
+                type: int
+            runtemplate_id:
+                description:
+                    - RunTemplate ID.
+                type: int
+            scheduled:
+                description:
+                    - Scheduled datetime.
+                type: str
+            executor:
+                description:
+                    - Executor type.
+                type: str
+            schedule_type:
+                description:
+                    - Schedule type.
+                type: str
     job_id:
         description:
             - The ID of the job.
@@ -53,6 +102,33 @@ options:
             - Schedule type.
         required: false
         type: str
+    wait:
+        description:
+            - Wait until the managed job (or all jobs of O(jobs)) finished and return their exit codes and durations.
+            - All waited jobs are checked with one C(job:list) query per poll, polls back off exponentially with jitter
+              from O(poll_interval) up to O(max_poll_interval) seconds.
+            - Ignored in check mode.
+        required: false
+        type: bool
+        default: false
+    wait_timeout:
+        description:
+            - Seconds to wait for the jobs to finish before failing.
+        required: false
+        type: int
+        default: 600
+    poll_interval:
+        description:
+            - Seconds before the first poll, doubled after every poll.
+        required: false
+        type: float
+        default: 1
+    max_poll_interval:
+        description:
+            - Upper bound of the poll interval in seconds.
+        required: false
+        type: float
+        default: 30
     multiflexi_cli:
         description:
             - Path to multiflexi-cli binary (default: multiflexi-cli in PATH).
@@ -83,6 +159,37 @@ EXAMPLES = """
   job:
     state: absent
     job_id: 1
+
+- name: Schedule jobs for many run templates at once
+  job:
+    state: present
+    jobs:
+      - runtemplate_id: 2
+        scheduled: "2025-07-01T10:00:00"
+        executor: "Native"
+      - runtemplate_id: 3
+        scheduled: "2025-07-01T10:00:00"
+        executor: "Native"
+      - job_id: 15
+        state: absent
+
+- name: Run a job and wait for its result
+  job:
+    state: present
+    runtemplate_id: 2
+    scheduled: "now"
+    wait: true
+    wait_timeout: 900
+  register: run
+
+- name: Wait for several jobs at once
+  job:
+    state: get
+    wait: true
+    jobs:
+      - job_id: 101
+      - job_id: 102
+      - job_id: 103
 """
 
 RETURN = """
@@ -90,36 +197,56 @@ job:
     description: The job object or list of jobs.
     type: dict or list
     returned: always
+jobs:
+    description:
+        - Outcome for every item of O(jobs), in the same order.
+        - C(action) is one of V(created), V(updated), V(deleted), V(unchanged), V(absent), V(found) or V(failed).
+    type: list
+    elements: dict
+    returned: when O(jobs) is used
+    sample: [{"job_id": 12, "action": "created", "changed": true, "job": {"id": 12, "runtemplate_id": 2}}]
+waited:
+    description:
+        - Final state of every waited job, C(exitcode) is null and C(finished) false for jobs still running at timeout.
+        - C(duration) is the run time in seconds computed from C(begin) and C(end).
+    type: list
+    elements: dict
+    returned: when O(wait) is true
+    sample: [{"id": 101, "finished": true, "exitcode": 0, "begin": "2025-07-01 10:00:00", "end": "2025-07-01 10:00:42", "duration": 42.0}]
+wait_elapsed:
+    description: Seconds spent waiting.
+    type: float
+    returned: when O(wait) is true and there were jobs to wait for
+wait_polls:
+    description: Number of C(job:list) queries made while waiting.
+    type: int
+    returned: when O(wait) is true and there were jobs to wait for
+summary:
+    description: Number of O(jobs) items per action.
+    type: dict
+    returned: when O(jobs) is used
+    sample: {"created": 1, "unchanged": 299}
 """
 
-def run_cli(module, args):
+JOB_FIELDS = ['app_id', 'runtemplate_id', 'scheduled', 'executor', 'schedule_type']
+# job:create only supports runtemplate_id, scheduled, executor, schedule_type
+CREATE_FIELDS = ['runtemplate_id', 'scheduled', 'executor', 'schedule_type']
+
+
+def cli_command(module, args):
     cli = module.params.get('multiflexi_cli', 'multiflexi-cli')
     # Always use --format json for all commands
-    cmd = [cli] + args + ['--verbose', '--format', 'json']
-    # Always print the CLI command being run
-    if module._verbosity >= 2:
-        module.warn(f"Running CLI command: {' '.join(cmd)}")
+    return [cli] + args + ['--verbose', '--format', 'json']
+
+def run_cli(module, args, cached=True):
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        # Always print stdout and stderr
-        if module._verbosity >= 2:
-            module.warn(f"CLI stdout: {result.stdout.strip()}")
-            if result.stderr.strip():
-                module.warn(f"CLI stderr: {result.stderr.strip()}")
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
-        # Always print error output
-        stdout = e.stdout or ''
-        stderr = e.stderr or ''
-        if module._verbosity >= 2:
-            module.warn(f"CLI error: {stderr.strip()}")
-            if stdout.strip():
-                module.warn(f"CLI stdout (on error): {stdout.strip()}")
+        return json.loads(module.cli.run(cli_command(module, args), cached=cached))
+    except MultiflexiCliError as e:
         try:
-            err = json.loads(stdout or stderr)
+            err = json.loads(e.stdout or e.stderr)
         except Exception:
-            err = stdout or stderr
-        module.fail_json(msg=f"CLI error: {err}", rc=e.returncode)
+            err = e.stdout or e.stderr or str(e)
+        module.fail_json(msg=f"CLI error: {err}", rc=e.rc)
     except Exception as e:
         module.fail_json(msg=f"Failed to run CLI: {e}")
 
@@ -147,6 +274,221 @@ def find_existing_job(module):
             return None
     return None
 
+class JobIndex(object):
+    """Jobs of one job:list, indexed by id, by (runtemplate_id, scheduled, app_id) and by (runtemplate_id, scheduled)."""
+
+    def __init__(self, jobs):
+        self.by_id = {}
+        self.by_key = {}
+        self.by_schedule = {}
+        for job in jobs:
+            self.add(job)
+
+    @staticmethod
+    def key(job):
+        return (str(job.get('runtemplate_id')), str(job.get('scheduled')), str(job.get('app_id')))
+
+    def add(self, job):
+        if job.get('id') is not None:
+            self.by_id[str(job['id'])] = job
+        key = self.key(job)
+        if self.by_key.setdefault(key, job) is job:
+            # Jobs of any app in the order they were indexed, the first one answers a lookup without app_id
+            self.by_schedule.setdefault(key[:2], []).append(job)
+
+    def remove(self, job):
+        if job.get('id') is not None:
+            self.by_id.pop(str(job['id']), None)
+        key = self.key(job)
+        if self.by_key.get(key) is job:
+            del self.by_key[key]
+            jobs = self.by_schedule[key[:2]]
+            jobs[:] = [other for other in jobs if other is not job]
+            if not jobs:
+                del self.by_schedule[key[:2]]
+
+    def find(self, item):
+        if item.get('job_id'):
+            return self.by_id.get(str(item['job_id']))
+        if item.get('runtemplate_id') and item.get('scheduled'):
+            if item.get('app_id'):
+                return self.by_key.get(self.key(item))
+            jobs = self.by_schedule.get((str(item['runtemplate_id']), str(item['scheduled'])))
+            return jobs[0] if jobs else None
+        return None
+
+
+def plan_job(module, index, item):
+    """Decide what one item of the jobs list needs, return ``(outcome, cli_args)``.
+
+    The index is updated as if the command succeeded, so later items see
+    the planned state and all commands of the batch can run concurrently.
+    """
+    job = index.find(item)
+    outcome = dict(job_id=job.get('id') if job else item.get('job_id'), changed=False, job=job)
+    state = item['state']
+
+    if state == 'get':
+        outcome['action'] = 'found' if job else 'absent'
+        return outcome, None
+
+    if state == 'absent':
+        if not job:
+            outcome['action'] = 'absent'
+            return outcome, None
+        index.remove(job)
+        outcome.update(action='deleted', changed=True, job=None)
+        return outcome, ['job:delete', '--id', str(job['id'])]
+
+    if job:
+        update_args = ['job:update', '--id', str(job['id'])]
+        changes = {}
+        for field in JOB_FIELDS:
+            val = item.get(field)
+            if val is not None and str(val) != str(job.get(field)):
+                update_args += [f'--{field}', str(val)]
+                changes[field] = val
+        if not changes:
+            outcome['action'] = 'unchanged'
+            return outcome, None
+        index.remove(job)
+        job = dict(job, **changes)
+        index.add(job)
+        outcome.update(action='updated', changed=True, job=job)
+        return outcome, update_args
+
+    if not item.get('runtemplate_id'):
+        outcome.update(action='failed', msg="job not found and runtemplate_id is required to create it")
+        return outcome, None
+    create_args = ['job:create']
+    for field in CREATE_FIELDS:
+        val = item.get(field)
+        if val is not None:
+            create_args += [f'--{field}', str(val)]
+    job = dict((field, item.get(field)) for field in JOB_FIELDS if item.get(field) is not None)
+    index.add(job)
+    outcome.update(action='created', changed=True, job=job)
+    return outcome, create_args
+
+
+def run_batch(module, result):
+    jobs = run_cli(module, ['job:list'])
+    index = JobIndex(jobs if isinstance(jobs, list) else [])
+    outcomes = []
+    planned = []
+    for item in module.params['jobs']:
+        item = dict(item)
+        item['state'] = item.get('state') or module.params['state']
+        outcome, args = plan_job(module, index, item)
+        outcome['item'] = dict((key, value) for key, value in item.items() if value is not None)
+        outcomes.append(outcome)
+        if args:
+            planned.append((outcome, cli_command(module, args)))
+
+    tasks = module.run_commands([args for outcome, args in planned])
+    for (outcome, args), task in zip(planned, tasks):
+        if task.error:
+            outcome.update(action='failed', changed=False, msg=str(task.error))
+        elif outcome['action'] == 'created' and task.result:
+            created = json.loads(task.result)
+            if isinstance(created, dict):
+                outcome['job'].update(created)
+                outcome['job_id'] = created.get('id')
+
+    summary = {}
+    for outcome in outcomes:
+        summary[outcome['action']] = summary.get(outcome['action'], 0) + 1
+    result['changed'] = any(outcome['changed'] for outcome in outcomes)
+    result['jobs'] = outcomes
+    result['summary'] = summary
+    if summary.get('failed'):
+        module.fail_json(msg=f"{summary['failed']} of {len(outcomes)} jobs failed", **result)
+    exit_waiting(module, result)
+
+def job_state(job_id, job):
+    """Summarize a job:list record of a waited job."""
+    job = job or {}
+    begin, end = job.get('begin'), job.get('end')
+    duration = None
+    if begin and end and parse_time(begin) and parse_time(end):
+        duration = (parse_time(end) - parse_time(begin)).total_seconds()
+    return dict(id=job_id, finished=bool(end), exitcode=job.get('exitcode') if end else None,
+                begin=begin, end=end, duration=duration)
+
+
+def poll_jobs(module, job_ids, window):
+    """One job:list query returning the records of job_ids, newest jobs first.
+
+    The page is widened until it reaches back to the oldest waited job,
+    which normally is one query since waited jobs are the newest ones.
+    """
+    oldest = min(job_ids)
+    while True:
+        jobs = run_cli(module, ['job:list', '--fields', 'id,begin,end,exitcode', '--order', 'D', '--limit', str(window)],
+                       cached=False)
+        jobs = jobs if isinstance(jobs, list) else []
+        ids = [int(job['id']) for job in jobs if job.get('id') is not None]
+        if len(jobs) < window or (ids and min(ids) <= oldest):
+            return dict((int(job['id']), job) for job in jobs if job.get('id') is not None), window
+        window *= 4
+
+
+def wait_for_jobs(module, job_ids):
+    """Poll until all jobs finished or wait_timeout expired, return (states, polls)."""
+    job_ids = sorted(set(int(job_id) for job_id in job_ids))
+    deadline = time.time() + module.params['wait_timeout']
+    delay = module.params['poll_interval']
+    window = max(100, len(job_ids))
+    states = dict((job_id, job_state(job_id, None)) for job_id in job_ids)
+    polls = 0
+    while True:
+        pending = [job_id for job_id in job_ids if not states[job_id]['finished']]
+        records, window = poll_jobs(module, pending, window)
+        polls += 1
+        for job_id in pending:
+            states[job_id] = job_state(job_id, records.get(job_id))
+        if all(state['finished'] for state in states.values()) or time.time() >= deadline:
+            return [states[job_id] for job_id in job_ids], polls
+        # Exponential backoff with jitter, so many waiting tasks do not poll in lockstep
+        sleep = min(delay, module.params['max_poll_interval'])
+        time.sleep(min(sleep / 2 + random.uniform(0, sleep / 2), max(0, deadline - time.time())))
+        delay = sleep * 2
+
+
+def exit_waiting(module, result):
+    """exit_json, after waiting for the resulting jobs when wait is requested."""
+    if not module.params['wait'] or module.check_mode:
+        module.exit_json(**result)
+    if result.get('jobs') is not None:
+        job_ids = [outcome['job_id'] for outcome in result['jobs']
+                   if outcome.get('job_id') and outcome['action'] in ('created', 'updated', 'unchanged', 'found')]
+    elif isinstance(result.get('job'), dict) and result['job'].get('id'):
+        job_ids = [result['job']['id']]
+    else:
+        module.fail_json(msg="No job to wait for", **result)
+    if not job_ids:
+        result['waited'] = []
+        module.exit_json(**result)
+
+    started = time.time()
+    waited, polls = wait_for_jobs(module, job_ids)
+    result['waited'] = waited
+    result['wait_elapsed'] = round(time.time() - started, 3)
+    result['wait_polls'] = polls
+    if result.get('jobs') is not None:
+        states = dict((state['id'], state) for state in waited)
+        for outcome in result['jobs']:
+            state = states.get(int(outcome['job_id'])) if outcome.get('job_id') else None
+            if state:
+                outcome.update(exitcode=state['exitcode'], duration=state['duration'], finished=state['finished'])
+    elif waited[0]['finished']:
+        result['job'].update(end=waited[0]['end'], exitcode=waited[0]['exitcode'])
+    unfinished = [state['id'] for state in waited if not state['finished']]
+    if unfinished:
+        module.fail_json(msg=f"Timed out after {module.params['wait_timeout']}s waiting for jobs {unfinished}", **result)
+    module.exit_json(**result)
+
+
 def run_module():
     module_args = dict(
         state=dict(type='str', required=True, choices=['present', 'get', 'absent']),
@@ -156,6 +498,19 @@ def run_module():
         scheduled=dict(type='str', required=False),
         executor=dict(type='str', required=False),
         schedule_type=dict(type='str', required=False),
+        jobs=dict(type='list', elements='dict', required=False, options=dict(
+            state=dict(type='str', choices=['present', 'get', 'absent']),
+            job_id=dict(type='int'),
+            app_id=dict(type='int'),
+            runtemplate_id=dict(type='int'),
+            scheduled=dict(type='str'),
+            executor=dict(type='str'),
+            schedule_type=dict(type='str'),
+        )),
+        wait=dict(type='bool', required=False, default=False),
+        wait_timeout=dict(type='int', required=False, default=600),
+        poll_interval=dict(type='float', required=False, default=1),
+        max_poll_interval=dict(type='float', required=False, default=30),
         multiflexi_cli=dict(type='str', required=False, default='multiflexi-cli'),
     )
 
@@ -164,13 +519,18 @@ def run_module():
         job=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        api_transport=True,
+        parallel=True,
         supports_check_mode=True
     )
 
     state = module.params['state']
 
+    if module.params['jobs'] is not None:
+        run_batch(module, result)
+
     if state == 'get':
         job = find_existing_job(module)
         if job:
@@ -178,7 +538,7 @@ def run_module():
         else:
             jobs = run_cli(module, ['job:list'])
             result['job'] = jobs
-        module.exit_json(**result)
+        exit_waiting(module, result)
 
     elif state == 'present':
         job = find_existing_job(module)
@@ -186,7 +546,7 @@ def run_module():
             # Update
             update_args = ['job:update', '--id', str(job['id'])]
             changed = False
-            for field in ['app_id', 'runtemplate_id', 'scheduled', 'executor', 'schedule_type']:
+            for field in JOB_FIELDS:
                 val = module.params.get(field)
                 if val is not None and str(val) != str(job.get(field)):
                     update_args += [f'--{field}', str(val)]
@@ -194,22 +554,21 @@ def run_module():
 
             if not changed:
                 result['job'] = job
-                module.exit_json(**result)
+                exit_waiting(module, result)
 
             if module.check_mode:
                 result['changed'] = True
                 result['job'] = job
-                module.exit_json(**result)
+                exit_waiting(module, result)
             run_cli(module, update_args)
             latest = run_cli(module, ['job:get', '--id', str(job['id'])])
             result['changed'] = True
             result['job'] = latest
-            module.exit_json(**result)
+            exit_waiting(module, result)
         else:
             # Create
             create_args = ['job:create']
-            # job:create only supports runtemplate_id, scheduled, executor, schedule_type
-            for field in ['runtemplate_id', 'scheduled', 'executor', 'schedule_type']:
+            for field in CREATE_FIELDS:
                 val = module.params.get(field)
                 if val is not None:
                     create_args += [f'--{field}', str(val)]
@@ -217,7 +576,7 @@ def run_module():
                 # Simulate creation
                 result['changed'] = True
                 result['job'] = None
-                module.exit_json(**result)
+                exit_waiting(module, result)
             created = run_cli(module, create_args)
             # Fetch latest by id
             job_id = created.get('id')
@@ -227,7 +586,7 @@ def run_module():
             else:
                 result['job'] = created
             result['changed'] = True
-            module.exit_json(**result)
+            exit_waiting(module, result)
 
     elif state == 'absent':
         job = find_existing_job(module)
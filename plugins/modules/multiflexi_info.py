@@ -1,9 +1,10 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule, ping
 import json
+import time
 
 DOCUMENTATION = """
 ---
@@ -11,14 +12,47 @@ module: multiflexi_info
 short_description: Gather MultiFlexi application status facts
 description:
   - Runs 'multiflexi-cli status --format=json' and returns its output as Ansible facts prefixed with multiflexi_
+  - O(sections) selects what is gathered, so job statistics or a ping do not need the whole status.
+  - With O(facts_ttl) sections gathered less than that many seconds ago are taken from the facts of the host
+    instead of being gathered again. With fact caching enabled in C(ansible.cfg) (e.g. C(fact_caching = jsonfile))
+    this holds across plays and playbook runs. Handled by the action plugin of this module on the controller.
 author:
   - Vitex (@Vitexus)
 version_added: "1.0"
+extends_documentation_fragment:
+  - vitexus.multiflexi.cli
+  - vitexus.multiflexi.api
+options:
+  sections:
+    description:
+      - V(status) gathers the output of the C(status) command as C(multiflexi_*) facts.
+      - V(jobs) gathers the job statistics of C(job:status) as the C(multiflexi_jobs) fact.
+      - V(ping) checks that MultiFlexi answers, with the cheapest call of the transport (C(/ping) of the API,
+        one company ID listed by the CLI), into the C(multiflexi_ping) fact. It is never taken from the cache.
+    type: list
+    elements: str
+    choices: ['status', 'jobs', 'ping']
+    default: ['status']
+  facts_ttl:
+    description:
+      - Seconds the facts of a section are reused for. V(0) gathers every time.
+    type: int
+    default: 0
 """
 
 EXAMPLES = """
 - name: Gather MultiFlexi facts
   multiflexi_info:
+
+# ansible.cfg: fact_caching = jsonfile, fact_caching_connection = ~/.cache/ansible-facts
+- name: Reuse MultiFlexi facts gathered during the last hour
+  multiflexi_info:
+    sections: [status, jobs]
+    facts_ttl: 3600
+
+- name: Minute health check
+  multiflexi_info:
+    sections: [ping]
 """
 
 RETURN = """
@@ -40,23 +74,42 @@ ansible_facts:
     multiflexi_database: "mysql Localhost via UNIX socket ..."
     multiflexi_status: "running"
     multiflexi_timestamp: "2025-06-18T13:02:38+00:00"
+    multiflexi_jobs: {"total_jobs": 120, "successful_jobs": 118, "failed_jobs": 2}
+    multiflexi_ping: {"ok": true, "latency": 0.0412}
+    multiflexi_gathered: {"status": 1750251758, "jobs": 1750251758}
+cached_sections:
+  description: Sections taken from the facts of the host because they were younger than O(facts_ttl).
+  returned: always
+  type: list
+  elements: str
+  sample: ["status"]
 """
 
 def main():
-    module = AnsibleModule(argument_spec={}, supports_check_mode=True)
+    module_args = dict(
+        sections=dict(type='list', elements='str', default=['status'], choices=['status', 'jobs', 'ping']),
+        facts_ttl=dict(type='int', default=0),
+    )
+    module = MultiflexiModule(argument_spec=module_args, api_transport=True, supports_check_mode=True)
+    sections = module.params['sections']
     try:
-        result = subprocess.run(
-            ["multiflexi-cli", "status", "--no-interaction", "--format=json"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True,
-            text=True
-        )
-        data = json.loads(result.stdout)
-        facts = {"multiflexi_" + k: v for k, v in data.items()}
-        module.exit_json(changed=False, ansible_facts=facts)
-    except subprocess.CalledProcessError as e:
-        module.fail_json(msg="Failed to run multiflexi-cli: %s" % e.stderr)
+        facts = {}
+        if 'status' in sections:
+            output = module.cli.run(["multiflexi-cli", "status", "--no-interaction", "--format=json"])
+            data = json.loads(output)
+            facts.update(("multiflexi_" + k, v) for k, v in data.items())
+        if 'jobs' in sections:
+            facts['multiflexi_jobs'] = json.loads(module.cli.run(["multiflexi-cli", "job:status", "--format=json"]))
+        if 'ping' in sections:
+            try:
+                facts['multiflexi_ping'] = dict(ok=True, latency=ping(module.cli))
+            except MultiflexiCliError as e:
+                facts['multiflexi_ping'] = dict(ok=False, msg=str(e))
+        now = int(time.time())
+        facts['multiflexi_gathered'] = dict((section, now) for section in sections)
+        module.exit_json(changed=False, ansible_facts=facts, cached_sections=[])
+    except MultiflexiCliError as e:
+        module.fail_json(msg="Failed to run multiflexi-cli: %s" % (e.stderr or e))
     except Exception as e:
         module.fail_json(msg="Error: %s" % str(e))
 
@@ -1,9 +1,10 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule, ping
 import json
+import time
 
 DOCUMENTATION = """
 ---
@@ -13,11 +14,43 @@ short_description: Get MultiFlexi system status
 description:
     - This module retrieves comprehensive MultiFlexi system status including database configuration, 
       system services, entity counts, Zabbix monitoring, and OpenTelemetry telemetry configuration.
+    - With O(sections) only the requested parts are gathered. The C(status) command is run only for the
+      sections it provides, V(jobs) is read with C(job:status) and V(ping) makes the single cheapest call
+      of the transport, so frequent health checks do not compute the whole status.
+    - With O(facts_ttl) sections gathered less than that many seconds ago are taken from the facts of the host
+      instead of being gathered again, like in M(vitexus.multiflexi.multiflexi_info). Handled by the action plugin
+      of this module on the controller.
 
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.api
+
 options:
+    sections:
+        description:
+            - Parts of the status to gather. All sections of the C(status) command when empty.
+            - V(database), V(services), V(entities), V(monitoring) and V(telemetry) are sections of the C(status)
+              command and share one call; sections an older C(multiflexi-cli) does not report are left out.
+            - V(jobs) are the job statistics of C(job:status).
+            - V(ping) mirrors the C(/ping) endpoint of the API. With O(transport=api) it calls C(/ping), with the
+              CLI it lists one company ID, which checks that the CLI starts and reaches the database.
+        required: false
+        type: list
+        elements: str
+        choices: ['database', 'services', 'entities', 'monitoring', 'telemetry', 'jobs', 'ping']
+        default: []
+    facts_ttl:
+        description:
+            - Seconds the gathered sections are reused for. V(0) gathers every time.
+            - Sections are kept in the C(multiflexi_status_sections) fact of the host, the whole status under
+              the key C(all). With fact caching enabled in C(ansible.cfg) this holds across playbook runs.
+            - V(ping) is never reused.
+        required: false
+        type: int
+        default: 0
     multiflexi_cli_path:
         description:
             - Path to the multiflexi-cli executable.
@@ -34,6 +67,21 @@ EXAMPLES = """
 - name: Get MultiFlexi status with custom CLI path
   multiflexi_status:
     multiflexi_cli_path: '/usr/local/bin/multiflexi-cli'
+
+- name: Health check run every minute
+  multiflexi_status:
+    sections: [ping]
+  register: health
+  failed_when: not health.status.ping.ok
+
+- name: Only database and job statistics
+  multiflexi_status:
+    sections: [database, jobs]
+
+- name: Job statistics at most five minutes old
+  multiflexi_status:
+    sections: [jobs]
+    facts_ttl: 300
 """
 
 RETURN = """
@@ -57,47 +105,93 @@ status:
         telemetry:
             description: OpenTelemetry configuration
             type: dict
+        jobs:
+            description: Job statistics of C(job:status), when requested in O(sections).
+            type: dict
+        ping:
+            description: Result of the V(ping) section, C(latency) is the round trip in seconds.
+            type: dict
+            sample: {"ok": true, "latency": 0.0412}
+ansible_facts:
+    description:
+        - With O(facts_ttl), the gathered sections in C(multiflexi_status_sections) and the time each was gathered
+          in C(multiflexi_status_gathered).
+    type: dict
+    returned: when O(facts_ttl) is set
+    sample: {"multiflexi_status_sections": {"jobs": {"total_jobs": 120}},
+             "multiflexi_status_gathered": {"jobs": 1750251758}}
+cached_sections:
+    description: Sections taken from the facts of the host because they were younger than O(facts_ttl).
+    type: list
+    elements: str
+    returned: always
+    sample: ["jobs"]
 msg:
     description: A message describing the status check.
     type: str
     returned: always
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
-
 def run_module():
     module_args = dict(
+        sections=dict(type='list', elements='str', required=False, default=[],
+                      choices=['database', 'services', 'entities', 'monitoring', 'telemetry', 'jobs', 'ping']),
+        facts_ttl=dict(type='int', required=False, default=0),
         multiflexi_cli_path=dict(type='str', required=False, default='multiflexi-cli'),
     )
 
     result = dict(
         changed=False,
         status=None,
+        cached_sections=[],
         msg=""
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        api_transport=True,
         supports_check_mode=True
     )
 
     cli_path = module.params['multiflexi_cli_path']
     cli_base = [cli_path, 'status']
 
+    sections = module.params['sections']
+    status_sections = [section for section in sections if section not in ('jobs', 'ping')]
+
     try:
-        args = cli_base + ['--format', 'json']
-        output = run_cli_command(args)
-        result['status'] = json.loads(output)
-        result['msg'] = "Retrieved MultiFlexi system status"
+        if not sections:
+            args = cli_base + ['--format', 'json']
+            output = module.cli.run(args)
+            result['status'] = json.loads(output)
+            result['msg'] = "Retrieved MultiFlexi system status"
+        else:
+            status = {}
+            if 'ping' in sections:
+                try:
+                    status['ping'] = dict(ok=True, latency=ping(module.cli, cli_path))
+                except MultiflexiCliError as e:
+                    status['ping'] = dict(ok=False, msg=str(e))
+            if status_sections:
+                full = json.loads(module.cli.run(cli_base + ['--format', 'json']))
+                status.update((section, full[section]) for section in status_sections
+                              if isinstance(full, dict) and section in full)
+            if 'jobs' in sections:
+                status['jobs'] = json.loads(module.cli.run([cli_path, 'job:status', '--format', 'json']))
+            result['status'] = status
+            result['msg'] = f"Retrieved MultiFlexi {', '.join(sections)} status"
             
     except Exception as e:
         module.fail_json(msg=str(e))
 
+    if module.params['facts_ttl']:
+        now = int(time.time())
+        # The whole status is kept as the section "all"
+        gathered = dict(all=result['status']) if not sections else result['status']
+        result['ansible_facts'] = dict(
+            multiflexi_status_sections=gathered,
+            multiflexi_status_gathered=dict((section, now) for section in sections or ['all']),
+        )
     module.exit_json(**result)
 
 def main():
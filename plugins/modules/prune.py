@@ -1,9 +1,11 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule, parse_time
+from datetime import datetime, timedelta
 import json
+import time
 
 DOCUMENTATION = """
 ---
@@ -13,10 +15,22 @@ short_description: Prune logs and jobs in MultiFlexi
 description:
     - This module allows you to prune logs and jobs in MultiFlexi, keeping only the latest N records.
     - Helps maintain database performance by cleaning up old data.
+    - With O(batch_size) the rows are deleted in bounded chunks, each C(prune) call deleting about
+      O(batch_size) of the oldest rows by lowering C(--keep) step by step from the current table size
+      down to O(keep), so no single call locks the table for long.
+    - Batched runs stop starting new chunks once O(time_budget) is used up and return a RV(cursor)
+      to continue from. With O(cursor_file) the cursor is kept in a JSON file on the controller and
+      the next run resumes from it.
+    - With O(retention) jobs are pruned by age and per company, keeping the newest jobs of every run template,
+      so a busy company does not force a low global O(keep) on the quiet ones.
 
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.parallel
+
 options:
     logs:
         description:
@@ -36,6 +50,96 @@ options:
         required: false
         type: int
         default: 1000
+    batch_size:
+        description:
+            - Delete at most this many rows of a table per C(prune) call, enabling the batched mode.
+            - Without it all rows above O(keep) are deleted by one call.
+        required: false
+        type: int
+    time_budget:
+        description:
+            - Seconds a batched run may take. No chunk is started when the time left is shorter than the
+              slowest chunk so far; the remaining work is left for the next run.
+            - V(0) means no limit.
+        required: false
+        type: float
+        default: 0
+    batch_pause:
+        description:
+            - Seconds to sleep between two chunks, leaving the database to the scheduler and executors.
+        required: false
+        type: float
+        default: 0
+    row_counts:
+        description:
+            - Current number of rows per table (keys V(logs) and V(jobs)), the upper end of the batched deletion.
+            - The number of jobs is read from C(total_jobs) of C(job:status) when not given.
+              C(multiflexi-cli) cannot count logs, so batched pruning of logs needs O(row_counts.logs).
+        required: false
+        type: dict
+    cursor:
+        description:
+            - Cursor returned as RV(cursor) by a previous batched run to continue from.
+            - Jobs are counted again when resuming, so rows written since the cursor was saved do not
+              make the first chunk larger than O(batch_size). Logs, which the CLI cannot count, continue from
+              the lower of O(row_counts.logs) and the size the cursor reached, so chunks already pruned are not
+              repeated.
+            - The cursor keeps the duration of the slowest chunk, so a resumed run does not start a chunk it
+              cannot finish within O(time_budget).
+            - Ignored when it was made for a different O(keep).
+        required: false
+        type: dict
+    cursor_file:
+        description:
+            - JSON file on the controller holding the cursor between runs. It is read before and written after
+              every batched run (also after a failure), so interrupted or time-boxed runs resume where they stopped.
+            - Handled by the action plugin of this module on the controller.
+        required: false
+        type: path
+    retention:
+        description:
+            - Retention rules of jobs. A rule with O(retention[].company_id) or O(retention[].company) applies to
+              the jobs of that company, the rule without a company to the jobs of all other companies.
+              Jobs no rule applies to are kept.
+            - Jobs are read with paged C(job:list), newest first, one page of O(page_size) jobs at a time, and the
+              expired jobs of a page are deleted before the next page is read. C(job:list) has no ID filter, so
+              the pages are keyed by the last job ID seen on the module side and jobs created meanwhile are skipped.
+            - C(multiflexi-cli) has no bulk delete or delete by filter, so every expired job is deleted by its ID with
+              its own C(job:delete) call, up to O(max_workers) at once, in chunks of O(batch_size) within
+              O(time_budget). Use O(multiflexi_cli_worker) to avoid starting a CLI process per job.
+              When the time budget is used up the scan stops, the jobs left over are deleted by the next run.
+            - Only finished jobs are deleted. C(multiflexi-cli) can neither list nor delete single log records,
+              logs are pruned by O(keep) only.
+            - Can be combined with O(jobs) and O(logs), the retention rules are applied first.
+        required: false
+        type: list
+        elements: dict
+        suboptions:
+            company_id:
+                description:
+                    - The ID of the company the rule applies to.
+                type: int
+            company:
+                description:
+                    - The slug of the company the rule applies to.
+                type: str
+            max_age_days:
+                description:
+                    - Delete jobs which began more than this many days ago.
+                    - Without it only O(retention[].keep_last) jobs of every run template are kept, whatever their age.
+                      A rule without both keeps all jobs of its company.
+                type: int
+            keep_last:
+                description:
+                    - Number of the newest jobs of every run template which are kept regardless of their age.
+                type: int
+                default: 0
+    page_size:
+        description:
+            - Number of jobs read per C(job:list) call when evaluating O(retention).
+        required: false
+        type: int
+        default: 1000
     multiflexi_cli_path:
         description:
             - Path to the multiflexi-cli executable.
@@ -60,6 +164,31 @@ EXAMPLES = """
   prune:
     jobs: true
     keep: 2000
+
+- name: Prune logs during business hours, 50k rows per call, at most 10 minutes per run
+  prune:
+    logs: true
+    keep: 1000000
+    batch_size: 50000
+    batch_pause: 2
+    time_budget: 600
+    row_counts:
+      logs: "{{ log_rows }}"
+    cursor_file: "{{ playbook_dir }}/state/prune-cursor.json"
+  register: pruned
+
+- name: Keep 90 days of jobs, 14 days of the busy company, always the last 50 jobs of every run template
+  prune:
+    retention:
+      - max_age_days: 90
+        keep_last: 50
+      - company: busy-company
+        max_age_days: 14
+        keep_last: 50
+      - company_id: 7
+    max_workers: 4
+    batch_size: 5000
+    time_budget: 600
 """
 
 RETURN = """
@@ -67,24 +196,273 @@ prune_result:
     description: Result of the pruning operation.
     type: dict
     returned: always
+batches:
+    description:
+        - One entry per chunk of a batched run with the C(--keep) used, the rows counted C(before) and C(after)
+          the chunk, the rows deleted and the throughput.
+        - Tables the CLI cannot count (logs) have C(after) set to the C(--keep) used and C(deleted) set to V(null).
+          In check mode the counts are the planned ones.
+    type: list
+    elements: dict
+    returned: when O(batch_size) is set
+    sample: [{"table": "jobs", "keep": 29950000, "before": 30000000, "after": 29950012, "deleted": 49988,
+              "duration": 4.21, "rows_per_second": 11873.6}]
+throughput:
+    description: Totals of a batched run, over the chunks with measured counts.
+    type: dict
+    returned: when O(batch_size) is set
+    sample: {"deleted": 500000, "duration": 41.9, "rows_per_second": 11933.2, "batches": 10}
+cursor:
+    description:
+        - Progress of a batched run, the number of rows of every table still above O(keep) is C(remaining).
+        - Pass it as O(cursor) (or use O(cursor_file)) to resume.
+    type: dict
+    returned: when O(batch_size) is set
+    sample: {"keep": 1000000, "tables": {"logs": 27500000}, "remaining": {"logs": 26500000}, "slowest": 4.21}
+complete:
+    description: Whether a batched run pruned every table down to O(keep).
+    type: bool
+    returned: when O(batch_size) is set
+retention:
+    description:
+        - Outcome of the O(retention) rules. C(expired) jobs matched a rule, C(pending) ones were found but left for
+          the next run because of O(time_budget), C(companies) counts the kept and deleted jobs per company ID.
+        - C(scanned) and C(expired) cover only the jobs read before the time budget ran out.
+    type: dict
+    returned: when O(retention) is set
+    sample: {"scanned": 120000, "expired": 80000, "deleted": 79998, "pending": 0,
+             "failed": [{"id": 1234, "msg": "multiflexi-cli error: ..."}],
+             "companies": {"1": {"kept": 35000, "deleted": 79998}, "7": {"kept": 5002, "deleted": 0}}}
 msg:
     description: A message describing the action taken.
     type: str
     returned: always
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
+# Tables multiflexi-cli can count, it has no command counting logs
+COUNTED_TABLES = ('jobs',)
+
+
+def count_rows(module, cli_path, table):
+    """Return the number of rows of a table as reported by the CLI, None when it cannot be counted."""
+    if table not in COUNTED_TABLES:
+        return None
+    status = module.cli.run_json([cli_path, 'job:status', '--format', 'json'], cached=False)
+    size = status.get('total_jobs') if isinstance(status, dict) else None
+    return int(size) if str(size).isdigit() else None
+
+
+def table_sizes(module, cli_path, targets, cursor):
+    """Return the current size of every table, from row_counts or counted with the CLI.
+
+    Tables the CLI cannot count continue from the cursor of an earlier run with the same keep,
+    the row_counts given for them are not lowered by the chunks already pruned.
+    """
+    counts = dict(module.params.get('row_counts') or {})
+    reached = (cursor.get('tables') or {}) if cursor.get('keep') == module.params['keep'] else {}
+    sizes = {}
+    for table in targets:
+        size = counts.get(table)
+        if size is None:
+            size = count_rows(module, cli_path, table)
+        if size is None:
+            module.fail_json(msg=f"Unable to count {table}, set row_counts.{table}")
+        size = int(size)
+        if table not in COUNTED_TABLES and reached.get(table) is not None:
+            size = min(size, int(reached[table]))
+        sizes[table] = size
+    return sizes
+
+
+def retention_rules(module, cli_path):
+    """Return the default rule and the rules per company ID."""
+    default = None
+    rules = {}
+    slugs = None
+    for rule in module.params['retention']:
+        company_id = rule.get('company_id')
+        if company_id is None and rule.get('company'):
+            if slugs is None:
+                slugs = module.cli.index([cli_path, 'company:list', '--fields', 'id,slug', '--format', 'json'], 'slug')
+            if rule['company'] not in slugs:
+                module.fail_json(msg=f"Company {rule['company']} not found")
+            company_id = slugs[rule['company']]['id']
+        if (rule.get('max_age_days') or 0) < 0 or (rule.get('keep_last') or 0) < 0:
+            module.fail_json(msg="max_age_days and keep_last of retention rules must not be negative")
+        if company_id is None:
+            if default is not None:
+                module.fail_json(msg="Only one retention rule may apply to all companies")
+            default = rule
+        else:
+            rules[int(company_id)] = rule
+    return default, rules
+
+
+def is_expired(rule, job, rank, now):
+    """Whether the retention rule lets the job go, rank counting the jobs of its run template newest first."""
+    if rule is None or not job.get('end') or rank <= (rule.get('keep_last') or 0):
+        return False
+    if rule.get('max_age_days') is None:
+        return bool(rule.get('keep_last'))
+    begin = parse_time(job.get('begin') or job.get('end'))
+    return begin is not None and now - begin > timedelta(days=rule['max_age_days'])
+
+
+def delete_jobs(module, cli_path, jobs, deadline, summary, slowest):
+    """Delete the jobs by ID in chunks of batch_size, return the slowest chunk or None once out of time."""
+    chunk = module.params['batch_size'] or len(jobs) or 1
+    for start in range(0, len(jobs), chunk):
+        if deadline and time.time() + slowest > deadline:
+            summary['pending'] += len(jobs) - start
+            return None
+        chunk_jobs = jobs[start:start + chunk]
+        chunk_started = time.time()
+        tasks = module.run_commands([[cli_path, 'job:delete', '--id', str(job_id), '--format', 'json']
+                                     for job_id, _company in chunk_jobs])
+        slowest = max(slowest, time.time() - chunk_started)
+        for (job_id, company), task in zip(chunk_jobs, tasks):
+            if task.error:
+                summary['failed'].append(dict(id=job_id, msg=str(task.error)))
+                summary['companies'][company]['kept'] += 1
+            else:
+                summary['deleted'] += 1
+                summary['companies'][company]['deleted'] += 1
+    return slowest
+
+
+def prune_retention(module, cli_path, deadline, result):
+    """Delete the jobs expired by the retention rules page by page, newest first, until the time budget is used up.
+
+    Only one page of jobs is held at a time. job:list has no ID filter, so the keyset condition
+    ``id < last_seen`` is applied to every page: the offset of the next page counts only the rows left
+    in the table, and rows pushed back into a page by jobs created since are skipped.
+    """
+    summary = result['retention'] = dict(scanned=0, expired=0, deleted=0, pending=0, failed=[], companies={})
+    default, rules = retention_rules(module, cli_path)
+    now = datetime.now()
+    page_size = module.params['page_size']
+    args = [cli_path, 'job:list', '--fields', 'id,company_id,runtemplate_id,begin,end', '--order', 'D',
+            '--format', 'json']
+    seen = {}
+    offset = 0
+    last_seen = None
+    previous = None
+    slowest = 0.0
+    while True:
+        page = module.cli.run_json(args + ['--limit', str(page_size), '--offset', str(offset)], cached=False)
+        if not isinstance(page, list) or not page:
+            break
+        expired = []
+        for job in page:
+            job_id = int(job['id'])
+            if last_seen is not None and job_id >= last_seen:
+                continue
+            last_seen = job_id
+            summary['scanned'] += 1
+            company_id = int(job['company_id']) if job.get('company_id') is not None else None
+            counts = summary['companies'].setdefault(str(company_id), dict(kept=0, deleted=0))
+            rank = seen[job.get('runtemplate_id')] = seen.get(job.get('runtemplate_id'), 0) + 1
+            if is_expired(rules.get(company_id, default), job, rank, now):
+                expired.append((job_id, str(company_id)))
+            else:
+                counts['kept'] += 1
+        ids = [job.get('id') for job in page]
+        if previous is not None and ids == previous[1] and offset != previous[0]:
+            # An old CLI ignoring --offset would repeat the same page forever
+            raise MultiflexiCliError("job:list does not support --offset, unable to page through it")
+        previous = (offset, ids)
+        summary['expired'] += len(expired)
+        deleted = summary['deleted']
+        slowest = delete_jobs(module, cli_path, expired, deadline, summary, slowest)
+        if slowest is None:
+            break
+        # Deleted rows drop out of the list, the others keep their place in front of the next page
+        offset += len(page) - (0 if module.check_mode else summary['deleted'] - deleted)
+        if len(page) < page_size:
+            break
+    result['changed'] = bool(summary['deleted'])
+
+
+def prune_batched(module, cli_path, targets, deadline, result):
+    """Lower --keep of every table by batch_size per call until keep or the time budget is reached.
+
+    The table is counted again after every chunk, so the rows deleted and the throughput are measured
+    and rows written meanwhile are part of the following chunks. --keep never goes up again, so a table
+    growing as fast as it is pruned still reaches keep.
+    """
+    keep = module.params['keep']
+    batch_size = module.params['batch_size']
+    cursor = module.params.get('cursor') or {}
+    slowest = float(cursor.get('slowest') or 0) if cursor.get('keep') == keep else 0.0
+    sizes = table_sizes(module, cli_path, targets, cursor)
+    # The --keep of the last chunk per table
+    limits = dict(sizes)
+    batches = result['batches']
+
+    def pruned_to(table):
+        return min(sizes[table], limits[table])
+
+    def save_cursor():
+        result['cursor'] = dict(keep=keep, tables=dict(sizes), slowest=slowest,
+                                remaining=dict((table, max(size - keep, 0)) for table, size in sizes.items()))
+        result['complete'] = all(pruned_to(table) <= keep for table in targets)
+        measured = [batch for batch in batches if batch['deleted'] is not None]
+        deleted = sum(batch['deleted'] for batch in measured)
+        duration = round(sum(batch['duration'] for batch in measured), 3)
+        result['throughput'] = dict(deleted=deleted, duration=duration, batches=len(batches),
+                                    rows_per_second=round(deleted / duration, 1) if duration else None)
+
+    save_cursor()
+    for table in targets:
+        while pruned_to(table) > keep:
+            if deadline and time.time() + slowest > deadline:
+                return
+            if batches and module.params['batch_pause'] and not module.check_mode:
+                time.sleep(module.params['batch_pause'])
+            step_keep = max(keep, pruned_to(table) - batch_size)
+            batch = dict(table=table, keep=step_keep, before=sizes[table], after=step_keep,
+                         deleted=max(sizes[table] - step_keep, 0), duration=0.0, rows_per_second=None)
+            if not module.check_mode:
+                batch_started = time.time()
+                try:
+                    module.cli.run([cli_path, 'prune', f'--{table}', '--keep', str(step_keep)])
+                except MultiflexiCliError as e:
+                    module.fail_json(msg=f"Pruning {table} down to {step_keep} failed: {e}", **result)
+                batch['duration'] = round(time.time() - batch_started, 3)
+                slowest = max(slowest, batch['duration'])
+                batch['after'] = count_rows(module, cli_path, table)
+                if batch['after'] is None:
+                    # Not countable, prune leaves at most step_keep rows
+                    batch['deleted'] = None
+                else:
+                    batch['deleted'] = max(batch['before'] - batch['after'], 0)
+                    if batch['duration']:
+                        batch['rows_per_second'] = round(batch['deleted'] / batch['duration'], 1)
+            batches.append(batch)
+            limits[table] = step_keep
+            sizes[table] = step_keep if batch['after'] is None else batch['after']
+            result['changed'] = True
+            save_cursor()
+
 
 def run_module():
     module_args = dict(
         logs=dict(type='bool', required=False, default=False),
         jobs=dict(type='bool', required=False, default=False),
         keep=dict(type='int', required=False, default=1000),
+        batch_size=dict(type='int', required=False),
+        time_budget=dict(type='float', required=False, default=0),
+        batch_pause=dict(type='float', required=False, default=0),
+        row_counts=dict(type='dict', required=False),
+        cursor=dict(type='dict', required=False),
+        cursor_file=dict(type='path', required=False),
+        retention=dict(type='list', elements='dict', required=False, options=dict(
+            company_id=dict(type='int'),
+            company=dict(type='str'),
+            max_age_days=dict(type='int'),
+            keep_last=dict(type='int', default=0),
+        )),
+        page_size=dict(type='int', required=False, default=1000),
         multiflexi_cli_path=dict(type='str', required=False, default='multiflexi-cli'),
     )
 
@@ -94,18 +472,57 @@ def run_module():
         msg=""
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        parallel=True,
         supports_check_mode=True
     )
 
     cli_path = module.params['multiflexi_cli_path']
     cli_base = [cli_path, 'prune']
 
-    # Check if at least one of logs or jobs is specified
-    if not (module.params['logs'] or module.params['jobs']):
-        module.fail_json(msg="At least one of 'logs' or 'jobs' must be true")
+    # Check if at least one of logs, jobs or retention is specified
+    if not (module.params['logs'] or module.params['jobs'] or module.params['retention']):
+        module.fail_json(msg="At least one of 'logs', 'jobs' or 'retention' must be set")
+    if module.params['batch_size'] is not None and module.params['batch_size'] < 1:
+        module.fail_json(msg="batch_size must be at least 1")
+    deadline = time.time() + module.params['time_budget'] if module.params['time_budget'] else None
+
+    if module.params['retention']:
+        try:
+            prune_retention(module, cli_path, deadline, result)
+        except (MultiflexiCliError, ValueError) as e:
+            del result['msg']
+            module.fail_json(msg=str(e), **result)
+        retention = result['retention']
+        done = 'Would delete' if module.check_mode else 'Deleted'
+        result['msg'] = (f"{done} {retention['deleted']} of {retention['scanned']} jobs expired by the retention rules"
+                         + (f", {retention['pending']} left for the next run" if retention['pending'] else ''))
+        if retention['failed']:
+            del result['msg']
+            module.fail_json(msg=f"Deleting {len(retention['failed'])} expired jobs failed", **result)
+        if not (module.params['logs'] or module.params['jobs']):
+            module.exit_json(**result)
+
+    if module.params['batch_size'] is not None:
+        targets = [table for table in ('logs', 'jobs') if module.params[table]]
+        # msg is passed separately to fail_json
+        retention_msg = result.pop('msg')
+        result['batches'] = []
+        try:
+            prune_batched(module, cli_path, targets, deadline, result)
+        except (MultiflexiCliError, ValueError) as e:
+            module.fail_json(msg=str(e), **result)
+        done = 'Pruned' if result['complete'] else 'Partially pruned'
+        if module.check_mode:
+            done = 'Would prune' if result['complete'] else 'Would partially prune'
+        result['msg'] = (f"{done} {', '.join(targets)} in {len(result['batches'])} batches of up to "
+                         f"{module.params['batch_size']} rows, keeping {module.params['keep']} records")
+        if retention_msg:
+            result['msg'] = f"{retention_msg}. {result['msg']}"
+        module.exit_json(**result)
 
+    retention_msg = result['msg']
     try:
         args = cli_base.copy()
         
@@ -126,7 +543,7 @@ def run_module():
             result['msg'] = f"Would prune {', '.join(prune_targets)}, keeping {module.params['keep']} records"
             result['changed'] = True
         else:
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             # Try to parse as JSON, fall back to plain text if it fails
             try:
                 result['prune_result'] = json.loads(output)
@@ -146,6 +563,8 @@ def run_module():
     except Exception as e:
         module.fail_json(msg=str(e))
 
+    if retention_msg:
+        result['msg'] = f"{retention_msg}. {result['msg']}"
     module.exit_json(**result)
 
 def main():
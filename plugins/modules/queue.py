@@ -1,8 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -13,10 +12,16 @@ short_description: Manage job queues in MultiFlexi
 description:
     - This module allows you to manage job queues in MultiFlexi.
     - Supports listing queue status and truncating the queue.
+    - The C(list) state pages through C(queue:list) with C(--limit)/C(--offset), holding one page in memory at
+      a time, and can count the queued jobs per application, company, run template or schedule type while
+      paging instead of returning every row.
 
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+
 options:
     state:
         description:
@@ -30,9 +35,31 @@ options:
             - Limit number of results for list action.
         required: false
         type: int
+    page_size:
+        description:
+            - Number of queued jobs requested per C(queue:list) call.
+        required: false
+        type: int
+        default: 1000
+    aggregate:
+        description:
+            - Count the listed jobs per application (V(app)), company (V(company)), run template (V(runtemplate))
+              or schedule type (V(schedule_type)), returned in RV(counts).
+        required: false
+        type: list
+        elements: str
+        choices: ['app', 'company', 'runtemplate', 'schedule_type']
+        default: []
+    return_rows:
+        description:
+            - Return the listed jobs in RV(queue). Set to V(false) with O(aggregate) to only get the counts;
+              then only the columns needed for counting are requested from the CLI.
+        required: false
+        type: bool
+        default: true
     order:
         description:
-            - Sort order field.
+            - Sort order field, V(id) when paging without it so pages do not overlap.
         required: false
         type: str
     direction:
@@ -54,6 +81,13 @@ EXAMPLES = """
   queue:
     state: list
 
+- name: Count queued jobs per application and company without returning them
+  queue:
+    state: list
+    aggregate: [app, company]
+    return_rows: false
+  register: backlog
+
 - name: Fix the job queue
   queue:
     state: fix
@@ -68,23 +102,78 @@ queue:
     description: Queue information or truncation result.
     type: dict or list
     returned: always
+total:
+    description: Number of queued jobs listed.
+    type: int
+    returned: when O(state=list)
+pages:
+    description: Number of C(queue:list) calls made.
+    type: int
+    returned: when O(state=list)
+counts:
+    description: Queued jobs per group of every O(aggregate) mode, keyed by name (or id when the name is unknown).
+    type: dict
+    returned: when O(state=list) and O(aggregate) is set
+    sample: {"app": {"AbraFlexi Bank Import": 1200, "Probe": 3}, "company": {"Demo": 1203}}
 msg:
     description: A message describing the action taken.
     type: str
     returned: always
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
+# Record fields identifying the group of every aggregate mode, (id, name).
+AGGREGATE_FIELDS = dict(
+    app=('app_id', 'app_name'),
+    company=('company_id', 'company_name'),
+    runtemplate=('runtemplate_id', 'runtemplate_name'),
+    schedule_type=('schedule_type', 'schedule_type'),
+)
+
+
+def list_queue(module, cli_base, result):
+    """Page through queue:list, counting and optionally collecting the jobs."""
+    args = cli_base + ['queue:list', '--format', 'json']
+    aggregate = module.params['aggregate']
+    if not module.params['return_rows']:
+        if not aggregate:
+            module.fail_json(msg="return_rows=false needs aggregate")
+        fields = ['id'] + [field for mode in aggregate for field in AGGREGATE_FIELDS[mode]]
+        args.extend(['--fields', ','.join(sorted(set(fields)))])
+    args.extend(['--order', module.params.get('order') or 'id'])
+    if module.params.get('direction'):
+        args.extend(['--direction', module.params['direction']])
+
+    rows = [] if module.params['return_rows'] else None
+    counts = dict((mode, {}) for mode in aggregate)
+    total = 0
+    page_size = module.params['page_size']
+    limit = module.params.get('limit') or None
+    pages = 0
+    for page in module.cli.iter_pages(args, page_size, limit):
+        pages += 1
+        for job in page:
+            total += 1
+            for mode in aggregate:
+                id_field, name_field = AGGREGATE_FIELDS[mode]
+                key = str(job.get(name_field) or job.get(id_field) or 'unknown')
+                counts[mode][key] = counts[mode].get(key, 0) + 1
+            if rows is not None:
+                rows.append(job)
+    result['queue'] = rows
+    result['total'] = total
+    result['pages'] = pages
+    if aggregate:
+        result['counts'] = counts
+
 
 def run_module():
     module_args = dict(
         state=dict(type='str', required=False, default='overview', choices=['list', 'truncate', 'fix', 'overview']),
         limit=dict(type='int', required=False),
+        page_size=dict(type='int', required=False, default=1000),
+        aggregate=dict(type='list', elements='str', required=False, default=[],
+                       choices=['app', 'company', 'runtemplate', 'schedule_type']),
+        return_rows=dict(type='bool', required=False, default=True),
         order=dict(type='str', required=False),
         direction=dict(type='str', required=False),
         multiflexi_cli_path=dict(type='str', required=False, default='multiflexi-cli'),
@@ -96,7 +185,7 @@ def run_module():
         msg=""
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
         supports_check_mode=True
     )
@@ -108,21 +197,15 @@ def run_module():
     try:
         if state == 'overview':
             args = cli_base + ['queue:overview', '--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['queue'] = json.loads(output)
             result['msg'] = "Retrieved queue overview"
             
         elif state == 'list':
-            args = cli_base + ['queue:list', '--format', 'json']
-            if module.params.get('limit'):
-                args.extend(['--limit', str(module.params['limit'])])
-            if module.params.get('order'):
-                args.extend(['--order', module.params['order']])
-            if module.params.get('direction'):
-                args.extend(['--direction', module.params['direction']])
-            output = run_cli_command(args)
-            result['queue'] = json.loads(output)
-            result['msg'] = "Retrieved queue status"
+            if module.params['page_size'] < 1:
+                module.fail_json(msg="page_size must be at least 1")
+            list_queue(module, cli_base, result)
+            result['msg'] = f"Retrieved {result['total']} queued jobs"
             
         elif state == 'fix':
             if module.check_mode:
@@ -130,7 +213,7 @@ def run_module():
                 result['changed'] = True
             else:
                 args = cli_base + ['queue:fix', '--format', 'json']
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 result['queue'] = json.loads(output)
                 result['changed'] = True
                 result['msg'] = "Fixed job queue"
@@ -141,7 +224,7 @@ def run_module():
                 result['changed'] = True
             else:
                 args = cli_base + ['queue:truncate', '--format', 'json']
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 result['queue'] = json.loads(output)
                 result['changed'] = True
                 result['msg'] = "Truncated job queue"
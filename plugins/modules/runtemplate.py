@@ -3,8 +3,8 @@
 #
 # Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -16,6 +16,9 @@ description:
 author:
     - Vitex (@Vitexus)
 version_added: "1.0.0"
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.api
 options:
     state:
         description:
@@ -101,6 +104,13 @@ EXAMPLES = """
     state: get
     name: "demo_Test"
 
+# List run templates of one company and application
+- name: List run templates
+  vitexus.multiflexi.runtemplate:
+    state: get
+    company: "DEMO"
+    app_uuid: "78fa718c-7ca2-4a38-840e-8e5f0db06432"
+
 # Delete a run template
 - name: Delete run template
   vitexus.multiflexi.runtemplate:
@@ -127,31 +137,18 @@ runtemplate:
 def run_cli(module, args):
     cli = 'multiflexi-cli'
     cmd = [cli] + args + ['--verbose', '--format', 'json']
-    # Print command in debug mode
-    if hasattr(module, '_verbosity') and module._verbosity >= 2:
-        module.warn(f"[DEBUG] Running command: {' '.join(cmd)}")
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        # Print output in debug mode
-        if hasattr(module, '_verbosity') and module._verbosity >= 2:
-            module.warn(f"[DEBUG] CLI stdout: {result.stdout.strip()}")
-            if result.stderr.strip():
-                module.warn(f"[DEBUG] CLI stderr: {result.stderr.strip()}")
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
+        return json.loads(module.cli.run(cmd))
+    except MultiflexiCliError as e:
         # Check for 'not found' in output, return special marker for caller to handle
-        err_output = (e.stdout or '') + (e.stderr or '')
+        err_output = e.stdout + e.stderr
         if 'not found' in err_output.lower():
-            if hasattr(module, '_verbosity') and module._verbosity >= 2:
-                module.warn(f"[DEBUG] CLI error: {err_output.strip()}")
             return {'_not_found': True, '_cli_error': err_output.strip()}
         try:
             err = json.loads(e.stdout or e.stderr)
         except Exception:
-            err = e.stdout or e.stderr
-        if hasattr(module, '_verbosity') and module._verbosity >= 2:
-            module.warn(f"[DEBUG] CLI error: {err}")
-        module.fail_json(msg=f"CLI error: {err}", rc=e.returncode)
+            err = e.stdout or e.stderr or str(e)
+        module.fail_json(msg=f"CLI error: {err}", rc=e.rc)
     except Exception as e:
         if hasattr(module, '_verbosity') and module._verbosity >= 2:
             module.warn(f"[DEBUG] Failed to run CLI: {e}")
@@ -210,8 +207,9 @@ def run_module():
         runtemplate=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        api_transport=True,
         supports_check_mode=True
     )
 
@@ -222,7 +220,14 @@ def run_module():
         if tpl:
             result['runtemplate'] = tpl
         else:
-            templates = run_cli(module, ['run-template:list'])
+            # Let the CLI filter by company and application instead of
+            # transferring every run template
+            list_args = ['run-template:list']
+            if module.params.get('company') or module.params.get('company_id'):
+                list_args += ['--company', str(module.params.get('company') or module.params['company_id'])]
+            if module.params.get('app_uuid'):
+                list_args += ['--app_uuid', module.params['app_uuid']]
+            templates = run_cli(module, list_args)
             result['runtemplate'] = templates
         module.exit_json(**result)
 
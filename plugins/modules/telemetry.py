@@ -1,8 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -16,6 +15,9 @@ description:
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+
 options:
     endpoint:
         description:
@@ -49,13 +51,6 @@ telemetry:
     returned: always
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
-
 def run_module():
     module_args = dict(
         endpoint=dict(type='str', required=False),
@@ -68,7 +63,7 @@ def run_module():
         telemetry=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
         supports_check_mode=True
     )
@@ -86,7 +81,7 @@ def run_module():
         if module.params.get('disable_gauges'):
             args += ['--disable-gauges']
 
-        output = run_cli_command(args)
+        output = module.cli.run(args)
         # telemetry:test might not return JSON, handle accordingly
         try:
             result['telemetry'] = json.loads(output)
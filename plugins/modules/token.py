@@ -1,9 +1,11 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule, parse_time
+from datetime import datetime, timedelta
 import json
+import secrets
 
 DOCUMENTATION = """
 ---
@@ -13,17 +15,24 @@ short_description: Manage authentication tokens in MultiFlexi
 description:
     - This module allows you to manage authentication tokens in MultiFlexi.
     - Supports listing, getting, creating, generating, updating and deleting tokens.
+    - With O(state=rotate) all tokens are listed once with C(token:list), selected by age, expiry and owner,
+      and rotated up to O(max_workers) at a time. The new values are returned together in RV(tokens),
+      separated from the non-secret RV(rotations), so the task can run with C(no_log) and the outcome still be shown.
 
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.parallel
+
 options:
     state:
         description:
             - The desired state of the token.
         required: true
         type: str
-        choices: ['present', 'absent', 'list', 'generate']
+        choices: ['present', 'absent', 'list', 'generate', 'rotate']
     token_id:
         description:
             - The ID of the token.
@@ -40,6 +49,54 @@ options:
         required: false
         type: str
         no_log: true
+    older_than_days:
+        description:
+            - With O(state=rotate), select tokens created more than this many days ago.
+        required: false
+        type: int
+    expires_within_days:
+        description:
+            - With O(state=rotate), select tokens expiring within this many days, or already expired.
+            - Combined with O(older_than_days), a token matching either is selected.
+        required: false
+        type: int
+    owners:
+        description:
+            - With O(state=rotate), select only tokens of these users, given by ID or login.
+            - Logins are resolved with one C(user:list).
+        required: false
+        type: list
+        elements: str
+    rotate_all:
+        description:
+            - With O(state=rotate), rotate every token in the system.
+            - Required when none of O(older_than_days), O(expires_within_days) and O(owners) is given,
+              so a missing selector does not rotate all tokens by accident.
+        required: false
+        type: bool
+        default: false
+    rotate_with:
+        description:
+            - V(update) replaces the value of every selected token in place with C(token:update), keeping its ID,
+              with a random value of O(token_bytes) bytes.
+            - V(generate) creates a new token of the owner with C(token:generate) and, with O(remove_old),
+              deletes the old one.
+        required: false
+        type: str
+        choices: ['update', 'generate']
+        default: 'update'
+    remove_old:
+        description:
+            - Delete the rotated token after V(generate) created its successor.
+        required: false
+        type: bool
+        default: true
+    token_bytes:
+        description:
+            - Random bytes of tokens set by O(rotate_with=update), hex encoded.
+        required: false
+        type: int
+        default: 32
     multiflexi_cli_path:
         description:
             - Path to the multiflexi-cli executable.
@@ -79,6 +136,19 @@ EXAMPLES = """
   token:
     state: absent
     token_id: 1
+
+- name: Quarterly rotation of API tokens
+  token:
+    state: rotate
+    older_than_days: 90
+    owners: ["api-erp", "api-bank", "17"]
+    max_workers: 8
+  register: rotation
+  no_log: true
+
+- name: Show what was rotated, without the values
+  ansible.builtin.debug:
+    var: rotation.rotations
 """
 
 RETURN = """
@@ -90,21 +160,128 @@ msg:
     description: A message describing the action taken.
     type: str
     returned: always
+rotations:
+    description:
+        - Non-secret outcome for every selected token. C(action) is V(rotated) or V(failed), C(new_token_id) differs
+          from C(token_id) with O(rotate_with=generate).
+    type: list
+    elements: dict
+    returned: when O(state=rotate)
+    sample: [{"token_id": 4, "user_id": 17, "age_days": 121, "action": "rotated", "new_token_id": 4}]
+tokens:
+    description:
+        - New token values by ID of the rotated token, with the ID of the new token.
+          Register the task with C(no_log) to keep them out of logs.
+    type: dict
+    returned: when O(state=rotate) and not in check mode
+    sample: {"4": {"token_id": 4, "user_id": 17, "token": "9f2c..."}}
+summary:
+    description: Number of selected tokens per action.
+    type: dict
+    returned: when O(state=rotate)
+    sample: {"rotated": 12, "failed": 0}
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
+
+def token_age_days(token, now):
+    """Whole days since the token was created, None when the listing has no creation time."""
+    created = parse_time(token.get('start') or token.get('created') or token.get('created_at'))
+    return (now - created).days if created else None
+
+
+def select_tokens(module, cli_base, tokens):
+    """Return ``(token, age_days)`` of the tokens chosen by age, expiry and owner."""
+    now = datetime.now()
+    owners = None
+    if module.params.get('owners'):
+        owners = set()
+        logins = None
+        for owner in module.params['owners']:
+            if str(owner).isdigit():
+                owners.add(str(owner))
+                continue
+            if logins is None:
+                logins = module.cli.index(cli_base + ['user:list', '--fields', 'id,login', '--format', 'json'], 'login')
+            if owner not in logins:
+                module.fail_json(msg=f"User {owner} not found")
+            owners.add(str(logins[owner]['id']))
+    older_than = module.params.get('older_than_days')
+    expires_within = module.params.get('expires_within_days')
+    selected = []
+    for token in tokens:
+        if owners is not None and str(token.get('user_id')) not in owners:
+            continue
+        age = token_age_days(token, now)
+        if older_than is not None or expires_within is not None:
+            old = older_than is not None and age is not None and age > older_than
+            until = parse_time(token.get('until') or token.get('expires') or token.get('valid_until'))
+            expiring = expires_within is not None and until is not None and until - now <= timedelta(days=expires_within)
+            if not (old or expiring):
+                continue
+        selected.append((token, age))
+    return selected
+
+
+def rotate_tokens(module, cli_base, result):
+    tokens = json.loads(module.cli.run(cli_base + ['token:list', '--format', 'json']))
+    selected = select_tokens(module, cli_base, tokens if isinstance(tokens, list) else [])
+    rotate_with = module.params['rotate_with']
+
+    def rotate(token):
+        if rotate_with == 'update':
+            value = secrets.token_hex(module.params['token_bytes'])
+            module.cli.run(cli_base + ['token:update', '--id', str(token['id']), '--user', str(token['user_id']),
+                                       '--token', value, '--format', 'json'])
+            return dict(id=token['id'], token=value)
+        created = json.loads(module.cli.run(cli_base + ['token:generate', '--user', str(token['user_id']),
+                                                        '--format', 'json']))
+        rotated = dict(id=created.get('id'), token=created.get('token'))
+        if module.params['remove_old']:
+            # The new token exists already, so a failed delete must not lose its value
+            try:
+                module.cli.run(cli_base + ['token:delete', '--id', str(token['id']), '--format', 'json'])
+            except MultiflexiCliError as e:
+                rotated['msg'] = f"old token not removed: {e}"
+        return rotated
+
+    rotations = []
+    result['tokens'] = {}
+    if module.check_mode:
+        tasks = [None] * len(selected)
+    else:
+        tasks = module.run_parallel(rotate, [token for token, _age in selected])
+    for (token, age), task in zip(selected, tasks):
+        rotation = dict(token_id=token.get('id'), user_id=token.get('user_id'), age_days=age, action='rotated')
+        if task is not None and task.error:
+            rotation.update(action='failed', msg=str(task.error))
+        elif task is not None:
+            rotation['new_token_id'] = task.result['id']
+            if task.result.get('msg'):
+                rotation['msg'] = task.result['msg']
+                module.warn(f"Token {token.get('id')} was rotated but its {task.result['msg']}")
+            result['tokens'][str(token.get('id'))] = dict(token_id=task.result['id'], user_id=token.get('user_id'),
+                                                         token=task.result['token'])
+        rotations.append(rotation)
+    result['rotations'] = rotations
+    result['summary'] = dict(rotated=sum(1 for rotation in rotations if rotation['action'] == 'rotated'),
+                             failed=sum(1 for rotation in rotations if rotation['action'] == 'failed'))
+    result['changed'] = bool(result['summary']['rotated'])
+    if module.check_mode:
+        del result['tokens']
 
 def run_module():
     module_args = dict(
-        state=dict(type='str', required=True, choices=['present', 'absent', 'list', 'generate']),
+        state=dict(type='str', required=True, choices=['present', 'absent', 'list', 'generate', 'rotate']),
         token_id=dict(type='int', required=False),
         user_id=dict(type='int', required=False),
         token_value=dict(type='str', required=False, no_log=True),
+        older_than_days=dict(type='int', required=False),
+        expires_within_days=dict(type='int', required=False),
+        owners=dict(type='list', elements='str', required=False),
+        rotate_with=dict(type='str', required=False, default='update', choices=['update', 'generate']),
+        remove_old=dict(type='bool', required=False, default=True),
+        token_bytes=dict(type='int', required=False, default=32),
+        rotate_all=dict(type='bool', required=False, default=False),
         multiflexi_cli_path=dict(type='str', required=False, default='multiflexi-cli'),
     )
 
@@ -114,8 +291,9 @@ def run_module():
         msg=""
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        parallel=True,
         supports_check_mode=True
     )
 
@@ -123,10 +301,29 @@ def run_module():
     cli_path = module.params['multiflexi_cli_path']
     cli_base = [cli_path]
 
+    if state == 'rotate':
+        selectors = ('older_than_days', 'expires_within_days', 'owners')
+        if not module.params['rotate_all'] and all(module.params.get(name) in (None, []) for name in selectors):
+            module.fail_json(msg="state=rotate needs older_than_days, expires_within_days or owners, "
+                                 "or rotate_all=true to rotate every token")
+        if module.params['token_bytes'] < 16:
+            module.fail_json(msg="token_bytes must be at least 16")
+        try:
+            rotate_tokens(module, cli_base, result)
+        except (MultiflexiCliError, ValueError) as e:
+            module.fail_json(msg=str(e))
+        failed = result['summary']['failed']
+        done = 'Would rotate' if module.check_mode else 'Rotated'
+        result['msg'] = f"{done} {result['summary']['rotated']} of {len(result['rotations'])} selected tokens"
+        if failed:
+            del result['msg']
+            module.fail_json(msg=f"Rotating {failed} tokens failed", **result)
+        module.exit_json(**result)
+
     try:
         if state == 'list':
             args = cli_base + ['token:list', '--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['token'] = json.loads(output)
             result['msg'] = "Retrieved token list"
             
@@ -134,7 +331,7 @@ def run_module():
             if module.params.get('token_id'):
                 # Get existing token
                 args = cli_base + ['token:get', '--id', str(module.params['token_id']), '--format', 'json']
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 existing_token = json.loads(output)
                 
                 if existing_token:
@@ -147,7 +344,7 @@ def run_module():
                             module.exit_json(**result)
                         args = cli_base + ['token:update', '--id', str(module.params['token_id']),
                                          '--token', module.params['token_value'], '--format', 'json']
-                        output = run_cli_command(args)
+                        output = module.cli.run(args)
                         result['changed'] = True
                         result['msg'] = f"Updated token {module.params['token_id']}"
                     else:
@@ -155,7 +352,7 @@ def run_module():
                     
                     # Get latest token info
                     args = cli_base + ['token:get', '--id', str(module.params['token_id']), '--format', 'json']
-                    output = run_cli_command(args)
+                    output = module.cli.run(args)
                     result['token'] = json.loads(output)
                 else:
                     module.fail_json(msg=f"Token with ID {module.params['token_id']} not found")
@@ -170,7 +367,7 @@ def run_module():
                 args = cli_base + ['token:create', '--user', str(module.params['user_id']), '--format', 'json']
                 if module.params.get('token_value'):
                     args.extend(['--token', module.params['token_value']])
-                output = run_cli_command(args)
+                output = module.cli.run(args)
                 result['token'] = json.loads(output)
                 result['changed'] = True
                 result['msg'] = f"Created token for user {module.params['user_id']}"
@@ -185,7 +382,7 @@ def run_module():
                 result['changed'] = True
                 module.exit_json(**result)
             args = cli_base + ['token:generate', '--user', str(module.params['user_id']), '--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['token'] = json.loads(output)
             result['changed'] = True
             result['msg'] = f"Generated new token for user {module.params['user_id']}"
@@ -199,7 +396,7 @@ def run_module():
                 module.exit_json(**result)
 
             args = cli_base + ['token:delete', '--id', str(module.params['token_id']), '--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['changed'] = True
             result['msg'] = f"Deleted token {module.params['token_id']}"
             
@@ -1,8 +1,8 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -12,17 +12,76 @@ short_description: Manage users in Multiflexi
 
 description:
     - This module allows you to create, update, get, and list users in Multiflexi via CLI.
+    - With O(users) many users are provisioned in one task. The user list is fetched once with C(user:list)
+      and indexed by ID, login and email, so only the needed creates, updates and deletes are run,
+      up to O(max_workers) at a time, and no user is read back after being written.
 
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.api
+    - vitexus.multiflexi.parallel
+
 options:
     state:
         description:
             - The desired state of the user.
+            - With O(users) it is the default state of the listed users.
         required: true
         type: str
         choices: ['present', 'absent', 'get']
+    users:
+        description:
+            - List of users to manage in one task instead of the single user given by the top level options.
+            - Users are matched by O(users[].user_id), else O(users[].login), else O(users[].email)
+              against a single C(user:list).
+        required: false
+        type: list
+        elements: dict
+        suboptions:
+            state:
+                description:
+                    - The desired state of this user, defaults to O(state).
+                type: str
+                choices: ['present', 'absent', 'get']
+            user_id:
+                description:
+                    - The ID of the user.
+                type: int
+            login:
+                description:
+                    - Login name.
+                type: str
+            email:
+                description:
+                    - Email address.
+                type: str
+            firstname:
+                description:
+                    - First name.
+                type: str
+            lastname:
+                description:
+                    - Last name.
+                type: str
+            enabled:
+                description:
+                    - Whether the user is enabled.
+                type: bool
+            password:
+                description:
+                    - Password (plaintext - will be automatically hashed by MultiFlexi), see O(update_password).
+                type: str
+    update_password:
+        description:
+            - V(always) sets the given password of existing users on every run, V(on_create) only for new users,
+              so runs with unchanged users report no change.
+        required: false
+        type: str
+        choices: ['always', 'on_create']
+        default: 'always'
     user_id:
         description:
             - The ID of the user.
@@ -89,6 +148,21 @@ EXAMPLES = """
   user:
     state: absent
     login: "jdoe"
+
+- name: Onboard users from the HR export
+  user:
+    state: present
+    update_password: on_create
+    max_workers: 8
+    users: "{{ hr_export | map('combine', {'enabled': true}) | list }}"
+  register: onboarding
+
+- name: Offboard users
+  user:
+    state: absent
+    users:
+      - login: "jdoe"
+      - email: "former@example.com"
 """
 
 RETURN = """
@@ -96,36 +170,167 @@ user:
     description: The user object or list of users.
     type: dict or list
     returned: always
+users:
+    description:
+        - Outcome for every item of O(users), in the same order, without passwords.
+        - C(action) is one of V(created), V(updated), V(deleted), V(unchanged), V(absent), V(found) or V(failed).
+    type: list
+    elements: dict
+    returned: when O(users) is used
+    sample: [{"user_id": 12, "login": "jdoe", "action": "created", "changed": true}]
+summary:
+    description: Number of O(users) items per action.
+    type: dict
+    returned: when O(users) is used
+    sample: {"created": 120, "updated": 3, "unchanged": 1877}
 """
 
-def run_cli_command(args, module=None, allow_not_found=False):
-    if module and module._verbosity >= 2:
-        module.warn(f"Running CLI command: {' '.join(args)}")
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        if module and module._verbosity >= 2:
-            module.warn(f"CLI stdout: {result.stdout.strip()}")
-            if result.stderr.strip():
-                module.warn(f"CLI stderr: {result.stderr.strip()}")
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        stdout = e.stdout.strip() if hasattr(e, 'stdout') and e.stdout else ''
-        stderr = e.stderr.strip() if hasattr(e, 'stderr') and e.stderr else ''
-        if module and module._verbosity >= 2:
-            module.warn(f"CLI error: {stderr}")
-            if stdout:
-                module.warn(f"CLI stdout (on error): {stdout}")
-        # If CLI returned JSON in stdout, try to parse and show message
-        try:
-            if stdout:
-                data = json.loads(stdout)
-                if allow_not_found and isinstance(data, dict) and data.get('status') == 'not found':
-                    return stdout  # allow caller to handle not found
-                if isinstance(data, dict) and data.get('message'):
-                    raise Exception(f"multiflexi-cli error: {data.get('message')}")
-        except Exception:
-            pass
-        raise Exception(f"multiflexi-cli error: {stderr or stdout or str(e)}")
+# Fields set by user:create and user:update, compared with the listed users
+USER_FIELDS = ['login', 'email', 'firstname', 'lastname', 'enabled']
+
+
+def same_value(value, current, ignore_case=False):
+    """Compare a requested value with the listed one, which may hold booleans as '1'/'0'."""
+    if isinstance(value, bool):
+        if isinstance(current, str):
+            current = current == '1' or current.lower() == 'true'
+        else:
+            current = bool(current)
+        return value == current
+    if current is None:
+        return False
+    if ignore_case:
+        return str(value).lower() == str(current).lower()
+    return str(value) == str(current)
+
+
+def field_args(item):
+    args = []
+    for field in USER_FIELDS:
+        value = item.get(field)
+        if value is not None:
+            args += [f'--{field}', str(int(value)) if isinstance(value, bool) else str(value)]
+    return args
+
+
+class UserIndex(object):
+    """Users of one user:list, indexed by id, login and email (emails compared case-insensitively)."""
+
+    KEYS = (('user_id', 'id'), ('login', 'login'), ('email', 'email'))
+
+    def __init__(self, users):
+        self.by = dict((field, {}) for _option, field in self.KEYS)
+        for user in users:
+            self.add(user)
+
+    @staticmethod
+    def key(field, value):
+        return str(value).lower() if field == 'email' else str(value)
+
+    def add(self, user):
+        for _option, field in self.KEYS:
+            if user.get(field) not in (None, ''):
+                self.by[field][self.key(field, user[field])] = user
+
+    def remove(self, user):
+        for _option, field in self.KEYS:
+            if user.get(field) not in (None, '') and self.by[field].get(self.key(field, user[field])) is user:
+                del self.by[field][self.key(field, user[field])]
+
+    def find(self, item):
+        for option, field in self.KEYS:
+            if item.get(option) not in (None, ''):
+                return self.by[field].get(self.key(field, item[option]))
+        return None
+
+
+def plan_user(module, index, item):
+    """Decide what one item of the users list needs, return ``(outcome, cli_args)``.
+
+    The index is updated as if the command succeeded, so later items see
+    the planned state and all commands of the batch can run concurrently.
+    """
+    user = index.find(item)
+    outcome = dict(user_id=user.get('id') if user else item.get('user_id'),
+                   login=user.get('login') if user else item.get('login'), changed=False)
+    state = item['state']
+
+    if state == 'get':
+        outcome.update(action='found' if user else 'absent', user=user)
+        return outcome, None
+
+    if state == 'absent':
+        if not user:
+            outcome['action'] = 'absent'
+            return outcome, None
+        index.remove(user)
+        outcome.update(action='deleted', changed=True)
+        return outcome, ['user:delete', '--id', str(user['id'])]
+
+    if user:
+        changes = dict((field, item[field]) for field in USER_FIELDS
+                       if item.get(field) is not None
+                       and not same_value(item[field], user.get(field), ignore_case=field == 'email'))
+        password = item.get('password') is not None and module.params['update_password'] == 'always'
+        if not changes and not password:
+            outcome['action'] = 'unchanged'
+            return outcome, None
+        index.remove(user)
+        index.add(dict(user, **changes))
+        args = ['user:update', '--id', str(user['id'])] + field_args(changes)
+        if password:
+            args += ['--plaintext', item['password']]
+        outcome.update(action='updated', changed=True, login=changes.get('login', outcome['login']))
+        return outcome, args
+
+    if not item.get('login'):
+        outcome.update(action='failed', msg="user not found and login is required to create it")
+        return outcome, None
+    args = ['user:create'] + field_args(item)
+    if item.get('password') is not None:
+        args += ['--plaintext', item['password']]
+    index.add(dict((field, item[field]) for field in USER_FIELDS if item.get(field) is not None))
+    outcome.update(action='created', changed=True)
+    return outcome, args
+
+
+def run_batch(module, result):
+    cli_base = ['multiflexi-cli']
+    users = json.loads(module.cli.run(cli_base + ['user:list', '--fields', 'id,' + ','.join(USER_FIELDS),
+                                                  '--format', 'json']))
+    index = UserIndex(users if isinstance(users, list) else [])
+    outcomes = []
+    planned = []
+    for item in module.params['users']:
+        item = dict(item)
+        item['state'] = item.get('state') or module.params['state'] or 'present'
+        outcome, args = plan_user(module, index, item)
+        outcomes.append(outcome)
+        if args:
+            planned.append((outcome, cli_base + args + ['--format', 'json']))
+
+    tasks = module.run_commands([args for outcome, args in planned])
+    for (outcome, args), task in zip(planned, tasks):
+        if task.error:
+            outcome.update(action='failed', changed=False, msg=str(task.error))
+        elif outcome['action'] == 'created' and task.result:
+            try:
+                created = json.loads(task.result)
+            except ValueError:
+                created = None
+            if isinstance(created, dict) and created.get('id') is not None:
+                outcome['user_id'] = created['id']
+
+    summary = {}
+    for outcome in outcomes:
+        summary[outcome['action']] = summary.get(outcome['action'], 0) + 1
+    result['changed'] = any(outcome['changed'] for outcome in outcomes)
+    result['users'] = outcomes
+    result['summary'] = summary
+    if summary.get('failed'):
+        module.fail_json(msg=f"{summary['failed']} of {len(outcomes)} users failed", **result)
+    module.exit_json(**result)
+
 
 def run_module():
     module_args = dict(
@@ -138,6 +343,18 @@ def run_module():
         lastname=dict(type='str', required=False),
         password=dict(type='str', required=False, no_log=True),
         login=dict(type='str', required=False),
+        users=dict(type='list', elements='dict', required=False, options=dict(
+            state=dict(type='str', choices=['present', 'absent', 'get']),
+            user_id=dict(type='int'),
+            login=dict(type='str'),
+            email=dict(type='str'),
+            firstname=dict(type='str'),
+            lastname=dict(type='str'),
+            enabled=dict(type='bool'),
+            password=dict(type='str', no_log=True),
+        )),
+        update_password=dict(type='str', required=False, default='always', choices=['always', 'on_create'],
+                             no_log=False),
     )
 
     result = dict(
@@ -145,14 +362,22 @@ def run_module():
         user=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        api_transport=True,
+        parallel=True,
         supports_check_mode=True
     )
 
     state = module.params.get('state')
     cli_base = ['multiflexi-cli']
 
+    if module.params.get('users') is not None:
+        try:
+            run_batch(module, result)
+        except (MultiflexiCliError, ValueError) as e:
+            module.fail_json(msg=str(e))
+
     try:
         # If no state is provided, default to info/read (get)
         if not state or state == 'get':
@@ -165,7 +390,7 @@ def run_module():
                 args = cli_base + ['user:get', '--email', module.params['email'], '--format', 'json', '--verbose']
             else:
                 args = cli_base + ['user:list', '--format', 'json', '--verbose']
-            output = run_cli_command(args, module=module, allow_not_found=True)
+            output = module.cli.run(args, allow_not_found=True)
             user = json.loads(output)
             if isinstance(user, dict) and user.get('status') == 'not found':
                 result['user'] = None
@@ -178,21 +403,21 @@ def run_module():
             user_data = None
             if module.params.get('user_id'):
                 check_args = cli_base + ['user:get', '--id', str(module.params['user_id']), '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 user = json.loads(output)
                 if user and isinstance(user, dict) and user.get('id') and user.get('status') != 'not found':
                     found_user_id = user['id']
                     user_data = user
             elif module.params.get('login'):
                 check_args = cli_base + ['user:get', '--login', module.params['login'], '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 user = json.loads(output)
                 if user and isinstance(user, dict) and user.get('id') and user.get('status') != 'not found':
                     found_user_id = user['id']
                     user_data = user
             elif module.params.get('email'):
                 check_args = cli_base + ['user:get', '--email', module.params['email'], '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 user = json.loads(output)
                 if user and isinstance(user, dict) and user.get('id') and user.get('status') != 'not found':
                     found_user_id = user['id']
@@ -200,7 +425,8 @@ def run_module():
             # 2. Idempotency: Only update if any property differs
             needs_update = False
             update_params = {}
-            password_provided = module.params.get('password') is not None
+            password_provided = module.params.get('password') is not None and (
+                not found_user_id or module.params['update_password'] == 'always')
             if user_data:
                 for param in ['enabled', 'settings', 'email', 'firstname', 'lastname', 'login']:
                     value = module.params.get(param)
@@ -232,7 +458,7 @@ def run_module():
                         args += ['--plaintext', module.params.get('password')]
                     args += ['--format', 'json']
                     try:
-                        run_cli_command(args, module=module)
+                        module.cli.run(args)
                         result['changed'] = True
                     except Exception as e:
                         module.fail_json(msg=f"Failed to update user: {str(e)}")
@@ -252,7 +478,7 @@ def run_module():
                     args += ['--plaintext', module.params.get('password')]
                 args += ['--format', 'json']
                 try:
-                    run_cli_command(args, module=module)
+                    module.cli.run(args)
                     result['changed'] = True
                 except Exception as e:
                     module.fail_json(msg=f"Failed to create user: {str(e)}")
@@ -265,7 +491,7 @@ def run_module():
                 read_args = cli_base + ['user:get', '--email', module.params['email'], '--format', 'json', '--verbose']
             else:
                 read_args = cli_base + ['user:list', '--format', 'json', '--verbose']
-            output = run_cli_command(read_args, module=module, allow_not_found=True)
+            output = module.cli.run(read_args, allow_not_found=True)
             user = json.loads(output)
             if isinstance(user, dict) and user.get('status') == 'not found':
                 result['user'] = None
@@ -277,19 +503,19 @@ def run_module():
             found_user_id = None
             if module.params.get('user_id'):
                 check_args = cli_base + ['user:get', '--id', str(module.params['user_id']), '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 user = json.loads(output)
                 if user and isinstance(user, dict) and user.get('id') and user.get('status') != 'not found':
                     found_user_id = user['id']
             elif module.params.get('login'):
                 check_args = cli_base + ['user:get', '--login', module.params['login'], '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 user = json.loads(output)
                 if user and isinstance(user, dict) and user.get('id') and user.get('status') != 'not found':
                     found_user_id = user['id']
             elif module.params.get('email'):
                 check_args = cli_base + ['user:get', '--email', module.params['email'], '--format', 'json', '--verbose']
-                output = run_cli_command(check_args, module=module, allow_not_found=True)
+                output = module.cli.run(check_args, allow_not_found=True)
                 user = json.loads(output)
                 if user and isinstance(user, dict) and user.get('id') and user.get('status') != 'not found':
                     found_user_id = user['id']
@@ -299,7 +525,7 @@ def run_module():
                     result['changed'] = True
                     module.exit_json(**result)
                 args = cli_base + ['user:delete', '--id', str(found_user_id), '--format', 'json']
-                run_cli_command(args, module=module)
+                module.cli.run(args)
                 result['changed'] = True
             else:
                 result['changed'] = False
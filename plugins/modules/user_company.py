@@ -1,8 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -16,6 +15,9 @@ description:
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+
 options:
     state:
         description:
@@ -80,13 +82,6 @@ assignment:
     returned: always
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
-
 def run_module():
     module_args = dict(
         state=dict(type='str', required=True, choices=['present', 'absent']),
@@ -103,7 +98,7 @@ def run_module():
         assignment=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
         supports_check_mode=True
     )
@@ -140,7 +135,7 @@ def run_module():
                 args += ['--role', module.params['role']]
 
             args += ['--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['assignment'] = json.loads(output)
             result['changed'] = True
 
@@ -158,7 +153,7 @@ def run_module():
                 args += ['--email', module.params['email']]
 
             args += ['--format', 'json']
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['assignment'] = json.loads(output)
             result['changed'] = True
 
@@ -1,9 +1,10 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
+import re
 
 DOCUMENTATION = """
 ---
@@ -13,17 +14,25 @@ short_description: Manage GDPR user data erasure requests in MultiFlexi
 description:
     - This module allows you to manage GDPR user data erasure requests in MultiFlexi.
     - Supports creating, listing, approving, rejecting, and processing erasure requests.
+    - With O(state=pipeline) the requests are listed once with C(user-erasure:list --status) and the matching ones
+      are approved and processed in batches of O(batch_size), up to O(max_workers) CLI calls at once.
+      A per-request status table is returned in RV(requests).
+    - The audit trail is parsed into records returned in RV(audit).
 
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+    - vitexus.multiflexi.parallel
+
 options:
     state:
         description:
             - The desired action for the erasure request.
         required: true
         type: str
-        choices: ['present', 'list', 'approve', 'reject', 'process', 'audit', 'cleanup']
+        choices: ['present', 'list', 'approve', 'reject', 'process', 'audit', 'cleanup', 'pipeline']
     request_id:
         description:
             - The ID of the erasure request.
@@ -59,9 +68,48 @@ options:
     status:
         description:
             - Filter for list action.
+            - With O(state=pipeline) the status of the requests to handle, V(pending) by default.
+              V(approved) requests are processed without being approved again.
         required: false
         type: str
         choices: ['pending', 'approved', 'rejected', 'completed']
+    request_ids:
+        description:
+            - With O(state=pipeline) handle only these of the listed requests.
+        required: false
+        type: list
+        elements: int
+    deletion_types:
+        description:
+            - With O(state=pipeline) handle only the requests of these deletion types.
+        required: false
+        type: list
+        elements: str
+        choices: ['soft', 'hard', 'anonymize']
+    limit:
+        description:
+            - With O(state=pipeline) handle at most this many requests, oldest first. The rest is left for the next run.
+        required: false
+        type: int
+    batch_size:
+        description:
+            - With O(state=pipeline) the number of requests approved and then processed together.
+              A batch is processed only after all its approvals are done.
+        required: false
+        type: int
+        default: 50
+    process:
+        description:
+            - With O(state=pipeline) process the approved requests. When false they are only approved.
+        required: false
+        type: bool
+        default: true
+    audit:
+        description:
+            - With O(state=pipeline) read the audit trail of every processed request into RV(requests).
+        required: false
+        type: bool
+        default: false
     multiflexi_cli_path:
         description:
             - Path to the multiflexi-cli executable.
@@ -89,6 +137,20 @@ EXAMPLES = """
     state: approve
     request_id: 1
     notes: "Verified user identity"
+
+- name: Approve and process the pending soft deletions, with their audit trail
+  user_erasure:
+    state: pipeline
+    deletion_types: ['soft', 'anonymize']
+    notes: "Monthly GDPR run"
+    batch_size: 25
+    max_workers: 4
+    audit: true
+  register: erasure_run
+
+- name: Show the requests which failed
+  debug:
+    msg: "{{ erasure_run.requests | selectattr('status', 'equalto', 'failed') | list }}"
 """
 
 RETURN = """
@@ -96,18 +158,137 @@ erasure:
     description: Erasure request information.
     type: dict or list
     returned: always
+audit:
+    description:
+        - Audit trail records parsed from the table printed by C(user-erasure:audit), one dict per row
+          keyed by the column headers in snake case, e.g. C(date), C(action), C(performed_by).
+    type: list
+    elements: dict
+    returned: when O(state=audit)
+requests:
+    description:
+        - Status table of the requests handled by O(state=pipeline), in list order.
+        - C(status) is V(approved), V(completed), V(failed), or V(would_approve)/V(would_complete) in check mode.
+          C(step) tells which step failed and C(msg) why.
+    type: list
+    elements: dict
+    returned: when O(state=pipeline)
+    sample: [{"request_id": 12, "user_id": 7, "deletion_type": "soft", "status": "completed",
+              "approved": true, "processed": true}]
+summary:
+    description: Number of requests per status, with the number of C(listed) and C(selected) requests.
+    type: dict
+    returned: when O(state=pipeline)
+    sample: {"listed": 140, "selected": 100, "completed": 99, "failed": 1}
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
+def snake_case(name):
+    return re.sub(r'[^0-9a-z]+', '_', name.strip().lower()).strip('_')
+
+
+def parse_audit(output):
+    """Return the audit trail table printed by user-erasure:audit as a list of dicts keyed by column.
+
+    Only the ``| cell | cell |`` rows count; borders, the title and notes around the table are skipped.
+    """
+    header = None
+    records = []
+    for line in (output or '').splitlines():
+        line = line.strip()
+        if not line.startswith('|'):
+            continue
+        cells = [cell.strip() for cell in line.strip('|').split('|')]
+        if header is None:
+            header = [snake_case(cell) for cell in cells]
+        else:
+            records.append(dict(zip(header, cells)))
+    return records
+
+
+def select_requests(module, requests):
+    """Return the listed requests the pipeline should handle, oldest first."""
+    request_ids = set(module.params['request_ids'] or [])
+    deletion_types = set(module.params['deletion_types'] or [])
+    selected = [request for request in requests if isinstance(request, dict) and request.get('id') is not None
+                and (not request_ids or int(request['id']) in request_ids)
+                and (not deletion_types or request.get('deletion_type') in deletion_types)]
+    selected.sort(key=lambda request: int(request['id']))
+    if module.params['limit'] is not None:
+        selected = selected[:module.params['limit']]
+    return selected
+
+
+def run_pipeline(module, result):
+    cli_base = [module.params['multiflexi_cli_path']]
+    status = module.params['status'] or 'pending'
+    if status not in ('pending', 'approved'):
+        module.fail_json(msg="state=pipeline handles only pending or approved requests")
+    if module.params['batch_size'] < 1:
+        module.fail_json(msg="batch_size must be at least 1")
+    listed = json.loads(module.cli.run(cli_base + ['user-erasure:list', '--status', status, '--format', 'json'])
+                        or '[]')
+    listed = listed if isinstance(listed, list) else []
+    selected = select_requests(module, listed)
+
+    rows = []
+    for request in selected:
+        rows.append(dict(request_id=int(request['id']), user_id=request.get('user_id'),
+                         user_login=request.get('user_login') or request.get('login'),
+                         deletion_type=request.get('deletion_type'), status=status,
+                         approved=status != 'pending', processed=False))
+
+    approve_args = ['--force']
+    if module.params.get('notes'):
+        approve_args += ['--notes', module.params['notes']]
+    batch_size = module.params['batch_size']
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        pending = [row for row in batch if not row['approved']]
+        tasks = module.run_commands([cli_base + ['user-erasure:approve', '--request-id', str(row['request_id'])]
+                                     + approve_args for row in pending])
+        for row, task in zip(pending, tasks):
+            if task.error:
+                row.update(status='failed', step='approve', msg=str(task.error))
+            else:
+                row.update(status='would_approve' if module.check_mode else 'approved', approved=True)
+        if not module.params['process']:
+            continue
+        approved = [row for row in batch if row['status'] != 'failed']
+        tasks = module.run_commands([cli_base + ['user-erasure:process', '--request-id', str(row['request_id'])]
+                                     for row in approved])
+        for row, task in zip(approved, tasks):
+            if task.error:
+                row.update(status='failed', step='process', msg=str(task.error))
+            else:
+                row.update(status='would_complete' if module.check_mode else 'completed',
+                           processed=not module.check_mode)
+
+    if module.params['audit'] and not module.check_mode:
+        processed = [row for row in rows if row['processed']]
+        tasks = module.run_parallel(
+            lambda row: module.cli.run(cli_base + ['user-erasure:audit', '--request-id', str(row['request_id'])]),
+            processed)
+        for row, task in zip(processed, tasks):
+            if task.error:
+                row['audit_error'] = str(task.error)
+            else:
+                row['audit'] = parse_audit(task.result)
+
+    summary = dict(listed=len(listed), selected=len(rows))
+    for row in rows:
+        summary[row['status']] = summary.get(row['status'], 0) + 1
+    result['changed'] = any(row['status'] != status and row['status'] != 'failed' for row in rows)
+    result['requests'] = rows
+    result['summary'] = summary
+    if summary.get('failed'):
+        module.fail_json(msg=f"{summary['failed']} of {len(rows)} erasure requests failed", **result)
+    module.exit_json(**result)
+
 
 def run_module():
     module_args = dict(
-        state=dict(type='str', required=True, choices=['present', 'list', 'approve', 'reject', 'process', 'audit', 'cleanup']),
+        state=dict(type='str', required=True, choices=['present', 'list', 'approve', 'reject', 'process', 'audit', 'cleanup',
+                                                        'pipeline']),
         request_id=dict(type='int', required=False),
         user_id=dict(type='int', required=False),
         user_login=dict(type='str', required=False),
@@ -115,6 +296,12 @@ def run_module():
         reason=dict(type='str', required=False),
         notes=dict(type='str', required=False),
         status=dict(type='str', required=False, choices=['pending', 'approved', 'rejected', 'completed']),
+        request_ids=dict(type='list', elements='int', required=False),
+        deletion_types=dict(type='list', elements='str', required=False, choices=['soft', 'hard', 'anonymize']),
+        limit=dict(type='int', required=False),
+        batch_size=dict(type='int', required=False, default=50),
+        process=dict(type='bool', required=False, default=True),
+        audit=dict(type='bool', required=False, default=False),
         multiflexi_cli_path=dict(type='str', required=False, default='multiflexi-cli'),
     )
 
@@ -123,20 +310,29 @@ def run_module():
         erasure=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
+        parallel=True,
         supports_check_mode=True
     )
 
     state = module.params['state']
     cli_path = module.params['multiflexi_cli_path']
 
+    if state == 'pipeline':
+        try:
+            run_pipeline(module, result)
+        except MultiflexiCliError as e:
+            module.fail_json(msg=str(e), **result)
+        except (ValueError, TypeError) as e:
+            module.fail_json(msg=f"Unexpected user-erasure:list output: {e}", **result)
+
     try:
         if state == 'list':
             args = [cli_path, 'user-erasure:list', '--format', 'json']
             if module.params.get('status'):
                 args += ['--status', module.params['status']]
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['erasure'] = json.loads(output)
 
         elif state == 'present':
@@ -156,7 +352,7 @@ def run_module():
                 args += ['--reason', module.params['reason']]
             args += ['--force'] # To avoid interaction
 
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             # creation may not return JSON by default or different format
             result['changed'] = True
 
@@ -169,7 +365,7 @@ def run_module():
             args = [cli_path, 'user-erasure:approve', '--request-id', str(module.params['request_id']), '--force']
             if module.params.get('notes'):
                 args += ['--notes', module.params['notes']]
-            run_cli_command(args)
+            module.cli.run(args)
             result['changed'] = True
 
         elif state == 'reject':
@@ -181,7 +377,7 @@ def run_module():
                 result['changed'] = True
                 module.exit_json(**result)
             args = [cli_path, 'user-erasure:reject', '--request-id', str(module.params['request_id']), '--reason', module.params['reason'], '--force']
-            run_cli_command(args)
+            module.cli.run(args)
             result['changed'] = True
 
         elif state == 'process':
@@ -191,22 +387,23 @@ def run_module():
                 result['changed'] = True
                 module.exit_json(**result)
             args = [cli_path, 'user-erasure:process', '--request-id', str(module.params['request_id'])]
-            run_cli_command(args)
+            module.cli.run(args)
             result['changed'] = True
 
         elif state == 'audit':
             if not module.params.get('request_id'):
                 module.fail_json(msg="request_id is required for audit state")
             args = [cli_path, 'user-erasure:audit', '--request-id', str(module.params['request_id'])]
-            output = run_cli_command(args)
+            output = module.cli.run(args)
             result['erasure'] = output # Audit is likely text
+            result['audit'] = parse_audit(output)
 
         elif state == 'cleanup':
             if module.check_mode:
                 result['changed'] = True
                 module.exit_json(**result)
             args = [cli_path, 'user-erasure:cleanup']
-            run_cli_command(args)
+            module.cli.run(args)
             result['changed'] = True
 
     except Exception as e:
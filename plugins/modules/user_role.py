@@ -1,8 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.multiflexi import MultiflexiModule
 import json
 
 DOCUMENTATION = """
@@ -16,6 +15,9 @@ description:
 author:
     - Vitex (@Vitexus)
 
+extends_documentation_fragment:
+    - vitexus.multiflexi.cli
+
 options:
     user_id:
         description:
@@ -67,13 +69,6 @@ roles:
     returned: always
 """
 
-def run_cli_command(args):
-    try:
-        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"multiflexi-cli error: {e.stderr.strip()}")
-
 def run_module():
     module_args = dict(
         user_id=dict(type='int', required=False),
@@ -89,7 +84,7 @@ def run_module():
         roles=None
     )
 
-    module = AnsibleModule(
+    module = MultiflexiModule(
         argument_spec=module_args,
         supports_check_mode=True
     )
@@ -116,7 +111,7 @@ def run_module():
         args += ['--replace', 'true' if module.params['replace'] else 'false']
         args += ['--format', 'json']
 
-        output = run_cli_command(args)
+        output = module.cli.run(args)
         result['roles'] = json.loads(output)
         result['changed'] = True
 
@@ -0,0 +1,105 @@
+"""Fixtures running vitexus.multiflexi modules against the fake multiflexi-cli."""
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import contextlib
+import importlib
+import io
+import json
+import os
+
+import pytest
+
+from ansible.module_utils.testing import patch_module_args
+
+
+FAKE_CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_multiflexi_cli.py')
+
+# Settings of the modules which would bypass the fake CLI or its counters.
+ISOLATED_ENV = ('MULTIFLEXI_CACHE_PATH', 'MULTIFLEXI_CLI_WORKER', 'MULTIFLEXI_TRANSPORT', 'MULTIFLEXI_MAX_WORKERS')
+
+
+class CallStats(object):
+    """CLI calls of one module run read back from the fake CLI log."""
+
+    def __init__(self, log):
+        self.calls = []
+        if os.path.exists(log):
+            with open(log) as handle:
+                self.calls = [json.loads(line) for line in handle]
+
+    @property
+    def spawns(self):
+        return len(self.calls)
+
+    @property
+    def bytes_parsed(self):
+        return sum(call['bytes'] for call in self.calls)
+
+    @property
+    def commands(self):
+        return [next((arg for arg in call['args'] if not arg.startswith('-')), None) for call in self.calls]
+
+    def per_command(self):
+        return dict(collections.Counter(self.commands))
+
+    def reads_after_write(self):
+        """Return ``*:get`` commands of an entity issued after a write to it."""
+        written = set()
+        found = []
+        for command in self.commands:
+            entity, _sep, action = (command or '').partition(':')
+            if action == 'get' and entity in written:
+                found.append(command)
+            elif action not in ('get', 'list'):
+                written.add(entity)
+        return found
+
+
+class FakeMultiflexi(object):
+    """A fake multiflexi-cli on PATH with a configurable dataset and delay."""
+
+    def __init__(self, tmp_path, monkeypatch):
+        self.log = str(tmp_path / 'calls.jsonl')
+        bindir = tmp_path / 'bin'
+        bindir.mkdir()
+        os.symlink(FAKE_CLI, str(bindir / 'multiflexi-cli'))
+        for name in ISOLATED_ENV:
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setenv('PATH', f"{bindir}{os.pathsep}{os.environ.get('PATH', '')}")
+        monkeypatch.setenv('FAKE_MULTIFLEXI_LOG', self.log)
+        self._monkeypatch = monkeypatch
+        self.configure(records=int(os.environ.get('MULTIFLEXI_BENCH_RECORDS', '100')),
+                       delay=float(os.environ.get('MULTIFLEXI_BENCH_DELAY', '0')))
+
+    def configure(self, records=None, delay=None):
+        if records is not None:
+            self.records = records
+            self._monkeypatch.setenv('FAKE_MULTIFLEXI_RECORDS', str(records))
+        if delay is not None:
+            self.delay = delay
+            self._monkeypatch.setenv('FAKE_MULTIFLEXI_DELAY', str(delay))
+
+    def reset(self):
+        if os.path.exists(self.log):
+            os.remove(self.log)
+
+    def stats(self):
+        return CallStats(self.log)
+
+    def run_module(self, name, args):
+        """Run a module in-process and return its result dict."""
+        module = importlib.import_module(f'ansible_collections.vitexus.multiflexi.plugins.modules.{name}')
+        output = io.StringIO()
+        with patch_module_args(args), contextlib.redirect_stdout(output):
+            try:
+                (getattr(module, 'main', None) or module.run_module)()
+            except SystemExit:
+                pass
+        return json.loads(output.getvalue())
+
+
+@pytest.fixture
+def fake_multiflexi(tmp_path, monkeypatch):
+    return FakeMultiflexi(tmp_path, monkeypatch)
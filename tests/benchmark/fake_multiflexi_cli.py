@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright: (c) 2024, Dvořák Vítězslav <info@vitexsoftware.cz>
+
+"""Fake multiflexi-cli serving a generated dataset, for benchmarks.
+
+Behaviour is driven by environment variables:
+
+* ``FAKE_MULTIFLEXI_RECORDS`` - number of records of every entity (default 100)
+* ``FAKE_MULTIFLEXI_DELAY`` - seconds to sleep before answering, emulating
+  the PHP bootstrap of the real CLI (default 0)
+* ``FAKE_MULTIFLEXI_LOG`` - file receiving one JSON line per call with the
+  command line and the number of bytes written to stdout
+
+The data is stateless: creates answer with the next free id, updates and
+deletes succeed, reads always see the generated records.
+"""
+
+import json
+import os
+import sys
+import time
+
+
+# Options of a record lookup, in the order they are tried.
+LOOKUP_OPTIONS = ('id', 'uuid', 'slug', 'login', 'email', 'name', 'code')
+
+
+def make_record(entity, number, records):
+    """Return the generated record ``number`` (1-based) of an entity."""
+    other = (number % records) + 1
+    return dict(
+        id=number,
+        name=f"{entity}-{number}",
+        slug=f"{entity}-{number}",
+        code=f"{entity}-{number}",
+        uuid=f"00000000-0000-4000-8000-{number:012d}",
+        login=f"user{number}",
+        email=f"user{number}@example.com",
+        company_id=other,
+        app_id=other,
+        runtemplate_id=other,
+        job_id=other,
+        user_id=other,
+        credential_type_id=other,
+        event_source_id=other,
+        evidence='faktura-vydana',
+        operation='any',
+        priority=0,
+        executor='Native',
+        active=True,
+        enabled=True,
+        status='pending',
+        scheduled='2025-07-01 10:00:00',
+        begin='2025-07-01 10:00:00',
+        end='2025-07-01 10:00:42',
+        exitcode=0,
+        created='2025-06-01 10:00:00',
+        created_at='2025-06-01 10:00:00',
+        filename=f"{entity}-{number}.txt",
+    )
+
+
+def parse(args):
+    """Split a command line into the subcommand and its ``--option value`` pairs."""
+    command = None
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.startswith('--'):
+            name, _sep, value = arg[2:].partition('=')
+            if not _sep and i + 1 < len(args) and not args[i + 1].startswith('--'):
+                value = args[i + 1]
+                i += 1
+            options[name] = value
+        elif command is None:
+            command = arg
+        i += 1
+    return command, options
+
+
+def answer(command, options, records):
+    """Return ``(exitcode, payload)`` for one command."""
+    entity, _sep, action = (command or '').partition(':')
+    if command == 'worker':
+        return 1, None
+    if command == 'job:status':
+        return 0, dict(total_jobs=records, successful_jobs=records, failed_jobs=0, incomplete_jobs=0,
+                       repeated_jobs=0, timestamp='2025-07-01T10:00:00Z')
+    if action == 'list':
+        rows = [make_record(entity, number, records) for number in range(1, records + 1)]
+        if options.get('order') == 'D':
+            rows.reverse()
+        offset = int(options.get('offset') or 0)
+        limit = int(options['limit']) if options.get('limit') else None
+        rows = rows[offset:offset + limit if limit is not None else None]
+        if options.get('fields'):
+            fields = options['fields'].split(',')
+            rows = [dict((field, row.get(field)) for field in fields) for row in rows]
+        return 0, rows
+    if action == 'get':
+        for name in LOOKUP_OPTIONS:
+            if options.get(name):
+                # One more than the dataset so records just created can be read back
+                for number in range(1, records + 2):
+                    record = make_record(entity, number, records)
+                    if str(record[name]) == options[name]:
+                        return 0, record
+                break
+        return 1, {'status': 'not found', 'message': f"{entity} not found"}
+    if action == 'create':
+        record = make_record(entity, records + 1, records)
+        record.update(options)
+        return 0, dict(record, status='created')
+    if action == 'save' and options.get('file'):
+        with open(options['file'], 'w') as handle:
+            handle.write(json.dumps(make_record(entity, int(options.get('id') or 1), records)))
+        return 0, {'status': 'success', 'file': options['file']}
+    if action in ('update', 'delete', 'remove'):
+        return 0, {'status': 'success', 'message': f"{entity} {action}d", 'id': options.get('id')}
+    return 0, {'status': 'success', 'command': command, 'options': options}
+
+
+def main():
+    args = sys.argv[1:]
+    records = int(os.environ.get('FAKE_MULTIFLEXI_RECORDS', '100'))
+    delay = float(os.environ.get('FAKE_MULTIFLEXI_DELAY', '0'))
+    if delay:
+        time.sleep(delay)
+    command, options = parse(args)
+    rc, payload = answer(command, options, records)
+    if payload is None:
+        output = ''
+        sys.stderr.write(f'Command "{command}" is not defined.\n')
+    else:
+        output = json.dumps(payload)
+    sys.stdout.write(output)
+    log = os.environ.get('FAKE_MULTIFLEXI_LOG')
+    if log:
+        with open(log, 'a') as handle:
+            handle.write(json.dumps({'args': args, 'bytes': len(output)}) + '\n')
+    sys.exit(rc)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Latency and CLI call budgets of vitexus.multiflexi modules.
+
+Every scenario runs a module in-process against the fake multiflexi-cli in
+this directory and records, next to the wall time measured by
+pytest-benchmark, the number of CLI processes spawned, the bytes of CLI
+output parsed and the calls per subcommand (``extra_info`` of the report).
+A scenario fails when it spawns more processes than its budget, or when it
+reads an entity back after writing it although it is not expected to, so
+extra round-trips are caught before a release.
+
+Run with::
+
+    pytest tests/benchmark -n0 --benchmark-only
+
+``MULTIFLEXI_BENCH_RECORDS`` (records per entity, default 100),
+``MULTIFLEXI_BENCH_DELAY`` (seconds per CLI call, default 0) and
+``MULTIFLEXI_BENCH_ROUNDS`` (default 5) tune the runs.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+
+ROUNDS = int(os.environ.get('MULTIFLEXI_BENCH_ROUNDS', '5'))
+
+UUID = '00000000-0000-4000-8000-000000000002'
+NEW_UUID = '11111111-0000-4000-8000-000000000002'
+
+# (module, arguments, spawn budget, whether records are read back after a write)
+SCENARIOS = [
+    pytest.param('application', dict(state='get', app_id=2), 1, False, id='application-get-id'),
+    pytest.param('application', dict(state='get', uuid=UUID), 1, False, id='application-get-uuid'),
+    pytest.param('application', dict(state='present', name='application-2', uuid=UUID, executable='x'), 3, True,
+                 id='application-update'),
+    pytest.param('application', dict(state='present', name='new', uuid=NEW_UUID, executable='x'), 3, True,
+                 id='application-create'),
+    pytest.param('application', dict(state='absent', app_id=2), 2, False, id='application-absent'),
+    pytest.param('artifact', dict(state='list'), 1, False, id='artifact-list'),
+    pytest.param('artifact', dict(state='get', id=2), 1, False, id='artifact-get'),
+    pytest.param('company', dict(state='get', slug='company-2'), 1, False, id='company-get'),
+    pytest.param('company', dict(state='present', slug='company-2', name='company-2'), 3, True, id='company-update'),
+    pytest.param('company', dict(state='present', slug='new', name='New'), 3, True, id='company-create'),
+    pytest.param('company', dict(state='absent', slug='company-2'), 2, False, id='company-absent'),
+    pytest.param('company_info', dict(slug='company-2'), 1, False, id='company_info'),
+    pytest.param('companyapp', dict(state='get'), 1, False, id='companyapp-get'),
+    pytest.param('companyapp', dict(state='present', company_id=1, app_id=4), 1, False, id='companyapp-present'),
+    pytest.param('companyapp_sync', dict(assignments=[dict(company='company-1', apps=['2', '3'])]), 5, False,
+                 id='companyapp_sync'),
+    pytest.param('credential', dict(state='get', name='credential-2'), 2, False, id='credential-get'),
+    pytest.param('credential', dict(state='present', name='new', company_id=3, credential_type_id=3), 3, True,
+                 id='credential-create'),
+    pytest.param('credential_type', dict(state='list'), 1, False, id='credential_type-list'),
+    pytest.param('crprototype', dict(state='list'), 1, False, id='crprototype-list'),
+    pytest.param('encryption', dict(state='status'), 1, False, id='encryption-status'),
+    pytest.param('eventrule', dict(state='list'), 1, False, id='eventrule-list'),
+    pytest.param('eventrule_sync', dict(rules=[dict(event_source_id=2, evidence='faktura-vydana', runtemplate_id=2),
+                                               dict(event_source_id=2, evidence='banka', runtemplate_id=7)]), 2, False,
+                 id='eventrule_sync'),
+    pytest.param('eventsource', dict(state='list'), 1, False, id='eventsource-list'),
+    pytest.param('eventsource', dict(state='test', eventsource_ids=[1, 2, 3], max_workers=3), 4, False,
+                 id='eventsource-test-all'),
+    pytest.param('job', dict(state='get', job_id=2), 1, False, id='job-get'),
+    pytest.param('job', dict(state='present', runtemplate_id=3, scheduled='2025-07-01 10:00:00', executor='Native'),
+                 1, False, id='job-unchanged'),
+    pytest.param('job', dict(state='present', runtemplate_id=9, scheduled='2025-07-01 11:00:00', executor='Native'),
+                 3, True, id='job-create'),
+    pytest.param('job', dict(state='present', jobs=[dict(runtemplate_id=3, scheduled='2025-07-01 10:00:00'),
+                                                    dict(runtemplate_id=9, scheduled='now')]), 2, False,
+                 id='job-batch'),
+    pytest.param('multiflexi_info', dict(), 1, False, id='multiflexi_info'),
+    pytest.param('multiflexi_status', dict(), 1, False, id='multiflexi_status'),
+    pytest.param('multiflexi_status', dict(sections=['ping']), 1, False, id='multiflexi_status-ping'),
+    pytest.param('prune', dict(logs=True, jobs=True), 1, False, id='prune'),
+    pytest.param('prune', dict(jobs=True, keep=10, batch_size=30), 7, False, id='prune-batched'),
+    pytest.param('prune', dict(retention=[dict(max_age_days=90), dict(company='company-3')]), 101, False,
+                 id='prune-retention'),
+    pytest.param('queue', dict(state='overview'), 1, False, id='queue-overview'),
+    pytest.param('queue', dict(state='list'), 1, False, id='queue-list'),
+    pytest.param('runtemplate', dict(state='get', runtemplate_id=2), 1, False, id='runtemplate-get'),
+    pytest.param('runtemplate', dict(state='present', name='new', app_id=3, company_id=3), 3, True,
+                 id='runtemplate-create'),
+    pytest.param('telemetry', dict(), 1, False, id='telemetry'),
+    pytest.param('token', dict(state='list'), 1, False, id='token-list'),
+    pytest.param('token', dict(state='rotate', owners=['user2']), 3, False, id='token-rotate'),
+    pytest.param('user', dict(state='get', login='user2'), 1, False, id='user-get'),
+    pytest.param('user', dict(state='present', login='newbie', email='n@example.com'), 3, True, id='user-create'),
+    pytest.param('user', dict(state='present', users=[dict(login='user2'), dict(login='user3', firstname='Ann'),
+                                                      dict(login='newbie', email='n@example.com')]), 3, False,
+                 id='user-batch'),
+    pytest.param('user_company', dict(state='present', company_id=1, login='user2'), 1, False,
+                 id='user_company'),
+    pytest.param('user_erasure', dict(state='list'), 1, False, id='user_erasure-list'),
+    pytest.param('user_erasure', dict(state='pipeline', request_ids=[1, 2]), 5, False, id='user_erasure-pipeline'),
+    pytest.param('user_role', dict(login='user2', roles=['admin']), 1, False, id='user_role'),
+]
+
+
+@pytest.mark.parametrize('name,args,max_spawns,reads_back', SCENARIOS)
+def test_module_latency(benchmark, fake_multiflexi, name, args, max_spawns, reads_back):
+    result = benchmark.pedantic(fake_multiflexi.run_module, args=(name, args),
+                                setup=fake_multiflexi.reset, rounds=ROUNDS, iterations=1)
+    stats = fake_multiflexi.stats()
+    benchmark.extra_info.update(
+        records=fake_multiflexi.records,
+        delay=fake_multiflexi.delay,
+        spawns=stats.spawns,
+        bytes_parsed=stats.bytes_parsed,
+        commands=stats.per_command(),
+    )
+
+    assert not result.get('failed'), result.get('msg')
+    assert stats.spawns <= max_spawns, f"{stats.spawns} CLI calls, budget {max_spawns}: {stats.commands}"
+    if not reads_back:
+        assert not stats.reads_after_write(), f"Records read back after a write: {stats.commands}"
+
+
+@pytest.mark.parametrize('records', [10, 1000])
+def test_list_scales_with_dataset(benchmark, fake_multiflexi, records):
+    fake_multiflexi.configure(records=records)
+    result = benchmark.pedantic(fake_multiflexi.run_module, args=('job', dict(state='get')),
+                                setup=fake_multiflexi.reset, rounds=ROUNDS, iterations=1)
+    stats = fake_multiflexi.stats()
+    benchmark.extra_info.update(records=records, spawns=stats.spawns, bytes_parsed=stats.bytes_parsed)
+
+    assert len(result['job']) == records
+    assert stats.spawns == 1
@@ -0,0 +1,27 @@
+"""Unit tests for the vitexus.multiflexi.multiflexi cache plugin."""
+
+from __future__ import absolute_import, division, print_function
+
+from ansible.plugins.loader import cache_loader
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cache import EntityCache
+
+
+def test_plugin_round_trip_and_flush(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    plugin = cache_loader.get('vitexus.multiflexi.multiflexi', _uri=path, _timeout=60)
+
+    plugin.set('host1', {'ansible_facts': {'a': 1}})
+    assert plugin.contains('host1')
+    assert plugin.get('host1') == {'ansible_facts': {'a': 1}}
+    assert plugin.keys() == ['host1']
+
+    # Module lookups share the file but not the plugin's key space.
+    EntityCache(path).set('cli:["company:get"]', '{}', 'company')
+    assert plugin.keys() == ['host1']
+
+    plugin.delete('host1')
+    assert not plugin.contains('host1')
+
+    plugin.flush()
+    assert EntityCache(path).keys() == []
@@ -0,0 +1,56 @@
+"""Unit tests for the vitexus.multiflexi.multiflexi_timings callback plugin."""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+
+from ansible.plugins.loader import callback_loader
+
+
+class FakeTask:
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_name(self):
+        return self.name
+
+
+class FakeResult:
+
+    def __init__(self, task_name, result):
+        self._task = FakeTask(task_name)
+        self._result = result
+
+
+def timings(*calls):
+    return dict(count=len(calls), calls=[dict(command=command, duration=duration, rc=rc, bytes=size)
+                                         for command, duration, rc, size in calls])
+
+
+def test_slowest_subcommands_are_reported_first(tmp_path):
+    output = tmp_path / 'timings.json'
+    plugin = callback_loader.get('vitexus.multiflexi.multiflexi_timings')
+    plugin.set_options(direct=dict(top=5, output_path=str(output)))
+    lines = []
+    plugin._display.display = lambda msg, *args, **kwargs: lines.append(msg)
+    plugin._display.banner = lambda msg, *args, **kwargs: lines.append(msg)
+
+    plugin.v2_runner_on_ok(FakeResult('sync jobs', dict(timings=timings(
+        ('job:list', 2.0, 0, 5000), ('job:create', 0.5, 0, 40), ('job:create', 0.7, 0, 40)))))
+    plugin.v2_runner_on_failed(FakeResult('loop', dict(results=[
+        dict(timings=timings(('company:get', 0.1, 1, 30))),
+        dict(timings=timings(('job:list', 1.0, 0, 5000))),
+        dict(skipped=True),
+    ])))
+    plugin.v2_runner_on_ok(FakeResult('untimed', dict(changed=False)))
+    plugin.v2_playbook_on_stats(None)
+
+    report = json.loads(output.read_text())
+    assert report['calls'] == 5
+    assert [command['command'] for command in report['commands']] == ['job:list', 'job:create', 'company:get']
+    assert report['commands'][0] == dict(command='job:list', calls=2, total=3.0, mean=1.5, max=2.0, failed=0,
+                                         bytes=10000)
+    assert report['commands'][2]['failed'] == 1
+    assert [task['task'] for task in report['tasks']] == ['sync jobs', 'loop']
+    assert any(line.startswith('job:list') for line in lines)
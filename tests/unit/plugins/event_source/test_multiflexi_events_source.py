@@ -0,0 +1,190 @@
+"""Unit tests for the multiflexi_events EDA source, replaying the states recorded in fixtures/."""
+
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from ansible_collections.vitexus.multiflexi.extensions.eda.plugins.event_source import multiflexi_events
+from ansible_collections.vitexus.multiflexi.extensions.eda.plugins.event_source.multiflexi_events import (
+    JobWatcher,
+    MultiflexiEventError,
+    cli_runner,
+)
+
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'multiflexi_events.json')
+
+
+class ReplayCli(object):
+    """Answers job:list, job:get and queue:overview from the current step of the fixture."""
+
+    def __init__(self, path=FIXTURE, steps=None):
+        if steps is None:
+            with open(path) as handle:
+                steps = json.load(handle)['steps']
+        self.steps = steps
+        self.step = 0
+        self.calls = []
+
+    def option(self, args, name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    async def __call__(self, args, allow_not_found=False):
+        self.calls.append(args)
+        state = self.steps[self.step]
+        if args[0] == 'queue:overview':
+            return state['queue']
+        if args[0] == 'job:get':
+            for job in state['jobs']:
+                if str(job['id']) == self.option(args, '--id'):
+                    return job
+            # The CLI exits non-zero with a not found payload
+            if allow_not_found:
+                return {'status': 'not found'}
+            raise MultiflexiEventError('job:get failed with exit code 1: {"status": "not found"}')
+        rows = list(state['jobs'])
+        status = self.option(args, '--status')
+        if status == 'running':
+            rows = [job for job in rows if job['begin'] and not job['end']]
+        elif status == 'pending':
+            rows = [job for job in rows if not job['begin']]
+        if self.option(args, '--order') == 'D':
+            rows.reverse()
+        offset = int(self.option(args, '--offset', 0))
+        return rows[offset:offset + int(self.option(args, '--limit', len(rows)))]
+
+
+def summarize(events):
+    summary = []
+    for event in events:
+        data = event['multiflexi']
+        if data['type'] == 'queue_depth':
+            summary.append(('queue_depth', data['depth'], data['delta']))
+        else:
+            summary.append((data['type'], data['job']['id'], data.get('failed')))
+    return summary
+
+
+def poll_all(watcher, replay):
+    polls = []
+    for step in range(len(replay.steps)):
+        replay.step = step
+        replay.calls = []
+        polls.append((summarize(asyncio.run(watcher.poll())), list(replay.calls)))
+    return polls
+
+
+def test_replay_emits_job_and_queue_changes_once():
+    replay = ReplayCli()
+    polls = poll_all(JobWatcher(replay, dict(page_size=2)), replay)
+
+    assert [events for events, _calls in polls] == [
+        # Existing jobs are not emitted, the unfinished ones are tracked
+        [('queue_depth', 2, 2)],
+        [('job_finished', 3, True), ('job_scheduled', 5, None), ('job_finished', 6, False)],
+        [('job_finished', 4, False), ('job_scheduled', 7, None), ('job_scheduled', 8, None),
+         ('job_scheduled', 9, None), ('queue_depth', 5, 3)],
+        [],
+    ]
+
+
+def test_replay_reads_only_pages_above_high_water_mark():
+    replay = ReplayCli()
+    polls = poll_all(JobWatcher(replay, dict(page_size=2)), replay)
+
+    # One page, then as many as needed to reach the high-water mark, never the whole table
+    pages = [len([args for args in calls if args[0] == 'job:list' and '--status' not in args])
+             for _events, calls in polls]
+    assert pages == [1, 2, 2, 1]
+    # Finished jobs are read back once each
+    gets = [args[args.index('--id') + 1] for _events, calls in polls for args in calls if args[0] == 'job:get']
+    assert gets == ['3', '4']
+
+
+def test_deleted_tracked_job_is_dropped():
+    running = {"id": 1, "runtemplate_id": 10, "company_id": 1, "begin": "2025-07-01 10:00:00", "end": None,
+               "exitcode": None}
+    new = {"id": 2, "runtemplate_id": 10, "company_id": 1, "begin": None, "end": None, "exitcode": None}
+    replay = ReplayCli(steps=[{'jobs': [running], 'queue': {}}, {'jobs': [], 'queue': {}},
+                              {'jobs': [new], 'queue': {}}])
+    watcher = JobWatcher(replay, dict(queue=False))
+    polls = poll_all(watcher, replay)
+
+    assert [events for events, _calls in polls] == [[], [], [('job_scheduled', 2, None)]]
+    assert list(watcher.tracked) == [2]
+
+
+def test_tracked_jobs_missing_from_cut_off_list_are_read_in_bounded_turns():
+    def job(job_id, end=None):
+        return {"id": job_id, "runtemplate_id": 10, "company_id": 1, "begin": "2025-07-01 10:00:00", "end": end,
+                "exitcode": 0 if end else None}
+
+    running = [job(job_id) for job_id in range(1, 7)]
+    done = running[:5] + [job(6, end="2025-07-01 10:05:00")]
+    replay = ReplayCli(steps=[{'jobs': running, 'queue': {}}] * 3 + [{'jobs': done, 'queue': {}}] * 2)
+    watcher = JobWatcher(replay, dict(since_id=0, track_limit=4, page_size=1, queue=False))
+    polls = poll_all(watcher, replay)
+
+    # The running list is cut off at 4 jobs, so 5 and 6 look finished but are read one per poll
+    gets = [[args[args.index('--id') + 1] for args in calls if args[0] == 'job:get'] for _events, calls in polls]
+    assert gets == [[], ['5'], ['6'], ['5'], ['6']]
+    assert [events for events, _calls in polls][1:] == [[], [], [], [('job_finished', 6, False)]]
+    assert sorted(watcher.tracked) == [3, 4, 5]
+
+
+def test_first_poll_of_empty_instance_sets_high_water_mark():
+    job = {"id": 1, "runtemplate_id": 10, "company_id": 1, "begin": None, "end": None, "exitcode": None}
+    replay = ReplayCli(steps=[{'jobs': [], 'queue': {}}, {'jobs': [job], 'queue': {}}])
+    watcher = JobWatcher(replay, dict(queue=False))
+
+    assert [events for events, _calls in poll_all(watcher, replay)] == [[], [('job_scheduled', 1, None)]]
+    assert watcher.high_water_mark == 1
+
+
+def test_since_id_emits_existing_jobs():
+    replay = ReplayCli()
+    watcher = JobWatcher(replay, dict(since_id=2, queue=False))
+
+    assert summarize(asyncio.run(watcher.poll())) == [('job_scheduled', 3, None), ('job_scheduled', 4, None)]
+    assert watcher.high_water_mark == 4
+
+
+def test_main_puts_events_and_survives_cli_errors(monkeypatch):
+    replay = ReplayCli()
+    failures = [MultiflexiEventError('job:list failed with exit code 1: Database is locked')]
+
+    async def flaky(args):
+        if failures:
+            raise failures.pop()
+        return await replay(args)
+
+    monkeypatch.setattr(multiflexi_events, 'cli_runner', lambda command, timeout: flaky)
+
+    async def collect():
+        queue = asyncio.Queue()
+        task = asyncio.ensure_future(multiflexi_events.main(queue, dict(interval=0.01, since_id=3)))
+        event = await asyncio.wait_for(queue.get(), 5)
+        task.cancel()
+        return event
+
+    assert summarize([asyncio.run(collect())]) == [('job_scheduled', 4, None)]
+
+
+def test_cli_runner_reports_exit_code_and_parses_json():
+    ok = cli_runner(f"{sys.executable} -c 'import json, sys; print(json.dumps(sys.argv[1:]))'", 10)
+    assert asyncio.run(ok(['job:list', '--format', 'json'])) == ['job:list', '--format', 'json']
+
+    failing = cli_runner(f"{sys.executable} -c 'import sys; sys.stderr.write(\"locked\"); sys.exit(3)'", 10)
+    with pytest.raises(MultiflexiEventError, match='exit code 3: locked'):
+        asyncio.run(failing(['job:list']))
+
+    missing = cli_runner(f"{sys.executable} -c 'import json; print(json.dumps(dict(status=\"not found\"))); exit(1)'",
+                         10)
+    assert asyncio.run(missing(['job:get', '--id', '7'], allow_not_found=True)) == {'status': 'not found'}
+    with pytest.raises(MultiflexiEventError, match='exit code 1'):
+        asyncio.run(missing(['job:get', '--id', '7']))
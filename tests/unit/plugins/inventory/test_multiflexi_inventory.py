@@ -0,0 +1,105 @@
+"""Unit tests for the vitexus.multiflexi.multiflexi inventory plugin."""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import sys
+
+from ansible.inventory.manager import InventoryManager
+from ansible.parsing.dataloader import DataLoader
+
+from ansible_collections.vitexus.multiflexi.plugins.inventory import multiflexi
+
+
+FAKE_CLI = """#!{python}
+import json, sys
+with open({log!r}, 'a') as log:
+    log.write(' '.join(sys.argv[1:]) + '\\n')
+print(json.dumps({{
+    'company:list': [{{'id': 1, 'name': 'Acme', 'slug': 'acme'}}, {{'id': 2, 'name': 'Beta', 'slug': 'beta'}}],
+    'application:list': [{{'id': 7, 'name': 'Probe', 'uuid': 'b6e2c4f5'}}, {{'id': 8, 'name': 'Backup', 'uuid': 'a1a2'}}],
+    'company-app:list': [{{'id': 1, 'company_id': 1, 'app_id': 7}}, {{'id': 2, 'company_id': 2, 'app_id': 8}}],
+    'run-template:list': [
+        {{'id': 10, 'name': 'probe', 'company_id': 1, 'app_id': 7, 'active': True, 'executor': 'Native'}},
+        {{'id': 11, 'name': 'backup', 'company_id': 2, 'app_id': 8, 'active': False, 'executor': 'Docker'}},
+    ],
+}}[sys.argv[1]]))
+"""
+
+
+def make_inventory(tmp_path, extra=''):
+    log = tmp_path / "calls.log"
+    script = tmp_path / "multiflexi-cli"
+    script.write_text(FAKE_CLI.format(python=sys.executable, log=str(log)))
+    script.chmod(0o755)
+    config = tmp_path / "test.multiflexi.yml"
+    config.write_text(f"plugin: vitexus.multiflexi.multiflexi\nmultiflexi_cli: {script}\n{extra}")
+    return str(config), log
+
+
+def calls(log):
+    return log.read_text().splitlines() if log.exists() else []
+
+
+def test_groups_and_hostvars(tmp_path):
+    config, log = make_inventory(tmp_path, "keyed_groups:\n  - key: multiflexi_runtemplate.executor\n    prefix: executor\n")
+    inventory = InventoryManager(loader=DataLoader(), sources=[config])
+
+    assert [h.name for h in inventory.groups['company_acme'].get_hosts()] == ['runtemplate_10']
+    assert [h.name for h in inventory.groups['app_Backup'].get_hosts()] == ['runtemplate_11']
+    assert [h.name for h in inventory.groups['executor_Docker'].get_hosts()] == ['runtemplate_11']
+    assert inventory.groups['company_beta'].get_vars()['multiflexi_company']['name'] == 'Beta'
+
+    hostvars = inventory.get_host('runtemplate_10').get_vars()
+    assert hostvars['multiflexi_app_uuid'] == 'b6e2c4f5'
+    assert hostvars['multiflexi_company_id'] == 1
+    assert hostvars['ansible_connection'] == 'local'
+    assert len(calls(log)) == 4
+
+
+def test_only_active(tmp_path):
+    config, log = make_inventory(tmp_path, "only_active: true\n")
+    inventory = InventoryManager(loader=DataLoader(), sources=[config])
+    assert inventory.get_host('runtemplate_11') is None
+    assert 'app_Backup' in inventory.groups
+
+
+def test_inventory_cache_skips_the_cli(tmp_path):
+    cache = (f"cache: true\ncache_plugin: vitexus.multiflexi.multiflexi\n"
+             f"cache_connection: {tmp_path / 'cache.sqlite'}\n")
+    config, log = make_inventory(tmp_path, cache)
+    InventoryManager(loader=DataLoader(), sources=[config])
+    inventory = InventoryManager(loader=DataLoader(), sources=[config])
+
+    assert inventory.get_host('runtemplate_11') is not None
+    assert len(calls(log)) == 4
+
+
+def test_api_transport_builds_app_groups_from_run_templates(tmp_path, monkeypatch):
+    commands = []
+
+    class FakeApi(object):
+        def __init__(self, *args):
+            pass
+
+        def execute(self, args):
+            commands.append(args[1])
+            if args[1] == 'company-app:list':
+                return 1, '', "'company-app:list' is not available with transport=api"
+            data = {
+                'company:list': [{'id': 1, 'name': 'Acme', 'slug': 'acme'}],
+                'application:list': [{'id': 7, 'name': 'Probe', 'uuid': 'b6e2c4f5'}],
+                'run-template:list': [{'id': 10, 'name': 'probe', 'company_id': 1, 'app_id': 7, 'active': True}],
+            }
+            return 0, json.dumps(data[args[1]]), ''
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(multiflexi, 'MultiflexiApi', FakeApi)
+    config, log = make_inventory(tmp_path, "transport: api\napi_url: https://multiflexi.example.com/api/\n")
+    inventory = InventoryManager(loader=DataLoader(), sources=[config])
+
+    assert [h.name for h in inventory.groups['app_Probe'].get_hosts()] == ['runtemplate_10']
+    assert 'company-app:list' not in commands
+    assert not calls(log)
@@ -0,0 +1,195 @@
+"""Unit tests for the REST API transport, run against a stub of docs/openapi-schema.yaml."""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import re
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import yaml
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.api import MultiflexiApi, parse_command
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCli, MultiflexiCliError
+
+
+SCHEMA = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'docs', 'openapi-schema.yaml')
+BASE_PATH = '/api/VitexSoftware/MultiFlexi/1.0.0'
+
+# Listing endpoint -> table of the single record endpoints.
+LISTINGS = {
+    'apps': 'app', 'jobs': 'job', 'runtemplates': 'runtemplate', 'users': 'user', 'companies': 'company',
+    'credentials': 'credential', 'credential_types': 'credential_type', 'topics': 'topic',
+}
+
+
+def build_routes():
+    """Turn every path of the OpenAPI schema into (method, regex, table, kind)."""
+    with open(SCHEMA) as schema:
+        paths = yaml.safe_load(schema)['paths']
+    routes = []
+    for path, operations in paths.items():
+        pattern = re.escape(path.rstrip('/'))
+        pattern = pattern.replace(re.escape('{suffix}'), 'json')
+        pattern = re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>[^/.]+)', pattern)
+        segment = path.strip('/').split('/')[0].split('.')[0]
+        for method in ('get', 'post'):
+            if method not in operations:
+                continue
+            if segment in LISTINGS and path.count('/') == 1:
+                kind, table = 'list', LISTINGS[segment]
+            elif segment in LISTINGS.values():
+                kind, table = ('get' if method == 'get' else 'save'), segment
+            else:
+                kind, table = segment, None
+            routes.append((method.upper(), re.compile(f"^{pattern}/?$"), table, kind))
+    return routes
+
+
+class StubApi(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.routes = build_routes()
+        self.tables = {
+            'app': {1: {'id': 1, 'name': 'Probe', 'uuid': 'b6e2c4f5', 'executable': 'probe'},
+                    2: {'id': 2, 'name': 'Backup', 'uuid': 'a1a2a3a4', 'executable': 'backup'}},
+            'company': {1: {'id': 1, 'name': 'Acme', 'slug': 'acme', 'ic': '12345678'}},
+            'job': {}, 'runtemplate': {}, 'user': {}, 'credential': {}, 'credential_type': {}, 'topic': {},
+        }
+        self.connections = 0
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}{BASE_PATH}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self, method):
+        url = urlsplit(self.path)
+        query = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        self.server.requests.append((method, url.path, query, body))
+        if self.headers.get('Authorization') != 'Basic YWRtaW46c2VjcmV0':
+            return self.reply(401, {'message': 'Unauthorized'})
+        if int(query.get('limit', 1)) not in range(1, 101):
+            return self.reply(400, {'message': 'limit must be between 1 and 100'})
+        path = url.path[len(BASE_PATH):]
+        for route_method, regex, table, kind in self.server.routes:
+            match = regex.match(path)
+            if route_method != method or not match:
+                continue
+            params = dict(query, **match.groupdict())
+            record_id = next((value for key, value in params.items() if key.endswith(('Id', 'ID'))), None)
+            records = self.server.tables.get(table)
+            if kind == 'list':
+                return self.reply(200, list(records.values())[:int(query.get('limit', 100))])
+            if kind == 'get':
+                if int(record_id) not in records:
+                    return self.reply(404, {'message': f"{table} {record_id} not found"})
+                return self.reply(200, records[int(record_id)])
+            if kind == 'save':
+                record_id = int(record_id) if record_id else max(records or [0]) + 1
+                records.setdefault(record_id, {'id': record_id}).update(body)
+                return self.reply(201, records[record_id])
+            if kind == 'status':
+                return self.reply(200, {'version': '2.0.0', 'apps': len(self.server.tables['app'])})
+            return self.reply(200, {'kind': kind})
+        self.reply(404, {'message': f"No route for {method} {path}"})
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+
+@pytest.fixture
+def stub():
+    server = StubApi()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cli(stub):
+    executor = MultiflexiCli(api=MultiflexiApi(stub.url, 'admin', 'secret'))
+    yield executor
+    executor.close()
+
+
+def test_parse_command():
+    assert parse_command(['multiflexi-cli', 'company:get', '--slug', 'acme', '--verbose', '--format=json']) == (
+        'company:get', {'slug': 'acme', 'verbose': True, 'format': 'json'})
+
+
+def test_reads_share_one_keepalive_connection(cli, stub):
+    assert cli.run_json(['multiflexi-cli', 'application:get', '--id', 1, '--format', 'json'])['name'] == 'Probe'
+    assert cli.run_json(['multiflexi-cli', 'company:get', '--slug', 'acme', '--format', 'json'])['ic'] == '12345678'
+    assert cli.run_json(['multiflexi-cli', 'application:list', '--fields', 'id,uuid', '--offset', '1']) == [
+        {'id': 2, 'uuid': 'a1a2a3a4'}]
+    assert cli.run_json(['multiflexi-cli', 'status', '--format', 'json'])['version'] == '2.0.0'
+    assert len(stub.requests) == 4
+    assert stub.connections == 1
+
+
+def test_not_found(cli):
+    output = cli.run(['multiflexi-cli', 'application:get', '--id', 404], allow_not_found=True)
+    assert json.loads(output)['status'] == 'not found'
+    with pytest.raises(MultiflexiCliError, match='not found'):
+        cli.run(['multiflexi-cli', 'company:get', '--slug', 'missing'])
+
+
+def test_create_and_update(cli, stub):
+    created = cli.run_json(['multiflexi-cli', 'company:create', '--name', 'Beta', '--slug', 'beta'])
+    cli.run(['multiflexi-cli', 'company:update', '--id', created['id'], '--name', 'Beta Ltd'])
+    assert stub.tables['company'][created['id']]['name'] == 'Beta Ltd'
+    assert stub.requests[-1][1:3] == (f"{BASE_PATH}/company/", {'companyId': str(created['id'])})
+
+
+def test_commands_missing_in_the_api_are_refused(cli, stub):
+    with pytest.raises(MultiflexiCliError, match='transport=cli'):
+        cli.run(['multiflexi-cli', 'application:delete', '--id', 1])
+    assert stub.requests == []
+
+
+def test_stale_keepalive_connection_is_replaced(cli, stub):
+    cli.run(['multiflexi-cli', 'application:get', '--id', 1])
+    # The server dropped the idle connection.
+    cli.api._pool[0].sock.shutdown(socket.SHUT_RDWR)
+    assert cli.run_json(['multiflexi-cli', 'application:get', '--id', 2])['name'] == 'Backup'
+    assert stub.connections == 2
+
+
+def test_authentication_failure(stub):
+    api = MultiflexiApi(stub.url, 'admin', 'wrong')
+    rc, stdout, stderr = api.execute(['multiflexi-cli', 'status'])
+    assert rc == 1
+    assert 'Unauthorized' in stderr
@@ -0,0 +1,98 @@
+"""Unit tests for the persistent lookup cache."""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import sys
+import time
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cache import EntityCache, cache_entity
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCli
+
+
+FAKE_CLI = """#!{python}
+import json, sys
+with open({log!r}, 'a') as log:
+    log.write(' '.join(sys.argv[1:]) + '\\n')
+print(json.dumps({{'args': sys.argv[1:]}}))
+"""
+
+
+def make_cli(tmp_path):
+    log = tmp_path / "calls.log"
+    script = tmp_path / "multiflexi-cli"
+    script.write_text(FAKE_CLI.format(python=sys.executable, log=str(log)))
+    script.chmod(0o755)
+    return str(script), log
+
+
+def calls(log):
+    return log.read_text().splitlines() if log.exists() else []
+
+
+def test_cache_entity():
+    assert cache_entity(['multiflexi-cli', 'application:get', '--uuid', 'x']) == 'application'
+    assert cache_entity(['multiflexi-cli', 'credential-prototype:update', '--id', 1]) == 'credential-prototype'
+    assert cache_entity(['multiflexi-cli', 'job:list']) is None
+    assert cache_entity(['multiflexi-cli', 'credential:list', '--fields', 'id,name']) == 'credential'
+    assert cache_entity(['multiflexi-cli', 'credential:update', '--id', 1]) == 'credential'
+    assert cache_entity(['multiflexi-cli', 'credential:get', '--id', 1]) is None
+
+
+def test_ttl_and_invalidation(tmp_path):
+    cache = EntityCache(str(tmp_path / 'cache.sqlite'), ttl=60)
+    cache.set('a', {'id': 1}, 'application')
+    cache.set('c', {'id': 2}, 'company')
+    assert cache.get('a') == {'id': 1}
+
+    cache.invalidate('application')
+    assert cache.get('a') is None
+    assert cache.keys() == ['c']
+
+    cache.ttl = 0.01
+    time.sleep(0.05)
+    assert cache.get('c') is None
+
+
+def test_cache_hit_skips_the_cli_across_runs(tmp_path):
+    binary, log = make_cli(tmp_path)
+    path = str(tmp_path / 'cache.sqlite')
+    lookup = [binary, 'application:get', '--uuid', 'b6e2c4f5', '--format', 'json']
+
+    first = MultiflexiCli(cache=EntityCache(path))
+    app = first.run_json(lookup)
+    first.close()
+
+    second = MultiflexiCli(cache=EntityCache(path))
+    assert second.run_json(lookup) == app
+    assert second.run_json([binary, 'job:list']) == {'args': ['job:list']}
+    assert len(calls(log)) == 2
+
+    second.run([binary, 'application:update', '--uuid', 'b6e2c4f5', '--name', 'Probe'])
+    second.run(lookup)
+    assert calls(log)[-1] == 'application:get --uuid b6e2c4f5 --format json'
+    assert len(calls(log)) == 4
+    second.close()
+
+
+def test_instances_sharing_the_file_are_kept_apart(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    first, first_log = make_cli(tmp_path)
+    other = tmp_path / 'other'
+    other.mkdir()
+    second, second_log = make_cli(other)
+    lookup = ['application:get', '--uuid', 'b6e2c4f5', '--format', 'json']
+
+    for binary in (first, second, first, second):
+        cli = MultiflexiCli(cache=EntityCache(path))
+        cli.run_json([binary] + lookup)
+        cli.close()
+    assert len(calls(first_log)) == len(calls(second_log)) == 1
+
+
+def test_values_are_json(tmp_path):
+    path = tmp_path / 'cache.sqlite'
+    cache = EntityCache(str(path))
+    cache.set('k', ['a', 1])
+    cache.close()
+    assert json.loads(json.dumps(EntityCache(str(path)).get('k'))) == ['a', 1]
@@ -0,0 +1,250 @@
+"""Unit tests for the shared multiflexi-cli executor."""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import sys
+
+import pytest
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import (
+    CallTimings,
+    MultiflexiCli,
+    MultiflexiCliError,
+    MultiflexiCliTimeout,
+    is_read_command,
+    redact,
+)
+
+
+FAKE_CLI = """#!{python}
+import json, sys
+args = sys.argv[1:]
+with open({log!r}, 'a') as log:
+    log.write(' '.join(args) + '\\n')
+
+def answer(args):
+    if args[0] == 'application:get' and '--id' in args and args[args.index('--id') + 1] == '404':
+        return 1, json.dumps({{'status': 'not found', 'message': 'No such app'}}), ''
+    if args[0] == 'application:delete':
+        return 1, '', 'Database is locked'
+    if args[0] in ('queue:list', 'job:list') and '--limit' in args:
+        offset = int(args[args.index('--offset') + 1]) if args[0] == 'queue:list' else 0
+        limit = int(args[args.index('--limit') + 1])
+        return 0, json.dumps([{{'id': i}} for i in range(1, 6)][offset:offset + limit]), ''
+    if args[0] == 'event-source:test':
+        import time
+        time.sleep(float(args[args.index('--id') + 1]))
+    if args[0] == 'credential:list':
+        return 0, json.dumps([{{'id': 1, 'name': 'Mail'}}, {{'id': 2, 'name': 'Bank'}}]), ''
+    return 0, json.dumps({{'args': args}}), ''
+
+if args == ['worker']:
+    if {worker}:
+        print(json.dumps({{'ready': True}}), flush=True)
+        for line in sys.stdin:
+            rc, out, err = answer(json.loads(line)['args'])
+            print(json.dumps({{'exitcode': rc, 'stdout': out, 'stderr': err}}), flush=True)
+        sys.exit(0)
+    sys.stderr.write('Command "worker" is not defined.\\n')
+    sys.exit(1)
+
+rc, out, err = answer(args)
+sys.stdout.write(out)
+sys.stderr.write(err)
+sys.exit(rc)
+"""
+
+
+class FakeModule:
+    """Minimal stand-in for AnsibleModule collecting warnings."""
+
+    _verbosity = 0
+
+    def __init__(self):
+        self.warnings = []
+
+    def warn(self, msg):
+        self.warnings.append(msg)
+
+
+def make_cli(tmp_path, worker=False):
+    log = tmp_path / "calls.log"
+    script = tmp_path / "multiflexi-cli"
+    script.write_text(FAKE_CLI.format(python=sys.executable, log=str(log), worker=worker))
+    script.chmod(0o755)
+    return str(script), log
+
+
+def calls(log):
+    return log.read_text().splitlines() if log.exists() else []
+
+
+def test_is_read_command():
+    assert is_read_command(['multiflexi-cli', 'job:list', '--format', 'json'])
+    assert is_read_command(['multiflexi-cli', 'status', '--format=json'])
+    assert not is_read_command(['multiflexi-cli', 'job:create', '--scheduled', 'now'])
+
+
+def test_secrets_are_redacted_in_debug_output(tmp_path):
+    assert redact(['multiflexi-cli', 'token:update', '--id', '4', '--token', 'f00d', '--format', 'json']) == \
+        'multiflexi-cli token:update --id 4 --token ******** --format json'
+    assert redact(['multiflexi-cli', 'user:create', '--password=s3cret', '--db_password', 'x']) == \
+        'multiflexi-cli user:create --password=******** --db_password ********'
+    assert redact(['multiflexi-cli', 'user:create', '--login', 'ann', '--plaintext', 'pa55']) == \
+        'multiflexi-cli user:create --login ann --plaintext ********'
+    assert redact(['multiflexi-cli', 'user:update', '--id', '3', '--plaintext=pa55']) == \
+        'multiflexi-cli user:update --id 3 --plaintext=********'
+
+    binary, log = make_cli(tmp_path)
+    module = FakeModule()
+    module._verbosity = 2
+    MultiflexiCli(module).run([binary, 'token:update', '--id', 4, '--token', 'f00d'])
+    # The fake CLI echoes its arguments, so the output is not shown either
+    assert module.warnings and not any('f00d' in warning for warning in module.warnings)
+
+    # Listing tokens prints their values
+    module.warnings = []
+    MultiflexiCli(module).run([binary, 'token:list', '--format', 'json'])
+    assert module.warnings and not any('CLI stdout' in warning for warning in module.warnings)
+
+
+def test_reads_are_memoized_until_a_write(tmp_path):
+    binary, log = make_cli(tmp_path)
+    cli = MultiflexiCli(FakeModule())
+
+    first = cli.run_json([binary, 'application:get', '--id', 1])
+    assert cli.run_json([binary, 'application:get', '--id', 1]) == first
+    assert len(calls(log)) == 1
+
+    cli.run([binary, 'application:update', '--id', 1, '--name', 'x'])
+    cli.run([binary, 'application:get', '--id', 1])
+    assert len(calls(log)) == 3
+
+
+def test_uncached_reads_always_run(tmp_path):
+    binary, log = make_cli(tmp_path)
+    cli = MultiflexiCli(FakeModule())
+
+    cli.run([binary, 'job:list', '--format', 'json'])
+    cli.run([binary, 'job:list', '--format', 'json'], cached=False)
+    cli.run_json([binary, 'job:list', '--format', 'json'], cached=False)
+    assert len(calls(log)) == 3
+
+
+def test_timings_record_executed_commands_only(tmp_path):
+    binary, log = make_cli(tmp_path)
+    cli = MultiflexiCli(FakeModule(), timings=CallTimings())
+
+    cli.run([binary, 'application:get', '--id', 1])
+    cli.run([binary, 'application:get', '--id', 1])
+    with pytest.raises(MultiflexiCliError):
+        cli.run([binary, 'application:delete', '--id', 1])
+
+    timings = cli.timings.as_dict()
+    assert timings['count'] == 2
+    assert timings['memo_hits'] == 1
+    assert [(call['command'], call['rc']) for call in timings['calls']] == [('application:get', 0),
+                                                                           ('application:delete', 1)]
+    assert timings['calls'][0]['bytes'] > 0
+    assert '--id' not in json.dumps(timings)
+
+
+def test_iter_records_pages_with_limit_and_offset(tmp_path):
+    binary, log = make_cli(tmp_path)
+    cli = MultiflexiCli(FakeModule())
+
+    assert [job['id'] for job in cli.iter_records([binary, 'queue:list'], 2)] == [1, 2, 3, 4, 5]
+    assert calls(log)[-1] == 'queue:list --limit 2 --offset 4'
+    assert len(calls(log)) == 3
+    assert [job['id'] for job in cli.iter_records([binary, 'queue:list'], 2, limit=3)] == [1, 2, 3]
+    assert calls(log)[-1] == 'queue:list --limit 1 --offset 2'
+    assert not cli._memo
+
+    with pytest.raises(MultiflexiCliError, match='does not support --offset'):
+        list(cli.iter_records([binary, 'job:list'], 2))
+
+
+def test_iter_pages_yields_one_page_per_call(tmp_path):
+    binary, log = make_cli(tmp_path)
+    cli = MultiflexiCli(FakeModule())
+
+    assert [len(page) for page in cli.iter_pages([binary, 'queue:list'], 5)] == [5, 0]
+    assert [len(page) for page in cli.iter_pages([binary, 'queue:list'], 5, limit=5)] == [5]
+    assert [len(page) for page in cli.iter_pages([binary, 'queue:list'], 2)] == [2, 2, 1]
+    assert len(calls(log)) == 6
+
+
+def test_not_found_and_errors(tmp_path):
+    binary, log = make_cli(tmp_path)
+    cli = MultiflexiCli(FakeModule())
+
+    output = cli.run([binary, 'application:get', '--id', 404], allow_not_found=True)
+    assert json.loads(output)['status'] == 'not found'
+
+    with pytest.raises(MultiflexiCliError, match='No such app'):
+        cli.run([binary, 'application:get', '--id', 404])
+
+    with pytest.raises(MultiflexiCliError, match='Database is locked') as err:
+        cli.run([binary, 'application:delete', '--id', 1])
+    assert err.value.rc == 1
+
+
+def test_missing_binary(tmp_path):
+    cli = MultiflexiCli(FakeModule())
+    with pytest.raises(MultiflexiCliError, match='Failed to run'):
+        cli.run([str(tmp_path / 'missing'), 'status'])
+
+
+def test_timeout_kills_slow_command(tmp_path):
+    binary, log = make_cli(tmp_path, worker=True)
+    cli = MultiflexiCli(FakeModule(), worker=True)
+
+    assert cli.run_json([binary, 'event-source:test', '--id', 0], timeout=10)['args'][0] == 'event-source:test'
+    with pytest.raises(MultiflexiCliTimeout, match='event-source:test timed out after 0.5s'):
+        cli.run([binary, 'event-source:test', '--id', 5], timeout=0.5)
+    cli.close()
+
+    # Calls with a timeout never go through the worker
+    assert calls(log) == ['event-source:test --id 0', 'event-source:test --id 5']
+
+
+def test_worker_serves_all_commands_from_one_process(tmp_path):
+    binary, log = make_cli(tmp_path, worker=True)
+    cli = MultiflexiCli(FakeModule(), worker=True)
+
+    assert cli.run_json([binary, 'job:create', '--runtemplate_id', 1])['args'][0] == 'job:create'
+    assert cli.run_json([binary, 'job:get', '--id', 1])['args'][0] == 'job:get'
+    with pytest.raises(MultiflexiCliError, match='Database is locked'):
+        cli.run([binary, 'application:delete', '--id', 1])
+    cli.close()
+
+    assert calls(log) == ['worker']
+
+
+def test_worker_falls_back_to_process_per_call(tmp_path):
+    binary, log = make_cli(tmp_path, worker=False)
+    module = FakeModule()
+    cli = MultiflexiCli(module, worker=True)
+
+    cli.run([binary, 'job:create', '--runtemplate_id', 1])
+    cli.run([binary, 'job:create', '--runtemplate_id', 2])
+
+    assert calls(log) == ['worker', 'job:create --runtemplate_id 1', 'job:create --runtemplate_id 2']
+    assert len(module.warnings) == 1
+    assert 'worker disabled' in module.warnings[0]
+
+
+def test_index_is_built_once_until_a_write(tmp_path):
+    binary, log = make_cli(tmp_path)
+    cli = MultiflexiCli(FakeModule())
+    list_args = [binary, 'credential:list', '--fields', 'id,name']
+
+    index = cli.index(list_args, 'name')
+    assert index['Bank']['id'] == 2
+    assert cli.index(list_args, 'name') is index
+    assert len(calls(log)) == 1
+
+    cli.run([binary, 'credential:create', '--name', 'x'])
+    cli.index(list_args, 'name')
+    assert len(calls(log)) == 3
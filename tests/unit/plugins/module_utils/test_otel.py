@@ -0,0 +1,133 @@
+"""Unit tests for the OpenTelemetry span exporter, run against a local OTLP stub."""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCli, MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.otel import (
+    OtlpExporter,
+    Tracer,
+    command_attributes,
+    parse_traceparent,
+)
+
+
+class OtlpStub(object):
+    """OTLP/HTTP receiver collecting the posted trace payloads."""
+
+    def __init__(self, status=200, delay=0):
+        stub = self
+        self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                stub.requests.append((self.path, json.loads(body)))
+                time.sleep(delay)
+                self.send_response(status)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def spans(self):
+        return [span for _path, payload in self.requests
+                for resource in payload['resourceSpans'] for scope in resource['scopeSpans'] for span in scope['spans']]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def otlp():
+    stub = OtlpStub()
+    yield stub
+    stub.close()
+
+
+def attributes(span):
+    return dict((attr['key'], list(attr['value'].values())[0]) for attr in span['attributes'])
+
+
+def test_command_attributes_keep_ids_only():
+    name, attrs = command_attributes(['multiflexi-cli', 'user:create', '--login', 'joe', '--password', 'secret',
+                                      '--id=7', '--format', 'json'])
+    assert name == 'user:create'
+    assert attrs == {'multiflexi.command': 'user:create', 'multiflexi.entity': 'user',
+                     'multiflexi.action': 'create', 'multiflexi.id': '7'}
+
+
+def test_parse_traceparent():
+    assert parse_traceparent('00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01') == (
+        '0af7651916cd43dd8448eb211c80319c', 'b7ad6b7169203331')
+    assert parse_traceparent('garbage') is None
+
+
+def test_spans_are_exported_in_batches(otlp):
+    exporter = OtlpExporter(otlp.endpoint, {'service.name': 'test'}, batch_size=2)
+    tracer = Tracer(exporter, 'vitexus.multiflexi.job', traceparent='')
+    for job_id in range(3):
+        tracer.record_call(['multiflexi-cli', 'job:get', '--id', job_id], time.time(), time.time(), 0, '{}')
+    tracer.finish({'ansible.changed': False})
+
+    assert [path for path, _payload in otlp.requests] == ['/v1/traces', '/v1/traces']
+    spans = otlp.spans()
+    assert len(spans) == 4
+    root = spans[-1]
+    assert root['name'] == 'vitexus.multiflexi.job'
+    assert all(span['parentSpanId'] == root['spanId'] for span in spans[:3])
+    assert len(set(span['traceId'] for span in spans)) == 1
+    assert attributes(spans[0])['multiflexi.bytes'] == '2'
+    assert exporter.exported == 4
+
+
+def test_cli_calls_become_spans(otlp, tmp_path):
+    exporter = OtlpExporter(otlp.endpoint)
+    cli = MultiflexiCli(tracer=Tracer(exporter, 'test', traceparent='00-' + '1' * 32 + '-' + '2' * 16 + '-01'))
+    with pytest.raises(MultiflexiCliError):
+        cli.run([str(tmp_path / 'missing-cli'), 'job:list'])
+    cli.run(['true', 'job:list'])
+    cli.tracer.finish()
+
+    failed, listed, root = otlp.spans()
+    assert failed['status']['code'] == 2 and listed['status']['code'] == 1
+    assert attributes(listed)['multiflexi.transport'] == 'cli'
+    assert root['traceId'] == '1' * 32 and root['parentSpanId'] == '2' * 16
+
+
+def test_collector_errors_never_fail_or_stall():
+    broken = OtlpStub(status=500)
+    exporter = OtlpExporter(broken.endpoint, batch_size=1)
+    tracer = Tracer(exporter, 'test', traceparent='')
+    tracer.record_call(['multiflexi-cli', 'status'], time.time(), time.time(), 0, '')
+    tracer.record_call(['multiflexi-cli', 'status'], time.time(), time.time(), 0, '')
+    tracer.finish()
+    broken.close()
+    # The first failure stops the export of everything else
+    assert len(broken.requests) == 1
+    assert exporter.exported == 0
+
+    slow = OtlpStub(delay=2)
+    started = time.time()
+    Tracer(OtlpExporter(slow.endpoint, timeout=0.5), 'test', traceparent='').finish()
+    assert time.time() - started < 1.5
+    slow.close()
+
+    started = time.time()
+    Tracer(OtlpExporter('http://127.0.0.1:9', timeout=0.5), 'test', traceparent='').finish()
+    Tracer(OtlpExporter('not a url'), 'test', traceparent='').finish()
+    assert time.time() - started < 1.5
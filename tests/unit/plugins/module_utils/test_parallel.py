@@ -0,0 +1,51 @@
+"""Unit tests for the bounded concurrency helper."""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+import time
+
+import pytest
+
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.cli import MultiflexiCliError
+from ansible_collections.vitexus.multiflexi.plugins.module_utils.parallel import run_parallel
+
+
+def test_results_keep_input_order_and_collect_errors():
+    def work(item):
+        # Later items finish first.
+        time.sleep((5 - item) * 0.01)
+        if item == 2:
+            raise MultiflexiCliError("multiflexi-cli error: locked", rc=1)
+        return item * 10
+
+    results = run_parallel(work, range(5), max_workers=5)
+
+    assert [task.item for task in results] == [0, 1, 2, 3, 4]
+    assert [task.result for task in results] == [0, 10, None, 30, 40]
+    assert [str(task.error) for task in results if task.error] == ['multiflexi-cli error: locked']
+
+
+def test_concurrency_is_bounded():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(item)
+
+    run_parallel(work, range(12), max_workers=3)
+    assert max(peak) == 3
+
+
+def test_unexpected_errors_propagate():
+    def work(item):
+        raise KeyError(item)
+
+    with pytest.raises(KeyError):
+        run_parallel(work, [1, 2], max_workers=2)
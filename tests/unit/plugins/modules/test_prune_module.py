@@ -0,0 +1,65 @@
+"""Unit tests for the batched mode of the vitexus.multiflexi.prune module."""
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from ansible_collections.vitexus.multiflexi.plugins.modules import prune
+
+
+class FakeCli:
+    """Records prune calls, each one taking ten seconds of the fake clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = []
+
+    def run(self, args, **kwargs):
+        self.calls.append(args)
+        self.clock[0] += 10
+        return ''
+
+
+class FakeModule:
+    check_mode = False
+
+    def __init__(self, clock, **params):
+        self.params = dict(keep=100, batch_size=100, batch_pause=0, row_counts=None, cursor=None)
+        self.params.update(params)
+        self.cli = FakeCli(clock)
+
+    def fail_json(self, **kwargs):
+        raise AssertionError(kwargs['msg'])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = [0]
+    monkeypatch.setattr(prune.time, 'time', lambda: clock[0])
+    return clock
+
+
+def run_batched(module, time_budget):
+    result = dict(changed=False, batches=[])
+    prune.prune_batched(module, 'multiflexi-cli', ['logs'], time_budget, result)
+    return result
+
+
+def test_logs_prune_resumes_from_cursor(clock):
+    first = run_batched(FakeModule(clock, row_counts=dict(logs=1000)), 25)
+    assert [batch['keep'] for batch in first['batches']] == [900, 800]
+    assert first['cursor']['tables'] == dict(logs=800)
+    assert not first['complete']
+
+    # Same row_counts as the first run, as in a playbook with a fixed value
+    clock[0] = 0
+    second = run_batched(FakeModule(clock, row_counts=dict(logs=1000), cursor=first['cursor']), 25)
+    assert [batch['keep'] for batch in second['batches']] == [700, 600]
+    assert second['cursor']['tables'] == dict(logs=600)
+
+
+def test_cursor_of_another_keep_is_ignored(clock):
+    module = FakeModule(clock, keep=500, row_counts=dict(logs=1000), cursor=dict(keep=100, tables=dict(logs=800)))
+    result = run_batched(module, None)
+    assert [batch['keep'] for batch in result['batches']] == [900, 800, 700, 600, 500]
+    assert result['complete']